@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_started
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        """
+        Import the search index, facet count and cache version signal handlers so
+        contribution and tag changes are reflected in the full-text index, facet
+        counts and cached responses
+        """
+        import api.search  # This registers the search index signal handlers
+        import api.facets  # This registers the facet count signal handlers
+        import api.signals  # This registers the cache version signal handlers
+
+        # Warm the contribution caches in the background once this process serves its first request
+        if getattr(settings, 'WARM_CACHES_ON_STARTUP', False):
+            from api.warming import warm_on_first_request
+            request_started.connect(warm_on_first_request, dispatch_uid='api.warm_caches')
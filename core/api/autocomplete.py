@@ -0,0 +1,100 @@
+from bisect import bisect_left
+import threading
+import time
+
+from django.conf import settings
+
+from .cache_utils import get_cache_generation
+
+
+def normalize_prefix(text):
+    """Case and whitespace insensitive form used for index keys and lookups"""
+    return ' '.join((text or '').split()).casefold()
+
+
+class NameIndex:
+    """
+    Sorted index over the names of one taxonomy model for prefix lookups.
+    Every word of a name starts a key, so "dha" finds "University of Dhaka".
+    A lookup is a binary search plus a walk over at most the matching keys.
+    """
+    def __init__(self, rows):
+        entries = []
+        for pk, name in rows:
+            if not name or not name.strip():
+                continue
+            words = normalize_prefix(name).split(' ')
+            for position in range(len(words)):
+                entries.append((' '.join(words[position:]), name, str(pk)))
+        entries.sort()
+        self.keys = [entry[0] for entry in entries]
+        self.entries = entries
+
+    def search(self, prefix, limit):
+        """
+        Up to limit {'id', 'name'} items whose name, or a word in it, starts with prefix,
+        in alphabetical order of the matched text
+        """
+        prefix = normalize_prefix(prefix)
+        results = []
+        seen = set()
+        for index in range(bisect_left(self.keys, prefix), len(self.keys)):
+            key, name, pk = self.entries[index]
+            if not key.startswith(prefix):
+                break
+            if pk in seen:
+                continue
+            seen.add(pk)
+            results.append({'id': pk, 'name': name})
+            if len(results) == limit:
+                break
+        return results
+
+
+class NameIndexes:
+    """
+    One NameIndex per taxonomy namespace, held in this process's memory.
+    Kept apart from the tiered cache's LRU so hot contribution details can't evict
+    them. An index is trusted for LOCAL_CACHE_TTL seconds, then revalidated by
+    reading the namespace generation, and rebuilt from the database once it moves.
+    """
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace, model):
+        now = time.monotonic()
+        with self._lock:
+            held = self._indexes.get(namespace)
+        if held is not None and now < held['fresh_until']:
+            return held['index']
+
+        generation = get_cache_generation(namespace)
+        if held is None or held['generation'] != generation:
+            # Stamped with the generation read before building, so a write made meanwhile
+            # is picked up by the next revalidation
+            held = {'index': NameIndex(model.objects.values_list('id', 'name')), 'generation': generation}
+        with self._lock:
+            held['fresh_until'] = now + getattr(settings, 'LOCAL_CACHE_TTL', 5)
+            self._indexes[namespace] = held
+        return held['index']
+
+    def discard(self, namespace):
+        """Drop a namespace's index, so this process's own writes are seen by its next lookup"""
+        with self._lock:
+            self._indexes.pop(namespace, None)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+name_indexes = NameIndexes()
+
+
+def get_name_index(namespace, model):
+    """
+    Name index of a taxonomy model, built once per taxonomy change and kept in
+    process memory, so lookups are answered without a query
+    """
+    return name_indexes.get(namespace, model)
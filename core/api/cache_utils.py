@@ -0,0 +1,322 @@
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import quote_etag
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+
+# Cache namespaces that are invalidated by bumping a generation counter
+CONTRIBUTIONS_LIST_NAMESPACE = 'contributions_list'
+UNIVERSITY_LIST_NAMESPACE = 'university_list'
+DEPARTMENT_LIST_NAMESPACE = 'department_list'
+MAJOR_SUBJECT_LIST_NAMESPACE = 'major_subject_list'
+TAXONOMY_NAMESPACE = 'taxonomy'  # The three lists above combined
+TAG_NAMESPACE = 'contribution_tags'  # Tag names, as embedded in contribution details
+
+GENERATION_KEY_PREFIX = 'cache_generation'
+
+# Bodies shorter than this are not worth compressing (the same threshold as GZipMiddleware)
+GZIP_MIN_LENGTH = 200
+
+accepts_gzip = re.compile(r'\bgzip\b')
+
+# Single-flight rebuilds (see get_or_build)
+REBUILD_LOCK_TIMEOUT = 30  # Seconds before a crashed builder's lock lapses
+REBUILD_WAIT = 2.0  # Seconds a request without any copy waits for another builder
+REBUILD_POLL_INTERVAL = 0.05
+STALE_GRACE = 60  # Seconds an expired copy is kept to be served while it is rebuilt
+EARLY_REFRESH_BETA = 1.0  # Above 1 favours earlier refreshes, below 1 later ones
+
+
+def contribution_detail_key(contribution_id):
+    """Key of the public, user-independent part of a contribution detail"""
+    return f"contribution_detail:{contribution_id}"
+
+
+def contribution_detail_namespaces(contribution_id):
+    """
+    Namespaces whose generations version a contribution detail: its own, plus the taxonomy
+    and the tags because their names are nested, so renaming one is a single bump
+    """
+    return (contribution_detail_key(contribution_id), TAXONOMY_NAMESPACE, TAG_NAMESPACE)
+
+
+def contribution_detail_user_key(contribution_id, user_id):
+    """Key of a user's overlay (enrollment state and gated media) on a contribution detail"""
+    return f"contribution_detail:{contribution_id}:user:{user_id}"
+
+
+def _generation_key(namespace):
+    return f"{GENERATION_KEY_PREFIX}:{namespace}"
+
+
+def _new_generation():
+    """
+    Seed value for a generation counter.
+    Time based so a counter that was evicted never restarts at a value
+    that older cached entries were written under.
+    """
+    return int(time.time() * 1000)
+
+
+def get_cache_generation(namespace):
+    """
+    Return the current generation of a cache namespace.
+    Cache keys in the namespace embed this value, so bumping it makes every
+    existing entry unreachable without deleting anything.
+    """
+    key = _generation_key(namespace)
+    generation = cache.get(key)
+    if generation is None:
+        # add() keeps the first value if several requests race to seed the counter
+        cache.add(key, _new_generation(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_cache_generation(namespace):
+    """
+    Invalidate every entry in a cache namespace in O(1).
+    Stale entries are never read again and expire on their own timeout.
+    """
+    key = _generation_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Counter missing or evicted - start a fresh generation
+        generation = _new_generation()
+        cache.set(key, generation, timeout=None)
+        return generation
+    finally:
+        # Writes made by this process are seen by its own next read at once
+        tiered_cache.discard_namespace(namespace)
+
+
+def _needs_refresh(record, now):
+    """
+    Probabilistic early expiration: the closer a copy is to expiry, and the longer it
+    took to build, the likelier a request is to rebuild it ahead of time. Requests
+    therefore rarely all find it expired at the same moment.
+    """
+    jitter = record['build_time'] * EARLY_REFRESH_BETA * -math.log(1.0 - random.random())
+    return now + jitter >= record['expires']
+
+
+def get_or_build(key, build, timeout):
+    """
+    Read-through cache with dogpile protection.
+    On a miss, or on an early refresh, only the request holding the key's lock calls build().
+    The others keep serving the previous copy or, if there is none, wait briefly for the builder.
+    The lock is taken with cache.add() in the shared cache (the DatabaseCache by default, where
+    add() is an INSERT on the key), so it is held across every worker process, not only threads.
+    Exceptions from build() propagate and nothing is cached.
+    """
+    return _get_or_build_record(key, build, timeout)['value']
+
+
+def _get_or_build_record(key, build, timeout):
+    """get_or_build() returning the whole record, so callers also learn when the copy expires"""
+    record = cache.get(key)
+    if record is not None and not _needs_refresh(record, time.time()):
+        return record
+
+    lock_key = f"{key}:rebuild"
+    token = uuid4().hex
+    if cache.add(lock_key, token, timeout=REBUILD_LOCK_TIMEOUT):
+        try:
+            started = time.time()
+            value = build()
+            finished = time.time()
+            record = {'value': value, 'expires': finished + timeout, 'build_time': finished - started}
+            # Kept past its expiry so other requests have something to serve during the next rebuild
+            cache.set(key, record, timeout=timeout + STALE_GRACE)
+            return record
+        finally:
+            # Do not release a lock another builder took over after ours lapsed
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    if record is not None:
+        return record
+
+    deadline = time.time() + REBUILD_WAIT
+    while time.time() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+        record = cache.get(key)
+        if record is not None:
+            return record
+    # The builder is slow or failed; answer this request without caching
+    return {'value': build(), 'expires': time.time(), 'build_time': 0.0}
+
+
+class TieredCache:
+    """
+    Read-through cache with a bounded, per-process LRU in front of the Django cache.
+
+    Every entry belongs to a namespace whose generation counter is its version stamp,
+    or to a tuple of namespaces whose generations together are its version stamp.
+    A local copy is served without touching the shared cache for LOCAL_CACHE_TTL
+    seconds; after that a single read of the (small) generation counter tells whether
+    it is still current, so a write in any process is seen everywhere within that
+    time and an unchanged copy is never fetched or unpickled again.
+    A local copy is also dropped once the shared copy it came from expires, so
+    CACHE_TIMEOUTS bounds its age even when nothing bumps the generation.
+    Shared entries live under the key plus the generation and are built through
+    get_or_build(), so misses keep the dogpile protection.
+    """
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def get_or_build(self, key, namespace, build, timeout):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() >= entry['expires']:
+                del self._entries[key]
+                entry = None
+            if entry is not None and now < entry['fresh_until']:
+                self._entries.move_to_end(key)
+                self._stats['local']['hits'] += 1
+                return entry['value']
+
+        if isinstance(namespace, str):
+            version = get_cache_generation(namespace)
+        else:
+            version = ':'.join(str(get_cache_generation(part)) for part in namespace)
+        if entry is not None and entry['version'] == version:
+            with self._lock:
+                entry['fresh_until'] = now + getattr(settings, 'LOCAL_CACHE_TTL', 5)
+                self._stats['local']['hits'] += 1
+            return entry['value']
+
+        built = []
+        def build_and_record():
+            built.append(True)
+            return build()
+        record = _get_or_build_record(f"{key}:{version}", build_and_record, timeout)
+        value = record['value']
+
+        with self._lock:
+            self._stats['local']['misses'] += 1
+            self._stats['shared']['misses' if built else 'hits'] += 1
+            self._entries[key] = {
+                'value': value,
+                'namespaces': (namespace,) if isinstance(namespace, str) else tuple(namespace),
+                'version': version,
+                'fresh_until': now + getattr(settings, 'LOCAL_CACHE_TTL', 5),
+                'expires': record['expires'],
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > getattr(settings, 'LOCAL_CACHE_MAX_ENTRIES', 512):
+                self._entries.popitem(last=False)
+        return value
+
+    def discard_namespace(self, namespace):
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if namespace in entry['namespaces']]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self):
+        self._stats = {tier: {'hits': 0, 'misses': 0} for tier in ('local', 'shared')}
+
+    def stats(self):
+        """Hits, misses and hit ratio of each tier in this process; shared lookups only happen on local misses"""
+        with self._lock:
+            stats = {'local_entries': len(self._entries)}
+            for tier, counts in self._stats.items():
+                lookups = counts['hits'] + counts['misses']
+                stats[tier] = {**counts, 'hit_ratio': round(counts['hits'] / lookups, 4) if lookups else None}
+            return stats
+
+
+tiered_cache = TieredCache()
+
+
+def make_etag(*parts):
+    """
+    Strong ETag derived from version stamps (generations, IDs, query parameters).
+    Any change in a part yields a different tag, and nothing has to be serialized to compute it.
+    """
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return quote_etag(digest)
+
+
+def gzip_etag(etag):
+    """
+    ETag of the gzipped variant of a response tagged etag. The two bodies differ byte for
+    byte, so unlike GZipMiddleware, which weakens the tag, the variant gets its own strong tag
+    """
+    return f'{etag[:-1]}-gzip"'
+
+
+def serves_gzip(request, entry):
+    """Whether cached_response() answers this request with the entry's gzipped copy"""
+    return entry['gzip'] is not None and bool(accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+
+
+def entry_etag(request, entry):
+    """ETag of the variant of a cached entry that cached_response() serves to this request"""
+    if entry['etag'] and serves_gzip(request, entry):
+        return gzip_etag(entry['etag'])
+    return entry['etag']
+
+
+def encode_cached_response(data, etag=None):
+    """
+    Render a response payload once into the entry kept in the cache: the JSON body,
+    its content type and ETag, and a gzipped copy when CACHED_RESPONSE_GZIP is enabled.
+    Without an etag, the ETag is a hash of the body itself.
+    """
+    renderer = JSONRenderer()
+    body = renderer.render(data)
+    if etag is None:
+        etag = make_etag(body)
+    entry = {'body': body, 'gzip': None, 'content_type': renderer.media_type, 'etag': etag}
+    if getattr(settings, 'CACHED_RESPONSE_GZIP', False) and len(body) >= GZIP_MIN_LENGTH:
+        compressed = compress_string(body)
+        if len(compressed) < len(body):
+            entry['gzip'] = compressed
+    return entry
+
+
+def cached_response(request, entry, data=None):
+    """
+    Serve the bytes of a cached entry as they are, gzipped if the client accepts it.
+    The gzipped variant is tagged with gzip_etag() of the entry's ETag.
+    Pass data when the entry was just rendered from it: the result is then a DRF
+    Response exposing .data, with its content preset so it is not rendered again.
+    """
+    if data is None:
+        response = HttpResponse(content_type=entry['content_type'])
+    else:
+        response = Response(data)
+        response['Content-Type'] = entry['content_type']
+
+    use_gzip = serves_gzip(request, entry)
+    response.content = entry['gzip'] if use_gzip else entry['body']
+    response['Content-Length'] = str(len(response.content))
+    if use_gzip:
+        response['Content-Encoding'] = 'gzip'
+    if entry['gzip'] is not None:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    if entry['etag']:
+        response['ETag'] = entry_etag(request, entry)
+    return response
@@ -0,0 +1,243 @@
+from collections import Counter
+from uuid import UUID
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import ContributionFacetCount, Contributions
+
+
+# Browse-filter facets and the Contributions column holding each of them
+FACET_DIMENSIONS = {
+    'university': 'related_University_id',
+    'department': 'related_Department_id',
+    'major_subject': 'related_Major_Subject_id',
+}
+
+DIMENSION_FIELDS = {
+    'related_University', 'related_Department', 'related_Major_Subject',
+    *FACET_DIMENSIONS.values(),
+}
+
+
+def facet_cell_key(university_id, department_id, major_subject_id, tag_id=None):
+    """Unique key of a facet cell; NULLs are not unique in SQL, so the row is keyed on this instead"""
+    return ':'.join(
+        '' if value is None else str(UUID(str(value)))
+        for value in (university_id, department_id, major_subject_id, tag_id)
+    )
+
+
+def contribution_dimensions(contribution):
+    """(university_id, department_id, major_subject_id) of a contribution"""
+    return tuple(getattr(contribution, column) for column in FACET_DIMENSIONS.values())
+
+
+def apply_facet_delta(dimensions, delta, tag_ids=(None,)):
+    """
+    Add delta to the cells of one dimension combination: the untagged cell
+    (tag_id None) and/or one cell per tag. Counters are updated with
+    F-expressions so concurrent writes never lose an update.
+    """
+    if not delta:
+        return
+
+    for tag_id in tag_ids:
+        key = facet_cell_key(*dimensions, tag_id)
+        cells = ContributionFacetCount.objects.filter(cell_key=key)
+        if cells.update(count=F('count') + delta) or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                ContributionFacetCount.objects.create(
+                    cell_key=key,
+                    university_id=dimensions[0],
+                    department_id=dimensions[1],
+                    major_subject_id=dimensions[2],
+                    tag_id=tag_id,
+                    count=delta,
+                )
+        except IntegrityError:
+            # Another request created the cell first
+            cells.update(count=F('count') + delta)
+
+
+def _matching_cells(university_id=None, department_id=None, major_subject_id=None, tag_slug=None):
+    """
+    Return (cells, filtered_cells): every cell in the selected dimensions,
+    and the cells counting exactly the contributions that match all filters
+    """
+    filters = {
+        'university_id': university_id,
+        'department_id': department_id,
+        'major_subject_id': major_subject_id,
+    }
+    filters = {key: value for key, value in filters.items() if value}
+
+    cells = ContributionFacetCount.objects.filter(**filters)
+    if tag_slug:
+        return cells, cells.filter(tag__slug=tag_slug)
+    return cells, cells.filter(tag__isnull=True)
+
+
+def estimate_contribution_count(university_id=None, department_id=None, major_subject_id=None, tag_slug=None):
+    """
+    Number of contributions matching the browse filters, summed from the counts table.
+    Exact as long as every write went through the signal handlers.
+    """
+    _, filtered_cells = _matching_cells(university_id, department_id, major_subject_id, tag_slug)
+    return filtered_cells.aggregate(total=Sum('count'))['total'] or 0
+
+
+def facet_counts_built():
+    """
+    False while the counts table is empty on a database that holds contributions,
+    i.e. rebuild_facet_counts has not been run since the counters were introduced
+    """
+    return ContributionFacetCount.objects.exists() or not Contributions.objects.exists()
+
+
+def get_facet_counts(university_id=None, department_id=None, major_subject_id=None, tag_slug=None):
+    """
+    Facet counts for a filter set, read from the counts table.
+    Cost grows with the number of cells matching the filters, not with the number of contributions.
+    The tag facet ignores the tag filter: it lists how many of the filtered contributions carry each tag.
+    """
+    cells, filtered_cells = _matching_cells(university_id, department_id, major_subject_id, tag_slug)
+
+    facets = {
+        'total': filtered_cells.aggregate(total=Sum('count'))['total'] or 0,
+    }
+    for dimension in FACET_DIMENSIONS:
+        rows = filtered_cells.filter(**{f'{dimension}__isnull': False}).values(
+            f'{dimension}_id', f'{dimension}__name'
+        ).annotate(total=Sum('count')).filter(total__gt=0).order_by('-total', f'{dimension}__name')
+        facets[dimension] = [
+            {'id': row[f'{dimension}_id'], 'name': row[f'{dimension}__name'], 'count': row['total']}
+            for row in rows
+        ]
+
+    rows = cells.filter(tag__isnull=False).values(
+        'tag_id', 'tag__name', 'tag__slug'
+    ).annotate(total=Sum('count')).filter(total__gt=0).order_by('-total', 'tag__name')
+    facets['tag'] = [
+        {'id': row['tag_id'], 'name': row['tag__name'], 'slug': row['tag__slug'], 'count': row['total']}
+        for row in rows
+    ]
+    return facets
+
+
+def rebuild_facet_counts():
+    """Recompute every facet cell from scratch. Returns the number of cells written."""
+    through = Contributions.tags.through
+    columns = list(FACET_DIMENSIONS.values())
+
+    cells = []
+    for row in Contributions.objects.values(*columns).annotate(total=Count('id')).order_by():
+        dimensions = tuple(row[column] for column in columns)
+        cells.append((dimensions, None, row['total']))
+
+    tag_columns = [f'contributions__{column}' for column in columns]
+    for row in through.objects.values(*tag_columns, 'contributiontags_id').annotate(total=Count('id')).order_by():
+        dimensions = tuple(row[column] for column in tag_columns)
+        cells.append((dimensions, row['contributiontags_id'], row['total']))
+
+    with transaction.atomic():
+        ContributionFacetCount.objects.all().delete()
+        ContributionFacetCount.objects.bulk_create([
+            ContributionFacetCount(
+                cell_key=facet_cell_key(*dimensions, tag_id),
+                university_id=dimensions[0],
+                department_id=dimensions[1],
+                major_subject_id=dimensions[2],
+                tag_id=tag_id,
+                count=total,
+            )
+            for dimensions, tag_id, total in cells
+        ], batch_size=1000)
+    return len(cells)
+
+
+@receiver(pre_save, sender=Contributions)
+def remember_contribution_dimensions(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Read the stored dimensions so post_save can move the contribution between cells"""
+    instance._facet_previous_dimensions = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not DIMENSION_FIELDS & set(update_fields):
+        return
+    instance._facet_previous_dimensions = Contributions.objects.filter(pk=instance.pk).values_list(
+        *FACET_DIMENSIONS.values()
+    ).first()
+
+
+@receiver(post_save, sender=Contributions)
+def count_saved_contribution(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    dimensions = contribution_dimensions(instance)
+    if created:
+        apply_facet_delta(dimensions, 1)
+        return
+
+    previous = getattr(instance, '_facet_previous_dimensions', None)
+    if previous is None or tuple(previous) == dimensions:
+        return
+    tag_ids = [None, *instance.tags.values_list('pk', flat=True)]
+    apply_facet_delta(tuple(previous), -1, tag_ids)
+    apply_facet_delta(dimensions, 1, tag_ids)
+
+
+@receiver(pre_delete, sender=Contributions)
+def remember_deleted_contribution_cells(sender, instance, **kwargs):
+    # Fields and M2M rows may no longer be readable by post_delete, so collect them now
+    instance._facet_dimensions = contribution_dimensions(instance)
+    instance._facet_tag_ids = list(instance.tags.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Contributions)
+def uncount_deleted_contribution(sender, instance, **kwargs):
+    dimensions = getattr(instance, '_facet_dimensions', None)
+    if dimensions is None:
+        return
+    apply_facet_delta(dimensions, -1, [None, *instance._facet_tag_ids])
+
+
+@receiver(m2m_changed, sender=Contributions.tags.through)
+def count_contribution_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep tag cells in sync when tags are added to or removed from contributions"""
+    if not reverse:
+        # instance is a contribution, pk_set holds tag IDs
+        if action == 'pre_remove':
+            # pk_set may name tags the contribution does not have
+            instance._facet_removed_ids = list(instance.tags.filter(pk__in=pk_set).values_list('pk', flat=True))
+        elif action == 'pre_clear':
+            instance._facet_removed_ids = list(instance.tags.values_list('pk', flat=True))
+        elif action == 'post_add':
+            apply_facet_delta(contribution_dimensions(instance), 1, pk_set)
+        elif action in ('post_remove', 'post_clear'):
+            apply_facet_delta(contribution_dimensions(instance), -1, getattr(instance, '_facet_removed_ids', []))
+        return
+
+    # Changed from the tag side: instance is a tag, pk_set holds contribution IDs
+    if action == 'pre_remove':
+        instance._facet_removed_ids = list(instance.contributions.filter(pk__in=pk_set).values_list('pk', flat=True))
+    elif action == 'pre_clear':
+        instance._facet_removed_ids = list(instance.contributions.values_list('pk', flat=True))
+    elif action == 'post_add':
+        _apply_tag_delta(instance.pk, pk_set, 1)
+    elif action in ('post_remove', 'post_clear'):
+        _apply_tag_delta(instance.pk, getattr(instance, '_facet_removed_ids', []), -1)
+
+
+def _apply_tag_delta(tag_id, contribution_ids, delta):
+    """Apply delta to one tag's cells for the given contributions, grouped by dimension combination"""
+    if not contribution_ids:
+        return
+    combinations = Counter(
+        Contributions.objects.filter(pk__in=contribution_ids).values_list(*FACET_DIMENSIONS.values())
+    )
+    for dimensions, total in combinations.items():
+        apply_facet_delta(dimensions, delta * total, [tag_id])
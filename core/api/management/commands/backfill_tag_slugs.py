@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import ContributionTags, normalize_tag_slug
+
+
+class Command(BaseCommand):
+    """
+    Fill in the normalized slug of tags created before slugs existed, and bring
+    slugs stored under an older normalization up to date.
+    Tags whose names normalize to the same slug are merged into the one that already
+    holds the slug, moving their contributions across, so the slug can stay unique.
+    """
+    help = 'Backfill normalized tag slugs, merging duplicate tags'
+
+    def handle(self, *args, **options):
+        filled = 0
+        merged = 0
+
+        with transaction.atomic():
+            for tag in ContributionTags.objects.order_by('id'):
+                slug = normalize_tag_slug(tag.name)
+                if not slug or slug == tag.slug:
+                    continue
+
+                canonical = ContributionTags.objects.filter(slug=slug).exclude(pk=tag.pk).first()
+                if canonical is None:
+                    tag.save(update_fields=['slug'])
+                    filled += 1
+                    continue
+
+                canonical.contributions.add(*tag.contributions.all())
+                tag.delete()
+                merged += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled {filled} tag slugs, merged {merged} duplicate tags'
+        ))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from api.models import Contributions
+from enrollments.models import Enrollment
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the enrollment_count (popularity) column of every contribution
+    from its completed enrollments.
+    The counter is normally maintained incrementally by signal handlers; run this
+    to fill it for existing data or repair drift after bulk operations that bypass signals.
+    """
+    help = 'Rebuild contribution enrollment counts from scratch'
+
+    def handle(self, *args, **options):
+        start_time = time.monotonic()
+
+        completed = Enrollment.objects.filter(
+            contribution=OuterRef('pk'),
+            payment_status='COMPLETED'
+        ).order_by().values('contribution').annotate(total=Count('id')).values('total')
+        updated = Contributions.objects.update(
+            enrollment_count=Coalesce(Subquery(completed, output_field=IntegerField()), 0)
+        )
+
+        elapsed = time.monotonic() - start_time
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt enrollment counts for {updated} contributions in {elapsed:.2f}s'
+        ))
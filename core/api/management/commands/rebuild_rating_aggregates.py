@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from api.models import Contributions, ContributionRatings, compute_average_rating
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the rating_sum, rating_count and rating columns of every contribution
+    from the ContributionRatings table.
+    The aggregates are normally maintained incrementally by signal handlers; run this
+    to repair drift after bulk operations that bypass signals (queryset update/delete, raw SQL).
+    """
+    help = 'Rebuild contribution rating aggregates from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of contributions updated per query (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        start_time = time.monotonic()
+
+        stats = (
+            ContributionRatings.objects
+            .filter(rating__isnull=False)
+            .values('contribution_id')
+            .annotate(total=Sum('rating'), count=Count('id'))
+            .order_by()
+        )
+
+        rebuilt = 0
+        with transaction.atomic():
+            # Reset everything, then fill in the contributions that actually have ratings
+            Contributions.objects.update(
+                rating_sum=0, rating_count=0, rating=None
+            )
+
+            batch = []
+            for row in stats.iterator(chunk_size=batch_size):
+                batch.append(Contributions(
+                    id=row['contribution_id'],
+                    rating_sum=row['total'],
+                    rating_count=row['count'],
+                    rating=compute_average_rating(row['total'], row['count']),
+                ))
+                if len(batch) >= batch_size:
+                    rebuilt += self._save_batch(batch)
+                    batch = []
+            if batch:
+                rebuilt += self._save_batch(batch)
+
+        elapsed = time.monotonic() - start_time
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt rating aggregates for {rebuilt} contributions in {elapsed:.2f}s'
+        ))
+
+    def _save_batch(self, batch):
+        Contributions.objects.bulk_update(batch, ['rating_sum', 'rating_count', 'rating'])
+        return len(batch)
@@ -0,0 +1,61 @@
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.warming import summarize_warm_results, warm_caches
+
+
+class Command(BaseCommand):
+    """
+    Fill the contribution list and detail caches after a deploy or restart,
+    through the same build paths AllContributionView uses for real requests.
+    Warms the default pages, the largest taxonomy and tag filters and the most
+    enrolled contributions. Pages are cached as seen by anonymous clients
+    reaching the API on --origin (or WARM_CACHES_ORIGIN), since their pagination
+    links are absolute. The cache is shared, so one run warms every worker process.
+    """
+    help = 'Warm the contribution caches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filters',
+            type=int,
+            default=getattr(settings, 'WARM_CACHES_FILTERS', 20),
+            help='Number of values warmed per filter (university, department, major_subject, tag)'
+        )
+        parser.add_argument(
+            '--details',
+            type=int,
+            default=getattr(settings, 'WARM_CACHES_DETAILS', 50),
+            help='Number of contribution details warmed, most enrolled first'
+        )
+        parser.add_argument(
+            '--origin',
+            default=getattr(settings, 'WARM_CACHES_ORIGIN', None),
+            help='Scheme and host clients reach the API on, e.g. https://api.example.com '
+                 '(default: WARM_CACHES_ORIGIN)'
+        )
+
+    def handle(self, *args, **options):
+        origin = options['origin']
+        if not origin:
+            raise CommandError('Pass --origin or set WARM_CACHES_ORIGIN to the scheme and host clients use')
+        parts = urlsplit(origin)
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            raise CommandError(f'Invalid origin: {origin} (expected e.g. https://api.example.com)')
+
+        start_time = time.monotonic()
+        results = warm_caches(
+            origin.rstrip('/'),
+            filters=options['filters'],
+            details=options['details'],
+        )
+        elapsed = time.monotonic() - start_time
+
+        for line in summarize_warm_results(results):
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f'Warmed {len(results)} cache entries in {elapsed:.2f}s'
+        ))
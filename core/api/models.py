@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from decimal import Decimal
 from uuid import uuid4
 from django.conf import settings
 from django.db.models.signals import post_save, post_delete
@@ -47,12 +49,32 @@ class Contributions(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, db_index=True)
     tags = models.ManyToManyField('ContributionTags', related_name='contributions')
     rating = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True, db_index=True)
+    # Running aggregates of ContributionRatings, maintained incrementally so the
+    # average never has to be recomputed from every rating row
+    rating_sum = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    # Number of completed enrollments, maintained by the enrollment signal handlers
+    # so listings can be ordered by popularity without a GROUP BY
+    enrollment_count = models.PositiveIntegerField(default=0)
     related_University = models.ForeignKey(University, related_name='contributions', on_delete=models.PROTECT, null=True, blank=True, db_index=True)
     related_Department = models.ForeignKey(Department, related_name='contributions', on_delete=models.PROTECT, null=True, blank=True, db_index=True)
     related_Major_Subject = models.ForeignKey(MajorSubject, related_name='contributions', on_delete=models.PROTECT, null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Columns maintained by signal handlers with F-expression updates
+    SIGNAL_MAINTAINED_FIELDS = ('rating', 'rating_sum', 'rating_count', 'enrollment_count')
+
+    def save(self, *args, **kwargs):
+        # A full save of a loaded instance would write back its in-memory copies of the
+        # counters and undo any update made since it was loaded, so leave them out
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.SIGNAL_MAINTAINED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         if self.title:
             return self.title
@@ -62,6 +84,14 @@ class Contributions(models.Model):
         verbose_name_plural = "Contributions"
         indexes = [
             models.Index(fields=['created_at', 'rating']),
+            models.Index(fields=['created_at', 'id']),  # keyset pagination on (created_at, id)
+            # Listing orderings, each with id as the tiebreaker so deep pages need no sort
+            models.Index(fields=['rating', 'id']),
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['enrollment_count', 'id']),
+            # Price and rating filters within a university, in the filtered column's order
+            models.Index(fields=['related_University', 'price', 'id']),
+            models.Index(fields=['related_University', 'rating', 'id']),
             models.Index(fields=['related_University', 'related_Department', 'related_Major_Subject']),
         ]
 
@@ -78,12 +108,33 @@ class ContributionVideos(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
 
+def normalize_tag_slug(name):
+    """
+    Normalized form of a tag name used for uniqueness and lookups,
+    so "Machine Learning" and " machine  learning " resolve to the same tag.
+    Only case and whitespace are folded: symbols are kept, so "C", "C++" and "C#"
+    (or ".NET" and "Net") stay different tags.
+    """
+    return ' '.join((name or '').split()).casefold()
+
+
 class ContributionTags(models.Model):
     """
     Model for storing tags of contributions.
     """
     id = models.UUIDField(primary_key=True, default=uuid4, editable=False)
     name = models.CharField(max_length=255, null=True, blank=True)
+    slug = models.CharField(max_length=255, unique=True, null=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        self.slug = normalize_tag_slug(self.name) or None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'slug'}
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name or f"Tag {self.id}"
 
 
 
@@ -109,6 +160,12 @@ class ContributionsComments(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['contribution', 'created_at', 'id']),  # keyset pages of one contribution's comments
+            models.Index(fields=['created_at', 'id']),  # keyset pages of the all-comments feed
+        ]
+
     def __str__(self):
         if self.user and self.user.username:
             return self.user.username
@@ -130,33 +187,106 @@ class ContributionRatings(models.Model):
         if self.user and self.user.username:
             return self.user.username
         return f"Rating {self.id}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored rating so a later save can apply just the difference
+        instance._loaded_rating = instance.rating
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Keep the rating row and the contribution aggregates in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
     
     class Meta:
         unique_together = ['user', 'contribution']  # Prevent duplicate ratings
 
 
+class ContributionFacetCount(models.Model):
+    """
+    Number of contributions in one browse-filter cell: a combination of university,
+    department and major subject, optionally narrowed to one tag. Rows with no tag
+    count contributions; rows with a tag count contributions carrying that tag.
+    Maintained incrementally by the signal handlers in api.facets.
+    """
+    cell_key = models.CharField(max_length=160, unique=True)
+    university = models.ForeignKey(University, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    major_subject = models.ForeignKey(MajorSubject, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    tag = models.ForeignKey(ContributionTags, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.cell_key}: {self.count}"
+
+
 
-@receiver([post_save, post_delete], sender='api.ContributionRatings')
-def update_contribution_rating(sender, instance, **kwargs):
+def apply_rating_delta(contribution_id, sum_delta, count_delta):
     """
-    Update the contribution's average rating whenever a rating is added, updated, or deleted
+    Apply a change to a contribution's running rating aggregates and refresh its average.
+    The sums are updated with F-expressions so concurrent writes never lose an update,
+    and the UPDATE holds the row lock until the surrounding transaction commits.
     """
-    contribution = instance.contribution
-    ratings = ContributionRatings.objects.filter(contribution=contribution)
-    
-    if ratings.exists():
-        # Calculate average rating
-        from django.db.models import Avg
-        avg_rating = ratings.aggregate(Avg('rating'))['rating__avg']
-        # Round to 2 decimal places
-        contribution.rating = round(avg_rating, 2)
-    else:
-        # No ratings, set to None
-        contribution.rating = None
-    
-    contribution.save(update_fields=['rating'])
+    if not sum_delta and not count_delta:
+        return
+
+    contributions = Contributions.objects.filter(pk=contribution_id)
+    contributions.update(
+        rating_sum=F('rating_sum') + sum_delta,
+        rating_count=F('rating_count') + count_delta,
+    )
+
+    aggregates = contributions.values_list('rating_sum', 'rating_count').first()
+    if aggregates is None:
+        # Contribution is being deleted along with its ratings
+        return
+
+    rating_sum, rating_count = aggregates
+    contributions.update(rating=compute_average_rating(rating_sum, rating_count))
+
 
+def _as_decimal(value):
+    """Ratings may be assigned as floats before they are saved"""
+    if value is None:
+        return None
+    return Decimal(str(value))
 
 
+def compute_average_rating(rating_sum, rating_count):
+    """Average rating rounded to 2 decimal places, or None when there are no ratings"""
+    if not rating_count:
+        return None
+    return round(Decimal(rating_sum) / rating_count, 2)
 
 
+@receiver(post_save, sender='api.ContributionRatings')
+def update_contribution_rating_on_save(sender, instance, created, **kwargs):
+    """
+    Update the contribution's rating aggregates whenever a rating is added or updated
+    """
+    new_rating = _as_decimal(instance.rating)
+    old_rating = None if created else _as_decimal(getattr(instance, '_loaded_rating', None))
+
+    sum_delta = (new_rating or 0) - (old_rating or 0)
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    apply_rating_delta(instance.contribution_id, sum_delta, count_delta)
+
+    # The saved value is the baseline for the next update of this instance
+    instance._loaded_rating = new_rating
+
+
+@receiver(post_delete, sender='api.ContributionRatings')
+def update_contribution_rating_on_delete(sender, instance, **kwargs):
+    """
+    Update the contribution's rating aggregates whenever a rating is deleted
+    """
+    rating = _as_decimal(instance.rating)
+    if rating is None:
+        return
+    apply_rating_delta(instance.contribution_id, -rating, -1)
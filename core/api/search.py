@@ -0,0 +1,281 @@
+import re
+from uuid import UUID
+
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.db.models import Case, IntegerField, Q, When
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Contributions, ContributionTags
+
+
+# SQLite FTS5 index over contribution title, description and tag names.
+# Kept in sync by the signal handlers below; other databases fall back to icontains.
+SEARCH_TABLE = 'api_contribution_search'
+
+# Integer rowid of each contribution in the FTS5 table. FTS5 can only look rows up
+# by rowid, so entries are replaced and deleted through this mapping rather than
+# by contribution_id, which would scan the whole index
+SEARCH_ROWID_TABLE = 'api_contribution_search_rowid'
+
+# Parameters per statement when looking contribution IDs up in the rowid table
+SEARCH_ROWID_BATCH = 500
+
+# Column weights for bm25 ranking: contribution_id (unindexed), title, description, tags
+SEARCH_RANK_WEIGHTS = (0.0, 10.0, 1.0, 5.0)
+
+SEARCH_TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def search_index_available():
+    """Full-text index is only maintained on SQLite (FTS5)"""
+    return connection.vendor == 'sqlite'
+
+
+def create_search_index():
+    """Create the FTS5 table and its rowid mapping if they do not exist yet"""
+    if not search_index_available():
+        return
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        if SEARCH_ROWID_TABLE not in tables and SEARCH_TABLE in tables:
+            # Entries written before the rowid mapping existed can't be found by rowid;
+            # start empty and let rebuild_search_index fill the index again
+            cursor.execute(f"DROP TABLE {SEARCH_TABLE}")
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_ROWID_TABLE} ("
+            "id INTEGER PRIMARY KEY, contribution_id TEXT NOT NULL UNIQUE)"
+        )
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            "contribution_id UNINDEXED, title, description, tags, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def _search_rowids(contribution_hexes):
+    """Map contribution IDs (as hex) to their rowid in the index, assigning new rowids as needed"""
+    _executemany(
+        f"INSERT OR IGNORE INTO {SEARCH_ROWID_TABLE} (contribution_id) VALUES (%s)",
+        [(contribution_hex,) for contribution_hex in contribution_hexes]
+    )
+    rowids = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(contribution_hexes), SEARCH_ROWID_BATCH):
+            batch = contribution_hexes[start:start + SEARCH_ROWID_BATCH]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f"SELECT contribution_id, id FROM {SEARCH_ROWID_TABLE} WHERE contribution_id IN ({placeholders})",
+                batch
+            )
+            rowids.update(cursor.fetchall())
+    return rowids
+
+
+def index_contributions(contribution_ids, replace=True):
+    """
+    (Re)index the given contributions, replacing any existing entries.
+    Pass replace=False when the index is known to hold none of them.
+    """
+    if not search_index_available() or not contribution_ids:
+        return
+
+    contribution_ids = list(contribution_ids)
+    contributions = Contributions.objects.filter(id__in=contribution_ids).only(
+        'id', 'title', 'description'
+    ).prefetch_related('tags')
+
+    rows = [
+        (
+            contribution.id.hex,
+            contribution.title or '',
+            contribution.description or '',
+            ' '.join(tag.name for tag in contribution.tags.all() if tag.name),
+        )
+        for contribution in contributions
+    ]
+
+    rowids = _search_rowids([row[0] for row in rows])
+    if replace:
+        # Contributions deleted in the meantime only need their old entry removed
+        indexed = {row[0] for row in rows}
+        remove_contributions([pk for pk in contribution_ids if UUID(str(pk)).hex not in indexed])
+        _executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(rowids[row[0]],) for row in rows])
+    _executemany(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, contribution_id, title, description, tags) VALUES (%s, %s, %s, %s, %s)",
+        [(rowids[row[0]], *row) for row in rows]
+    )
+
+
+def remove_contributions(contribution_ids):
+    """Remove the given contributions from the index"""
+    if not search_index_available() or not contribution_ids:
+        return
+    params = [(UUID(str(pk)).hex,) for pk in contribution_ids]
+    _executemany(
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid = "
+        f"(SELECT id FROM {SEARCH_ROWID_TABLE} WHERE contribution_id = %s)",
+        params
+    )
+    _executemany(f"DELETE FROM {SEARCH_ROWID_TABLE} WHERE contribution_id = %s", params)
+
+
+def _executemany(sql, params):
+    """Run a statement against the index, creating the table first if a database predates it"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+    except OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
+        create_search_index()
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+
+def rebuild_search_index(batch_size=1000):
+    """Drop every entry and index all contributions again. Returns the number indexed."""
+    if not search_index_available():
+        return 0
+
+    create_search_index()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(f"DELETE FROM {SEARCH_ROWID_TABLE}")
+
+    indexed = 0
+    batch = []
+    # The table was just emptied, so entries are inserted without looking for old ones
+    for pk in Contributions.objects.values_list('id', flat=True).iterator(chunk_size=batch_size):
+        batch.append(pk)
+        if len(batch) >= batch_size:
+            index_contributions(batch, replace=False)
+            indexed += len(batch)
+            batch = []
+    if batch:
+        index_contributions(batch, replace=False)
+        indexed += len(batch)
+    return indexed
+
+
+def build_match_expression(query):
+    """
+    Turn free text into a safe FTS5 query: every word must match, as a prefix.
+    Quoting each term keeps FTS5 operators in user input from being interpreted.
+    """
+    terms = SEARCH_TERM_PATTERN.findall(query or '')
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_contribution_ids(query, limit=None, within=None):
+    """
+    Return IDs of contributions matching query, best match first.
+    within is an optional contributions queryset the matches are restricted to
+    inside the index query, so limit caps the filtered matches rather than
+    cutting the whole index down before the filters run.
+    """
+    match = build_match_expression(query)
+    if not match:
+        return []
+
+    limit = limit or getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+    weights = ', '.join(str(weight) for weight in SEARCH_RANK_WEIGHTS)
+    restriction = ''
+    params = [match]
+    if within is not None and within.query.has_filters():
+        # Contribution IDs are stored as 32 character hex in both tables, so they compare directly
+        subquery, subquery_params = within.order_by().values('id').query.sql_with_params()
+        restriction = f" AND contribution_id IN ({subquery})"
+        params.extend(subquery_params)
+    params.append(limit)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT contribution_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s{restriction} "
+                f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s",
+                params
+            )
+            return [UUID(row[0]) for row in cursor.fetchall()]
+    except OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
+        # Index not built yet - run the rebuild_search_index command to populate it
+        create_search_index()
+        return []
+
+
+def filter_by_search(queryset, query):
+    """
+    Restrict a contributions queryset to those matching query.
+    On SQLite the result is ordered by relevance and holds at most SEARCH_MAX_RESULTS
+    of the matches passing the queryset's filters; elsewhere it falls back to a
+    substring match over title, description and tag names, newest first.
+    """
+    if not search_index_available():
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(tags__name__icontains=query)
+        ).distinct().order_by('-created_at', '-id')
+
+    ranked_ids = search_contribution_ids(query, within=queryset)
+    if not ranked_ids:
+        return queryset.none()
+
+    relevance = Case(
+        *[When(id=pk, then=position) for position, pk in enumerate(ranked_ids)],
+        output_field=IntegerField()
+    )
+    return queryset.filter(id__in=ranked_ids).annotate(search_rank=relevance).order_by('search_rank')
+
+
+@receiver(post_migrate)
+def create_search_index_after_migrate(sender, **kwargs):
+    if sender.name == 'api':
+        create_search_index()
+
+
+@receiver(post_save, sender=Contributions)
+def index_saved_contribution(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_contributions([instance.pk])
+
+
+@receiver(post_delete, sender=Contributions)
+def remove_deleted_contribution(sender, instance, **kwargs):
+    remove_contributions([instance.pk])
+
+
+@receiver(m2m_changed, sender=Contributions.tags.through)
+def reindex_contribution_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep tag names in the index in sync when tags are added to or removed from contributions"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index_contributions([instance.pk])
+        return
+
+    # Changed from the tag side: instance is a tag, pk_set holds contribution IDs
+    if action == 'pre_clear':
+        instance._search_contribution_ids = list(instance.contributions.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        index_contributions(pk_set)
+    elif action == 'post_clear':
+        index_contributions(getattr(instance, '_search_contribution_ids', []))
+
+
+@receiver(post_save, sender=ContributionTags)
+def reindex_renamed_tag(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        index_contributions(instance.contributions.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=ContributionTags)
+def remember_deleted_tag_contributions(sender, instance, **kwargs):
+    # The M2M rows are gone by post_delete, so collect the affected contributions now
+    instance._search_contribution_ids = list(instance.contributions.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=ContributionTags)
+def reindex_deleted_tag(sender, instance, **kwargs):
+    index_contributions(getattr(instance, '_search_contribution_ids', []))
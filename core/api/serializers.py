@@ -1,10 +1,15 @@
 from rest_framework import serializers
 from auth_app.models import CustomUser
 from .models import Contributions, ContributionVideos, ContributionTags, ContributionNotes, ContributionsComments, ContributionRatings,University,Department,MajorSubject
+from .models import normalize_tag_slug
 from django.shortcuts import get_object_or_404
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
 from enrollments.models import Enrollment
 from django.core.cache import cache
+from django.conf import settings
+from .cache_utils import contribution_detail_user_key
 
 
 # Define constants for repeated string literals
@@ -22,12 +27,9 @@ def update_contribution_enrollment_status(contribution, user):
     # This is a cache-busting operation to ensure real-time updates
     # for the frontend's is_enrolled status
     
-    # Clear contribution detail cache for this specific user
-    user_specific_cache_key = f"contribution_detail:{contribution.id}:user:{user.id}"
-    cache.delete(user_specific_cache_key)
-    
-    # Clear general contribution detail cache
-    cache.delete(f"contribution_detail:{contribution.id}")
+    # Clear this user's enrollment overlay on the contribution detail.
+    # The shared public part of the detail holds no enrollment data and stays cached
+    cache.delete(contribution_detail_user_key(contribution.id, user.id))
     
     # Clear any cached serializer data that might include enrollment status
     contribution_list_cache_keys = [
@@ -46,10 +48,92 @@ def update_contribution_enrollment_status(contribution, user):
     
     return True
 
+
+def get_enrolled_contribution_ids(user, contribution_ids):
+    """
+    Resolve which of the given contributions the user has a COMPLETED enrollment in.
+    Runs a single query for the whole page so AllContributionSerializer does not
+    have to check enrollment once per contribution.
+
+    Args:
+        user: The requesting User instance (may be anonymous)
+        contribution_ids: Iterable of contribution IDs on the current page
+
+    Returns:
+        A set of contribution IDs the user is enrolled in
+    """
+    if not user or not user.is_authenticated or not contribution_ids:
+        return set()
+
+    return set(
+        Enrollment.objects.filter(
+            user=user,
+            contribution_id__in=contribution_ids,
+            payment_status='COMPLETED'
+        ).values_list('contribution_id', flat=True)
+    )
+
+def resolve_tags(tags_data):
+    """
+    Return tag instances for the given tag data, creating missing tags in bulk.
+    Tags are matched on their normalized slug, so this costs one SELECT for the
+    existing tags plus one INSERT (and one SELECT) for new ones, however many tags
+    there are. Concurrent requests creating the same tag cannot produce duplicates
+    because the slug is unique and conflicting inserts are ignored.
+    """
+    names_by_slug = {}
+    for tag_data in tags_data:
+        name = ' '.join((tag_data.get('name') or '').split())
+        slug = normalize_tag_slug(name)
+        if slug and slug not in names_by_slug:
+            names_by_slug[slug] = name
+
+    if not names_by_slug:
+        return []
+
+    tags = {tag.slug: tag for tag in ContributionTags.objects.filter(slug__in=names_by_slug)}
+
+    missing_slugs = [slug for slug in names_by_slug if slug not in tags]
+    if missing_slugs:
+        ContributionTags.objects.bulk_create(
+            [ContributionTags(name=names_by_slug[slug], slug=slug) for slug in missing_slugs],
+            ignore_conflicts=True
+        )
+        # Re-read so tags created by a concurrent request resolve to their stored rows
+        tags.update({tag.slug: tag for tag in ContributionTags.objects.filter(slug__in=missing_slugs)})
+
+    return [tags[slug] for slug in names_by_slug if slug in tags]
+
+def latest_comments_prefetch():
+    """
+    Prefetch the latest comments of each contribution into `latest_comments`.
+    The sliced queryset is run as a single windowed query for the whole page
+    (ROW_NUMBER() partitioned by contribution), however many comments exist.
+    """
+    comments = ContributionsComments.objects.order_by('-created_at', '-id')
+    return Prefetch(
+        'comments',
+        queryset=comments[:settings.CONTRIBUTION_LATEST_COMMENTS],
+        to_attr='latest_comments'
+    )
+
 """
 Serializer for custom User model.
 """
 
+class SparseFieldsMixin:
+    """
+    Lets a serializer render a subset of its fields.
+    Pass fields=[...] to keep only those fields; None keeps the full representation.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 class UniversitySerializer(serializers.ModelSerializer):
     class Meta:
         model = University
@@ -124,6 +208,7 @@ class ContributionVideoSerializer(serializers.ModelSerializer):
     """
     Serializer for contribution videos
     """
+    id = serializers.UUIDField(required=False)  # Send an existing ID to keep that video on update
     video_file = serializers.FileField(required=False, allow_null=True)  # Make file optional
 
     class Meta:
@@ -138,9 +223,11 @@ class ContributionTagSerializer(serializers.ModelSerializer):
     class Meta:
         model = ContributionTags
         fields = '__all__'
+        read_only_fields = ['slug']
 
 
 class ContributionNoteSerializer(serializers.ModelSerializer):
+    id = serializers.UUIDField(required=False)  # Send an existing ID to keep that note on update
     note_file = serializers.FileField(required=False, allow_null=True)  # Make file optional
 
     class Meta:
@@ -189,7 +276,7 @@ class ContributionRatingSerializer(serializers.ModelSerializer):
             return rating
 
 
-class ContributionSerializer(serializers.ModelSerializer):
+class ContributionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     videos = ContributionVideoSerializer(many=True, required=False)
     tags = ContributionTagSerializer(many=True, required=False)
     notes = ContributionNoteSerializer(many=True, required=False)
@@ -198,7 +285,9 @@ class ContributionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contributions
         fields = '__all__'
+        read_only_fields = ['rating_sum', 'rating_count', 'enrollment_count']  # maintained by signal handlers
     
+    @transaction.atomic
     def create(self, validated_data):
         videos_data = validated_data.pop('videos', [])
         tags_data = validated_data.pop('tags', [])
@@ -207,58 +296,74 @@ class ContributionSerializer(serializers.ModelSerializer):
         # Create the contribution
         contribution = Contributions.objects.create(**validated_data)
 
-        # Create related objects
-        for video_data in videos_data:
-            ContributionVideos.objects.create(
-                contribution=contribution, 
-                **video_data
-            )
-
-        # Create tags
-        for tag_data in tags_data:
-            tag, _ = ContributionTags.objects.get_or_create(**tag_data)
-            contribution.tags.add(tag)
-
-        # Create notes
-        for note_data in notes_data:
-            ContributionNotes.objects.create(
-                contribution=contribution, 
-                **note_data
-            )
+        # Create related objects in bulk
+        self._sync_children(contribution, ContributionVideos, videos_data)
+
+        # Attach tags in bulk
+        if tags_data:
+            contribution.tags.add(*resolve_tags(tags_data))
+
+        self._sync_children(contribution, ContributionNotes, notes_data)
 
         return contribution
 
+    def _sync_children(self, instance, model, items_data):
+        """
+        Make the instance's videos or notes match items_data.
+        Items carrying the ID of an existing child keep that row (and its ID) and
+        only have the fields they send updated; children that are not listed are
+        deleted and the remaining items are inserted, each step as one bulk query.
+        """
+        existing = {child.id: child for child in model.objects.filter(contribution=instance)}
+
+        to_create = []
+        to_update = []
+        update_fields = set()
+        kept_ids = set()
+        for item in items_data:
+            item = dict(item)
+            child = existing.get(item.pop('id', None))
+            if child is None or child.id in kept_ids:
+                # Unknown IDs (e.g. from another contribution) are treated as new rows
+                to_create.append(model(contribution=instance, **item))
+                continue
+
+            kept_ids.add(child.id)
+            changed = [field for field, value in item.items() if getattr(child, field) != value]
+            if changed:
+                for field in changed:
+                    setattr(child, field, item[field])
+                    # bulk_update() skips pre_save(), which is what stores uploaded files
+                    model._meta.get_field(field).pre_save(child, add=False)
+                child.updated_at = timezone.now()
+                update_fields.update(changed)
+                to_update.append(child)
+
+        removed_ids = set(existing) - kept_ids
+        if removed_ids:
+            model.objects.filter(id__in=removed_ids).delete()
+        if to_update:
+            model.objects.bulk_update(to_update, [*update_fields, 'updated_at'])
+        if to_create:
+            model.objects.bulk_create(to_create)
+
     def _update_videos(self, instance, videos_data):
         """Helper method to update videos"""
         if videos_data is not None:
-            # Delete existing videos
-            instance.videos.all().delete()
-            
-            # Create new videos
-            for video_data in videos_data:
-                ContributionVideos.objects.create(
-                    contribution=instance,
-                    **video_data
-                )
+            self._sync_children(instance, ContributionVideos, videos_data)
 
     def _update_tags(self, instance, tags_data):
         """Helper method to update tags"""
         if tags_data is not None:
-            instance.tags.clear()
-            for tag_data in tags_data:
-                tag, _ = ContributionTags.objects.get_or_create(**tag_data)
-                instance.tags.add(tag)
+            # set() only removes and inserts the rows that actually changed
+            instance.tags.set(resolve_tags(tags_data))
 
     def _update_notes(self, instance, notes_data):
         """Helper method to update notes"""
         if notes_data is not None:
-            instance.notes.all().delete()
-            for note_data in notes_data:
-                ContributionNotes.objects.create(
-                    contribution=instance,
-                    **note_data
-                )
+            self._sync_children(instance, ContributionNotes, notes_data)
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         videos_data = validated_data.pop('videos', None)
         tags_data = validated_data.pop('tags', None)
@@ -283,7 +388,7 @@ class ContributionSerializer(serializers.ModelSerializer):
         # Video validation
         if 'videos' in data:
             for video in data['videos']:
-                if 'video_file' not in video and 'title' not in video:
+                if 'video_file' not in video and 'title' not in video and 'id' not in video:
                     raise serializers.ValidationError({
                         'videos': 'Both video file and title are required for each video'
                     })
@@ -291,7 +396,7 @@ class ContributionSerializer(serializers.ModelSerializer):
         # Notes validation
         if 'notes' in data:
             for note in data['notes']:
-                if 'note_file' not in note:
+                if 'note_file' not in note and 'id' not in note:
                     raise serializers.ValidationError({
                         'notes': 'Note file is required for each note'
                     })
@@ -301,7 +406,7 @@ class ContributionSerializer(serializers.ModelSerializer):
 
 
         
-class AllContributionSerializer(serializers.ModelSerializer):
+class AllContributionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     get all contributions
     show only title, description, price, thumbnail_image, tags, origine, rating, comments
@@ -309,7 +414,8 @@ class AllContributionSerializer(serializers.ModelSerializer):
     if user is not authenticated, show only the basic elements
     """
     tags = ContributionTagSerializer(many=True, read_only=True)
-    comments = ContributionCommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
+    comment_count = serializers.SerializerMethodField()
     videos = serializers.SerializerMethodField()
     notes = serializers.SerializerMethodField()
     related_University=UniversitySerializer()
@@ -320,11 +426,16 @@ class AllContributionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contributions
         fields = ['id', 'title', 'description', 'price', 'thumbnail_image', 
-                  'tags', 'related_University', 'related_Department', 'related_Major_Subject', 'rating', 'comments', 'videos', 
-                  'notes', 'is_enrolled', 'created_at', 'updated_at']
+                  'tags', 'related_University', 'related_Department', 'related_Major_Subject', 'rating', 'comments',
+                  'comment_count', 'videos', 'notes', 'is_enrolled', 'created_at', 'updated_at']
     
     def get_is_enrolled(self, obj):
         """Check if the requesting user is enrolled in this contribution"""
+        # Use the enrollment IDs resolved once per request when the view provides them
+        enrolled_ids = self.context.get('enrolled_ids')
+        if enrolled_ids is not None:
+            return obj.id in enrolled_ids
+
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return Enrollment.objects.filter(
@@ -334,6 +445,23 @@ class AllContributionSerializer(serializers.ModelSerializer):
             ).exists()
         return False
     
+    def get_comments(self, obj):
+        """
+        Return only the latest comments; the full thread is served by the comments endpoint.
+        Uses the list prefetched by latest_comments_prefetch() when the view provides it.
+        """
+        comments = getattr(obj, 'latest_comments', None)
+        if comments is None:
+            comments = obj.comments.order_by('-created_at', '-id')[:settings.CONTRIBUTION_LATEST_COMMENTS]
+        return ContributionCommentSerializer(comments, many=True).data
+    
+    def get_comment_count(self, obj):
+        """Use the comment_count annotation when the view provides it"""
+        comment_count = getattr(obj, 'comment_count', None)
+        if comment_count is None:
+            comment_count = obj.comments.count()
+        return comment_count
+    
     def get_videos(self, obj):
         """Return videos only if user is enrolled"""
         if self.get_is_enrolled(obj):
@@ -353,9 +481,9 @@ class AllContributionSerializer(serializers.ModelSerializer):
         data = super().to_representation(instance)
         
         # If videos and notes are None (user not enrolled), remove them from response
-        if data['videos'] is None:
+        if 'videos' in data and data['videos'] is None:
             data.pop('videos')
-        if data['notes'] is None:
+        if 'notes' in data and data['notes'] is None:
             data.pop('notes')
             
         return data
@@ -0,0 +1,92 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .autocomplete import name_indexes
+from .cache_utils import (
+    CONTRIBUTIONS_LIST_NAMESPACE, DEPARTMENT_LIST_NAMESPACE, MAJOR_SUBJECT_LIST_NAMESPACE,
+    TAG_NAMESPACE, TAXONOMY_NAMESPACE, UNIVERSITY_LIST_NAMESPACE, bump_cache_generation,
+    contribution_detail_key,
+)
+from .models import ContributionRatings, ContributionTags, Contributions, Department, MajorSubject, University
+
+
+TAXONOMY_NAMESPACES = {
+    University: UNIVERSITY_LIST_NAMESPACE,
+    Department: DEPARTMENT_LIST_NAMESPACE,
+    MajorSubject: MAJOR_SUBJECT_LIST_NAMESPACE,
+}
+
+
+def bump_contribution_details(contribution_ids):
+    """Invalidate the cached detail of each of the given contributions"""
+    for contribution_id in contribution_ids:
+        bump_cache_generation(contribution_detail_key(contribution_id))
+
+
+@receiver(post_save, sender=University)
+@receiver(post_delete, sender=University)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=MajorSubject)
+@receiver(post_delete, sender=MajorSubject)
+def taxonomy_changed(sender, **kwargs):
+    """
+    Move the taxonomy to a new version. Contribution listings and details embed
+    university, department and major subject names, so they move too: details
+    are versioned by the taxonomy generation as well as their own.
+    """
+    bump_cache_generation(TAXONOMY_NAMESPACES[sender])
+    name_indexes.discard(TAXONOMY_NAMESPACES[sender])
+    bump_cache_generation(TAXONOMY_NAMESPACE)
+    bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
+
+
+@receiver(post_save, sender=Contributions)
+@receiver(post_delete, sender=Contributions)
+def contribution_changed(sender, instance, **kwargs):
+    """Covers writes made outside the API views too, such as the admin and management commands"""
+    bump_cache_generation(contribution_detail_key(instance.pk))
+    bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
+
+
+@receiver(post_save, sender=ContributionTags)
+def tag_changed(sender, instance, created=False, **kwargs):
+    # A new tag is not attached to anything yet. Details are versioned by the tag
+    # generation, so a rename refreshes every detail showing the tag in one bump
+    if not created:
+        bump_cache_generation(TAG_NAMESPACE)
+        bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
+
+
+@receiver(post_delete, sender=ContributionTags)
+def tag_deleted(sender, instance, **kwargs):
+    bump_cache_generation(TAG_NAMESPACE)
+    bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
+
+
+@receiver(m2m_changed, sender=Contributions.tags.through)
+def contribution_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Tags added to or removed from contributions, from either side and outside the API views too"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_contribution_details([instance.pk])
+            bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
+        return
+
+    # Changed from the tag side: instance is a tag, pk_set holds contribution IDs
+    if action == 'pre_clear':
+        instance._cache_contribution_ids = list(instance.contributions.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        bump_contribution_details(pk_set)
+        bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
+    elif action == 'post_clear':
+        bump_contribution_details(getattr(instance, '_cache_contribution_ids', []))
+        bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
+
+
+@receiver(post_save, sender=ContributionRatings)
+@receiver(post_delete, sender=ContributionRatings)
+def rating_changed(sender, instance, **kwargs):
+    """The average rating is part of both the listing and the detail payloads"""
+    bump_cache_generation(contribution_detail_key(instance.contribution_id))
+    bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
@@ -1,20 +1,52 @@
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APIRequestFactory
 from rest_framework import status
+from rest_framework.request import Request
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from api.models import (
     University, Department, MajorSubject, Contributions, 
     ContributionVideos, ContributionTags, ContributionNotes,
-    ContributionsComments, ContributionRatings
+    ContributionsComments, ContributionRatings, ContributionFacetCount
 )
-from api.serializers import ContributionSerializer
+from api.serializers import ContributionSerializer, resolve_tags
+from api.cache_utils import bump_cache_generation, get_or_build, tiered_cache
+from api.autocomplete import name_indexes
+from api.facets import rebuild_facet_counts
+from api.search import SEARCH_TABLE, index_contributions, rebuild_search_index
+from api.views import AllContributionView, ContributionCursorPagination, keyset_order_by
+from api import warming
+from enrollments.models import Enrollment
+from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.signals import request_started
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 from uuid import uuid4
+import gzip
+import json
 import tempfile
+import threading
+import time
 from django.test import override_settings
 
 User = get_user_model()
 
+# Cache used where a test drives the cache from several threads: the shared
+# DatabaseCache can't be written from threads of an in-memory SQLite test database
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def app_queries(context):
+    """Queries captured by context, leaving out reads and writes of the shared cache table"""
+    cache_table = connection.ops.quote_name(settings.CACHES['default'].get('LOCATION', ''))
+    return [query for query in context.captured_queries if cache_table not in query['sql']]
+
 class UserInfoViewTest(APITestCase):
     """Test cases for UserInfoView."""
     
@@ -266,6 +298,51 @@ class ContributionSerializerTest(APITestCase):
         self.assertEqual(updated_contribution.notes.count(), 1)
         self.assertNotEqual(updated_contribution.notes.first().id, initial_note.id)
     
+    def test_update_keeps_unchanged_children(self):
+        """Test that videos sent back with their ID keep it while others are added or removed."""
+        kept_video = ContributionVideos.objects.create(contribution=self.contribution, title='Kept')
+        renamed_video = ContributionVideos.objects.create(contribution=self.contribution, title='Old Title')
+        removed_video = ContributionVideos.objects.create(contribution=self.contribution, title='Removed')
+        kept_note = ContributionNotes.objects.create(contribution=self.contribution)
+        
+        data = {
+            'videos': [
+                {'id': str(kept_video.id)},
+                {'id': str(renamed_video.id), 'title': 'New Title'},
+                {'title': 'Added'},
+            ],
+            'notes': [{'id': str(kept_note.id)}, {'note_file': self.note_file}],
+        }
+        serializer = ContributionSerializer(instance=self.contribution, data=data, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        
+        videos = {video.title: video.id for video in self.contribution.videos.all()}
+        self.assertEqual(set(videos), {'Kept', 'New Title', 'Added'})
+        self.assertEqual(videos['Kept'], kept_video.id)
+        self.assertEqual(videos['New Title'], renamed_video.id)
+        self.assertFalse(ContributionVideos.objects.filter(id=removed_video.id).exists())
+        
+        self.assertEqual(self.contribution.notes.count(), 2)
+        self.assertTrue(self.contribution.notes.filter(id=kept_note.id).exists())
+    
+    def test_create_inserts_children_in_bulk(self):
+        """Test that the number of queries does not grow with the number of videos."""
+        def create(video_count):
+            data = {
+                'title': 'Bulk Contribution',
+                'videos': [{'title': f'Video {i}'} for i in range(video_count)],
+            }
+            serializer = ContributionSerializer(data=data)
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            with CaptureQueriesContext(connection) as queries:
+                serializer.save()
+            return len(queries)
+        
+        create(1)  # The first contribution also creates its facet count row
+        self.assertEqual(create(2), create(20))
+        self.assertEqual(ContributionVideos.objects.filter(title='Video 19').count(), 1)
+    
     def test_validation_with_missing_fields(self):
         """Test validation logic for missing required fields."""
         # Test with missing note file
@@ -718,4 +795,1792 @@ class ContributionModelTest(APITestCase):
         contribution.refresh_from_db()
         
         # Check if the rating was updated to the average
-        self.assertEqual(contribution.rating, 4.00)  # (4.5 + 3.5) / 2 = 4.0 
\ No newline at end of file
+        self.assertEqual(contribution.rating, 4.00)  # (4.5 + 3.5) / 2 = 4.0
+        self.assertEqual(contribution.rating_count, 2)
+        
+        # Updating a rating only applies the difference
+        rating1 = ContributionRatings.objects.get(id=rating1.id)
+        rating1.rating = 2.5
+        rating1.save()
+        contribution.refresh_from_db()
+        self.assertEqual(contribution.rating, 3.00)  # (2.5 + 3.5) / 2 = 3.0
+        self.assertEqual(contribution.rating_count, 2)
+        
+        # Deleting ratings removes them from the aggregates
+        rating2.delete()
+        contribution.refresh_from_db()
+        self.assertEqual(contribution.rating, 2.50)
+        self.assertEqual(contribution.rating_count, 1)
+        
+        rating1.delete()
+        contribution.refresh_from_db()
+        self.assertIsNone(contribution.rating)
+        self.assertEqual(contribution.rating_count, 0)
+        self.assertEqual(contribution.rating_sum, 0)
+    
+    def test_saving_stale_instance_keeps_counters(self):
+        """Test that saving an instance loaded before a rating or enrollment keeps the new aggregates."""
+        contribution = Contributions.objects.create(user=self.user, title='Stale')
+        stale = Contributions.objects.get(id=contribution.id)
+        
+        ContributionRatings.objects.create(user=self.user, contribution=contribution, rating=4)
+        Enrollment.objects.create(user=self.user, contribution=contribution, amount_paid=10, payment_status='COMPLETED')
+        
+        stale.title = 'Renamed'
+        stale.save()
+        
+        contribution.refresh_from_db()
+        self.assertEqual(contribution.title, 'Renamed')
+        self.assertEqual(contribution.rating, 4)
+        self.assertEqual(contribution.rating_count, 1)
+        self.assertEqual(contribution.rating_sum, 4)
+        self.assertEqual(contribution.enrollment_count, 1)
+    
+    def test_rebuild_rating_aggregates_command(self):
+        """Test that the rebuild command repairs drifted rating aggregates."""
+        rated = Contributions.objects.create(user=self.user, title='Rated')
+        unrated = Contributions.objects.create(user=self.user, title='Unrated')
+        ContributionRatings.objects.create(user=self.user, contribution=rated, rating=5)
+        user2 = User.objects.create_user(
+            username='testuser2',
+            email='test2@example.com',
+            password='password123'
+        )
+        ContributionRatings.objects.create(user=user2, contribution=rated, rating=2)
+        
+        # Simulate drift from writes that bypass the signal handlers
+        Contributions.objects.filter(id=rated.id).update(rating_sum=1, rating_count=9, rating=0.11)
+        Contributions.objects.filter(id=unrated.id).update(rating_sum=4, rating_count=1, rating=4)
+        
+        out = StringIO()
+        call_command('rebuild_rating_aggregates', stdout=out)
+        self.assertIn('Rebuilt rating aggregates for 1 contributions', out.getvalue())
+        
+        rated.refresh_from_db()
+        unrated.refresh_from_db()
+        self.assertEqual(rated.rating_count, 2)
+        self.assertEqual(rated.rating_sum, 7)
+        self.assertEqual(rated.rating, 3.50)
+        self.assertEqual(unrated.rating_count, 0)
+        self.assertIsNone(unrated.rating)
+
+
+class AllContributionEnrollmentQueryTest(APITestCase):
+    """Test that enrollment status is resolved once per page, not once per contribution."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='enrolleduser',
+            email='enrolled@example.com',
+            password='TestPassword123'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        self.contributions = [
+            Contributions.objects.create(title=f'Contribution {i}', price=10)
+            for i in range(6)
+        ]
+        
+        # Enroll in every other contribution, with one pending enrollment that must not count
+        for contribution in self.contributions[::2]:
+            Enrollment.objects.create(
+                user=self.user,
+                contribution=contribution,
+                amount_paid=10,
+                payment_status='COMPLETED'
+            )
+        Enrollment.objects.create(
+            user=self.user,
+            contribution=self.contributions[1],
+            amount_paid=10,
+            payment_status='PENDING'
+        )
+        self.enrolled_ids = {str(c.id) for c in self.contributions[::2]}
+        
+        self.all_contributions_url = reverse('all-contributions')
+    
+    def _count_enrollment_queries(self, limit):
+        """Fetch a page and return the response with the number of enrollment queries it ran."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f"{self.all_contributions_url}?limit={limit}")
+        enrollment_queries = [
+            query for query in context.captured_queries
+            if 'core_enrollments_enrollment' in query['sql']
+        ]
+        return response, len(enrollment_queries)
+    
+    def test_enrollment_queries_constant_per_page(self):
+        """Test that the number of enrollment queries does not grow with page size."""
+        small_response, small_count = self._count_enrollment_queries(limit=2)
+        large_response, large_count = self._count_enrollment_queries(limit=6)
+        
+        self.assertEqual(small_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(large_response.data['data']), 6)
+        self.assertEqual(small_count, 1)
+        self.assertEqual(large_count, 1)
+    
+    def test_enrollment_status_resolved_per_contribution(self):
+        """Test that batched enrollment lookup still reports the correct status and gated media."""
+        response, _ = self._count_enrollment_queries(limit=6)
+        
+        for item in response.data['data']:
+            expected = item['id'] in self.enrolled_ids
+            self.assertEqual(item['is_enrolled'], expected)
+            self.assertEqual('videos' in item, expected)
+            self.assertEqual('notes' in item, expected)
+
+
+class AllContributionCursorPaginationTest(APITestCase):
+    """Test cases for the keyset (cursor) pagination mode of AllContributionView."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.contributions = [
+            Contributions.objects.create(title=f'Contribution {i}', price=10)
+            for i in range(7)
+        ]
+        # Newest first, with (created_at, id) as the tiebreaker
+        self.expected_order = [
+            str(c.id) for c in Contributions.objects.order_by('-created_at', '-id')
+        ]
+        self.all_contributions_url = reverse('all-contributions')
+    
+    def test_cursor_pages_walk_forward_and_back(self):
+        """Test that next/previous cursors return consecutive, non-overlapping pages."""
+        response = self.client.get(f"{self.all_contributions_url}?pagination=cursor&limit=3")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        pagination = response.data['pagination']
+        self.assertIsNone(pagination['count'])
+        self.assertIsNone(pagination['previous_cursor'])
+        seen = [item['id'] for item in response.data['data']]
+        
+        while pagination['next_cursor']:
+            response = self.client.get(
+                f"{self.all_contributions_url}?cursor={pagination['next_cursor']}&limit=3"
+            )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pagination = response.data['pagination']
+            seen.extend(item['id'] for item in response.data['data'])
+        
+        self.assertEqual(seen, self.expected_order)
+        
+        # Step back from the last page to the middle page
+        response = self.client.get(
+            f"{self.all_contributions_url}?cursor={pagination['previous_cursor']}&limit=3"
+        )
+        self.assertEqual(
+            [item['id'] for item in response.data['data']],
+            self.expected_order[3:6]
+        )
+    
+    def test_cursor_mode_count_is_opt_in(self):
+        """Test that the total count is only computed when explicitly requested."""
+        response = self.client.get(
+            f"{self.all_contributions_url}?pagination=cursor&limit=3&count=exact"
+        )
+        self.assertEqual(response.data['pagination']['count'], 7)
+    
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected."""
+        response = self.client.get(f"{self.all_contributions_url}?cursor=not-a-cursor")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.data['status'])
+
+
+class ContributionListCacheInvalidationTest(APITestCase):
+    """Test that contribution writes invalidate only the contribution list cache."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='cacheuser',
+            email='cache@example.com',
+            password='TestPassword123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.contribution = Contributions.objects.create(
+            user=self.user,
+            title='Cached Contribution'
+        )
+        self.all_contributions_url = reverse('all-contributions')
+        self.create_url = reverse('contributions')
+    
+    def test_write_invalidates_list_but_keeps_unrelated_keys(self):
+        """Test that creating a contribution refreshes list pages without clearing other cache entries."""
+        cache.set('login_attempts:127.0.0.1', 3, timeout=300)
+        
+        response = self.client.get(self.all_contributions_url)
+        self.assertEqual(len(response.data['data']), 1)
+        
+        response = self.client.post(self.create_url, {'title': 'Fresh Contribution'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        response = self.client.get(self.all_contributions_url)
+        self.assertEqual(len(response.data['data']), 2)
+        self.assertEqual(cache.get('login_attempts:127.0.0.1'), 3)
+    
+    def test_delete_invalidates_list(self):
+        """Test that deleting a contribution refreshes cached list pages."""
+        response = self.client.get(self.all_contributions_url)
+        self.assertEqual(len(response.data['data']), 1)
+        
+        self.client.delete(reverse('contributions-delete-update', args=[str(self.contribution.id)]))
+        
+        response = self.client.get(self.all_contributions_url)
+        self.assertEqual(len(response.data['data']), 0)
+
+
+class ContributionDetailCacheTest(APITestCase):
+    """Test that cached contribution details never leak one user's enrollment view to another."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.enrolled_user = User.objects.create_user(
+            username='enrolled',
+            email='enrolled@example.com',
+            password='TestPassword123'
+        )
+        self.other_user = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='TestPassword123'
+        )
+        self.contribution = Contributions.objects.create(title='Gated Contribution', price=10)
+        ContributionVideos.objects.create(contribution=self.contribution, title='Lecture 1')
+        Enrollment.objects.create(
+            user=self.enrolled_user,
+            contribution=self.contribution,
+            amount_paid=10,
+            payment_status='COMPLETED'
+        )
+        self.detail_url = reverse('contribution-detail', args=[str(self.contribution.id)])
+    
+    def _get_detail(self, user=None):
+        self.client.force_authenticate(user=user)
+        return self.client.get(self.detail_url).data['data']
+    
+    def test_enrolled_view_not_served_to_other_users(self):
+        """Test that an enrolled user's cached view is not returned to other users."""
+        enrolled_data = self._get_detail(self.enrolled_user)
+        self.assertTrue(enrolled_data['is_enrolled'])
+        self.assertEqual(enrolled_data['videos'][0]['title'], 'Lecture 1')
+        
+        for user in (self.other_user, None):
+            data = self._get_detail(user)
+            self.assertFalse(data['is_enrolled'])
+            self.assertNotIn('videos', data)
+            self.assertNotIn('notes', data)
+            self.assertEqual(data['title'], 'Gated Contribution')
+    
+    def test_unenrolled_view_not_served_to_enrolled_user(self):
+        """Test that a cached public view does not hide gated media from an enrolled user."""
+        self.assertFalse(self._get_detail(self.other_user)['is_enrolled'])
+        
+        data = self._get_detail(self.enrolled_user)
+        self.assertTrue(data['is_enrolled'])
+        self.assertEqual(len(data['videos']), 1)
+    
+    def test_public_part_shared_between_users(self):
+        """Test that the public part is built once and reused for every user."""
+        self._get_detail(self.enrolled_user)
+        with CaptureQueriesContext(connection) as context:
+            self._get_detail(self.other_user)
+        contribution_queries = [
+            query for query in context.captured_queries
+            if 'FROM "api_contributions"' in query['sql']
+        ]
+        self.assertEqual(contribution_queries, [])
+    
+    def test_taxonomy_and_tag_changes_refresh_detail(self):
+        """Test that renames and tag changes made outside the API views invalidate the cached detail."""
+        university = University.objects.create(name='Old University')
+        self.contribution.related_University = university
+        self.contribution.save()
+        tag = ContributionTags.objects.create(name='Draft')
+        self.assertEqual(self._get_detail()['related_University']['name'], 'Old University')
+        
+        university.name = 'Renamed University'
+        university.save()
+        self.assertEqual(self._get_detail()['related_University']['name'], 'Renamed University')
+        
+        self.contribution.tags.add(tag)
+        self.assertEqual([item['name'] for item in self._get_detail()['tags']], ['Draft'])
+        
+        tag.name = 'Final'
+        tag.save()
+        self.assertEqual([item['name'] for item in self._get_detail()['tags']], ['Final'])
+        
+        tag.contributions.clear()
+        self.assertEqual(self._get_detail()['tags'], [])
+    
+    def test_renames_bump_a_constant_number_of_generations(self):
+        """Test that a taxonomy or tag rename does not bump each affected contribution's detail."""
+        university = University.objects.create(name='Busy University')
+        tag = ContributionTags.objects.create(name='Busy')
+        for index in range(5):
+            contribution = Contributions.objects.create(title=f'Busy {index}', related_University=university)
+            contribution.tags.add(tag)
+        
+        with mock.patch('api.signals.bump_cache_generation') as bump:
+            university.name = 'Renamed Busy University'
+            university.save()
+            tag.name = 'Renamed Busy'
+            tag.save()
+        bumped = [call.args[0] for call in bump.call_args_list]
+        self.assertFalse([namespace for namespace in bumped if namespace.startswith('contribution_detail:')])
+
+
+class ContributionSearchTest(APITestCase):
+    """Test cases for full-text search over contributions."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.algorithms = Contributions.objects.create(
+            title='Algorithms in Python',
+            description='Sorting and graph search explained'
+        )
+        self.databases = Contributions.objects.create(
+            title='Database Systems',
+            description='Indexing, transactions and a little about algorithms'
+        )
+        self.chemistry = Contributions.objects.create(
+            title='Organic Chemistry',
+            description='Reaction mechanisms'
+        )
+        tag = ContributionTags.objects.create(name='exam-prep')
+        self.chemistry.tags.add(tag)
+        
+        self.all_contributions_url = reverse('all-contributions')
+    
+    def _search(self, query):
+        response = self.client.get(self.all_contributions_url, {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['title'] for item in response.data['data']]
+    
+    def test_search_ranks_title_matches_first(self):
+        """Test that a title match ranks above a description match."""
+        self.assertEqual(self._search('algorithms'), ['Algorithms in Python', 'Database Systems'])
+    
+    def test_search_matches_prefixes_and_tags(self):
+        """Test that terms match as prefixes and tag names are searchable."""
+        self.assertEqual(self._search('algo pyth'), ['Algorithms in Python'])
+        self.assertEqual(self._search('exam'), ['Organic Chemistry'])
+    
+    def test_search_index_follows_updates_and_deletes(self):
+        """Test that the index is kept in sync by save/delete signals."""
+        self.chemistry.tags.clear()
+        self.databases.title = 'Relational Databases'
+        self.databases.description = ''
+        self.databases.save()
+        self.algorithms.delete()
+        cache.clear()
+        
+        self.assertEqual(self._search('exam'), [])
+        self.assertEqual(self._search('algorithms'), [])
+        self.assertEqual(self._search('relational'), ['Relational Databases'])
+    
+    def test_search_ignores_query_syntax(self):
+        """Test that FTS operators in user input are treated as plain words."""
+        self.assertEqual(self._search('"organic" OR NEAR('), [])
+        self.assertEqual(self._search('organic*'), ['Organic Chemistry'])
+
+    @override_settings(SEARCH_MAX_RESULTS=1)
+    def test_search_applies_filters_before_result_cap(self):
+        """Test that a filtered search isn't cut down to the global top matches first."""
+        university = University.objects.create(name='Search University')
+        self.databases.related_University = university
+        self.databases.save()
+        cache.clear()
+
+        response = self.client.get(self.all_contributions_url, {'q': 'algorithms', 'university': str(university.id)})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['title'] for item in response.data['data']], ['Database Systems'])
+
+    def test_search_entries_are_replaced_by_rowid(self):
+        """Test that reindexing replaces entries through their rowid instead of scanning the index."""
+        self.databases.save()
+        index_contributions([self.databases.id, self.chemistry.id])
+        rebuild_search_index()
+        index_contributions([self.algorithms.id])
+        
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT contribution_id, COUNT(*) FROM {SEARCH_TABLE} GROUP BY contribution_id")
+            counts = dict(cursor.fetchall())
+        self.assertEqual(
+            counts, {contribution.id.hex: 1 for contribution in (self.algorithms, self.databases, self.chemistry)}
+        )
+        self.assertEqual(self._search('algorithms'), ['Algorithms in Python', 'Database Systems'])
+        
+        with CaptureQueriesContext(connection) as context:
+            self.chemistry.delete()
+        deletes = [query['sql'] for query in context.captured_queries if f'DELETE FROM {SEARCH_TABLE} WHERE' in query['sql']]
+        self.assertTrue(deletes)
+        for sql in deletes:
+            self.assertIn(f'DELETE FROM {SEARCH_TABLE} WHERE rowid', sql)
+
+
+class ContributionTagLookupTest(APITestCase):
+    """Test cases for normalized tag storage and lookup."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.contribution = Contributions.objects.create(title='Tagged Contribution')
+        self.other = Contributions.objects.create(title='Other Contribution')
+        self.all_contributions_url = reverse('all-contributions')
+    
+    def test_tags_are_deduplicated_by_slug(self):
+        """Test that tag names differing only in case or spacing resolve to one tag."""
+        existing = ContributionTags.objects.create(name='Machine Learning')
+        tags = resolve_tags([
+            {'name': 'machine  learning'},
+            {'name': 'MACHINE LEARNING'},
+            {'name': 'Statistics'},
+        ])
+        
+        self.assertEqual([tag.slug for tag in tags], ['machine learning', 'statistics'])
+        self.assertEqual(tags[0].pk, existing.pk)
+        self.assertEqual(ContributionTags.objects.count(), 2)
+    
+    def test_symbols_keep_tags_apart(self):
+        """Test that tags differing only in symbols, like C, C++ and C#, stay separate."""
+        tags = resolve_tags([{'name': 'C'}, {'name': 'C++'}, {'name': 'c#'}, {'name': '.NET'}, {'name': 'Net'}])
+        
+        self.assertEqual([tag.slug for tag in tags], ['c', 'c++', 'c#', '.net', 'net'])
+        self.assertEqual(ContributionTags.objects.count(), 5)
+        
+        self.contribution.tags.add(tags[1])
+        self.other.tags.add(tags[0])
+        response = self.client.get(self.all_contributions_url, {'tag': 'c++'})
+        self.assertEqual([item['title'] for item in response.data['data']], ['Tagged Contribution'])
+        
+        # Slugs stored by an older normalization are refreshed without merging these tags
+        ContributionTags.objects.filter(name='C++').update(slug=None)
+        ContributionTags.objects.filter(name='C#').update(slug='c-old')
+        call_command('backfill_tag_slugs', stdout=StringIO())
+        self.assertEqual(
+            sorted(ContributionTags.objects.values_list('slug', flat=True)), ['.net', 'c', 'c#', 'c++', 'net']
+        )
+    
+    def test_resolve_tags_uses_constant_queries(self):
+        """Test that resolving many new tags does not issue a query per tag."""
+        ContributionTags.objects.create(name='Existing')
+        tags_data = [{'name': 'Existing'}] + [{'name': f'Tag {i}'} for i in range(20)]
+        
+        with self.assertNumQueries(3):
+            tags = resolve_tags(tags_data)
+        self.assertEqual(len(tags), 21)
+    
+    def test_filter_by_tag_is_normalized(self):
+        """Test that the tag filter matches the normalized slug exactly."""
+        tag = ContributionTags.objects.create(name='Exam Prep')
+        self.contribution.tags.add(tag)
+        self.other.tags.add(ContributionTags.objects.create(name='Exam'))
+        
+        response = self.client.get(self.all_contributions_url, {'tag': '  exam   PREP '})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['title'] for item in response.data['data']], ['Tagged Contribution'])
+
+
+class AllContributionCommentSummaryTest(APITestCase):
+    """Test cases for the comment summary embedded in contribution list payloads."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='commenter',
+            email='commenter@example.com',
+            password='TestPassword123'
+        )
+        self.contributions = [
+            Contributions.objects.create(title=f'Contribution {i}', price=10)
+            for i in range(6)
+        ]
+        for index, contribution in enumerate(self.contributions):
+            for i in range(index + 4):
+                ContributionsComments.objects.create(
+                    contribution=contribution,
+                    user=self.user,
+                    comment=f'Comment {i}'
+                )
+        
+        self.all_contributions_url = reverse('all-contributions')
+    
+    def _fetch(self, limit):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.all_contributions_url, {'limit': limit})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, len(context.captured_queries)
+    
+    @override_settings(CONTRIBUTION_LATEST_COMMENTS=2)
+    def test_list_embeds_count_and_latest_comments(self):
+        """Test that each item carries its comment count and only the latest comments."""
+        response, _ = self._fetch(limit=6)
+        
+        expected_counts = {str(c.id): index + 4 for index, c in enumerate(self.contributions)}
+        for item in response.data['data']:
+            self.assertEqual(item['comment_count'], expected_counts[item['id']])
+            self.assertEqual(
+                [comment['comment'] for comment in item['comments']],
+                [f'Comment {expected_counts[item["id"]] - 1}', f'Comment {expected_counts[item["id"]] - 2}']
+            )
+    
+    def test_comment_queries_constant_per_page(self):
+        """Test that the number of queries does not grow with page size."""
+        _, small_count = self._fetch(limit=2)
+        _, large_count = self._fetch(limit=6)
+        
+        self.assertEqual(small_count, large_count)
+    
+    def test_new_comment_refreshes_cached_list(self):
+        """Test that posting a comment invalidates the cached comment count."""
+        contribution = self.contributions[0]
+        self.client.get(self.all_contributions_url)
+        
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(
+            reverse('contribution-comments'),
+            {'contribution': str(contribution.id), 'comment': 'Fresh comment'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        response = self.client.get(self.all_contributions_url)
+        item = next(item for item in response.data['data'] if item['id'] == str(contribution.id))
+        self.assertEqual(item['comment_count'], 5)
+        self.assertEqual(item['comments'][0]['comment'], 'Fresh comment')
+
+
+class ContributionCommentPaginationTest(APITestCase):
+    """Test cases for keyset pagination of the comments endpoint."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            username='pagedcommenter',
+            email='pagedcommenter@example.com',
+            password='TestPassword123'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        self.contribution = Contributions.objects.create(title='Discussed Contribution')
+        self.other = Contributions.objects.create(title='Other Contribution')
+        for i in range(7):
+            ContributionsComments.objects.create(contribution=self.contribution, user=self.user, comment=f'Comment {i}')
+        ContributionsComments.objects.create(contribution=self.other, user=self.user, comment='Elsewhere')
+        
+        self.expected_order = [
+            str(pk) for pk in ContributionsComments.objects.filter(
+                contribution=self.contribution
+            ).order_by('-created_at', '-id').values_list('id', flat=True)
+        ]
+        self.comments_url = reverse('contribution-comments', kwargs={'contribution_id': self.contribution.id})
+    
+    def test_comment_pages_walk_forward_and_back(self):
+        """Test that a contribution's comments are served newest first in consecutive pages."""
+        seen = []
+        params = {'limit': 3}
+        while True:
+            response = self.client.get(self.comments_url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(item['id'] for item in response.data['data'])
+            next_cursor = response.data['pagination']['next_cursor']
+            if not next_cursor:
+                break
+            params = {'limit': 3, 'cursor': next_cursor}
+        self.assertEqual(seen, self.expected_order)
+        
+        previous_cursor = response.data['pagination']['previous_cursor']
+        response = self.client.get(self.comments_url, {'limit': 3, 'cursor': previous_cursor})
+        self.assertEqual([item['id'] for item in response.data['data']], self.expected_order[3:6])
+    
+    def test_all_comments_feed_is_bounded(self):
+        """Test that the unscoped feed returns one page instead of the whole table."""
+        response = self.client.get(reverse('contribution-comments'), {'limit': 5})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['data']), 5)
+        self.assertIsNotNone(response.data['pagination']['next_cursor'])
+    
+    def test_invalid_cursor_rejected(self):
+        """Test that a malformed cursor returns a 400 error."""
+        response = self.client.get(self.comments_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_comment_page_uses_composite_index(self):
+        """Test that a page is read from the index in order, without sorting."""
+        queryset = ContributionsComments.objects.filter(
+            contribution=self.contribution
+        ).order_by('-created_at', '-id')[:10]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        
+        self.assertIn('USING INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class SparseFieldsetTest(APITestCase):
+    """Test cases for ?fields= and ?exclude= on contribution endpoints."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='sparseuser',
+            email='sparse@example.com',
+            password='TestPassword123'
+        )
+        self.university = University.objects.create(id=uuid4(), name='Sparse University')
+        self.contribution = Contributions.objects.create(
+            title='Sparse Contribution',
+            description='Long description',
+            price=10,
+            user=self.user,
+            related_University=self.university
+        )
+        self.contribution.tags.add(ContributionTags.objects.create(name='Sparse Tag'))
+        ContributionsComments.objects.create(contribution=self.contribution, user=self.user, comment='Hi')
+        
+        self.all_contributions_url = reverse('all-contributions')
+    
+    def test_fields_prune_payload_and_queries(self):
+        """Test that only requested fields are returned and skipped relations are not queried."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.all_contributions_url, {'fields': 'id,title,price,rating'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['data'][0]), {'id', 'title', 'price', 'rating'})
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertNotIn('api_contributiontags', sql)
+        self.assertNotIn('api_contributionscomments', sql)
+        self.assertNotIn('api_university', sql)
+    
+    def test_exclude_drops_fields(self):
+        """Test that excluded fields are removed from list and detail responses."""
+        response = self.client.get(self.all_contributions_url, {'exclude': 'description,comments'})
+        item = response.data['data'][0]
+        self.assertNotIn('description', item)
+        self.assertNotIn('comments', item)
+        self.assertIn('tags', item)
+        
+        detail_url = reverse('contribution-detail', kwargs={'pk': self.contribution.id})
+        response = self.client.get(detail_url, {'fields': 'title'})
+        self.assertEqual(response.data['data'], {'title': 'Sparse Contribution'})
+    
+    def test_cache_key_follows_fieldset(self):
+        """Test that different fieldsets are cached separately and equivalent ones share an entry."""
+        narrow = self.client.get(self.all_contributions_url, {'fields': 'id,title'})
+        full = self.client.get(self.all_contributions_url)
+        reordered = self.client.get(self.all_contributions_url, {'fields': 'title,id'})
+        
+        self.assertEqual(set(narrow.data['data'][0]), {'id', 'title'})
+        self.assertIn('tags', full.data['data'][0])
+        # The equivalent fieldset is a cache hit, served as the same bytes
+        self.assertEqual(reordered.content, narrow.content)
+        
+        key = AllContributionView().get_cached_key({'fields': 'title,id'}, ['id', 'title'])
+        self.assertTrue(key.endswith('fields:id,title'))
+    
+    def test_unknown_field_rejected(self):
+        """Test that an unknown field returns a 400 error."""
+        response = self.client.get(self.all_contributions_url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_user_contributions_fields(self):
+        """Test that the user's own contributions honour the fieldset."""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('contributions'), {'fields': 'id,title,tags'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item = response.data['data'][0]
+        self.assertEqual(set(item), {'id', 'title', 'tags'})
+        self.assertEqual(item['tags'][0]['name'], 'Sparse Tag')
+
+
+class ContributionFacetTest(APITestCase):
+    """Test cases for the incrementally maintained contribution facet counts."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.university_a = University.objects.create(id=uuid4(), name='University A')
+        self.university_b = University.objects.create(id=uuid4(), name='University B')
+        self.department = Department.objects.create(id=uuid4(), name='Department')
+        self.python = ContributionTags.objects.create(name='Python')
+        self.sql = ContributionTags.objects.create(name='SQL')
+        
+        self.first = Contributions.objects.create(
+            title='First', related_University=self.university_a, related_Department=self.department
+        )
+        self.second = Contributions.objects.create(title='Second', related_University=self.university_a)
+        self.third = Contributions.objects.create(title='Third', related_University=self.university_b)
+        self.first.tags.add(self.python, self.sql)
+        self.second.tags.add(self.python)
+        self.sql.contributions.add(self.third)
+        
+        self.facets_url = reverse('contribution-facets')
+    
+    def _facets(self, **params):
+        response = self.client.get(self.facets_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data['data']
+        return {
+            'total': data['total'],
+            'university': {item['name']: item['count'] for item in data['university']},
+            'department': {item['name']: item['count'] for item in data['department']},
+            'tag': {item['name']: item['count'] for item in data['tag']},
+        }
+    
+    def _rebuilt_facets(self, **params):
+        rebuild_facet_counts()
+        return self._facets(**params)
+    
+    def test_facet_counts_for_filters(self):
+        """Test unfiltered and filtered facet counts."""
+        facets = self._facets()
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual(facets['university'], {'University A': 2, 'University B': 1})
+        self.assertEqual(facets['department'], {'Department': 1})
+        self.assertEqual(facets['tag'], {'Python': 2, 'SQL': 2})
+        
+        facets = self._facets(university=str(self.university_a.id))
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['tag'], {'Python': 2, 'SQL': 1})
+        
+        facets = self._facets(tag='sql')
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['university'], {'University A': 1, 'University B': 1})
+    
+    def test_counts_follow_changes(self):
+        """Test that moves, tag removals and deletes update the counts like a full rebuild."""
+        self.second.related_University = self.university_b
+        self.second.save()
+        self.first.tags.remove(self.sql, self.python)
+        self.python.contributions.remove(self.third)  # Not tagged, must not change counts
+        self.third.delete()
+        
+        facets = self._facets()
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['university'], {'University A': 1, 'University B': 1})
+        self.assertEqual(facets['tag'], {'Python': 1})
+        self.assertEqual(facets, self._rebuilt_facets())
+    
+    def test_facet_queries_do_not_scan_contributions(self):
+        """Test that facets are read from the counts table only."""
+        with CaptureQueriesContext(connection) as context:
+            self._facets(university=str(self.university_a.id))
+        for query in context.captured_queries:
+            self.assertNotIn('"api_contributions"', query['sql'])
+    
+    def test_invalid_filter_rejected(self):
+        """Test that a malformed ID returns a 400 error."""
+        response = self.client.get(self.facets_url, {'university': 'not-a-uuid'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AllContributionCountModeTest(APITestCase):
+    """Test cases for the count=exact|estimate|none modes of AllContributionView."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.user = User.objects.create_user(
+            username='countuser',
+            email='count@example.com',
+            password='TestPassword123'
+        )
+        self.university = University.objects.create(id=uuid4(), name='Count University')
+        for i in range(5):
+            Contributions.objects.create(
+                title=f'Contribution {i}',
+                user=self.user if i < 2 else None,
+                related_University=self.university if i % 2 == 0 else None
+            )
+        self.all_contributions_url = reverse('all-contributions')
+    
+    def _get(self, **params):
+        # A fresh parameter misses the cached page but not the cached count
+        self.request_number = getattr(self, 'request_number', 0) + 1
+        params['_'] = self.request_number
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.all_contributions_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        count_queries = [
+            query for query in app_queries(context)
+            if query['sql'].startswith('SELECT COUNT(')
+        ]
+        return response.data['pagination'], count_queries
+    
+    def test_estimate_comes_from_counters(self):
+        """Test that the default estimate is read from the facet counters, not COUNT(*) on contributions."""
+        pagination, count_queries = self._get(university=str(self.university.id), limit=2)
+        
+        self.assertEqual(pagination['count'], 3)
+        self.assertEqual(pagination['count_mode'], 'estimate')
+        self.assertIsNotNone(pagination['next'])
+        for query in count_queries:
+            self.assertNotIn('"api_contributions"', query['sql'])
+    
+    def test_exact_count_cached_per_filter_set(self):
+        """Test that exact counts are computed once and shared by every page."""
+        pagination, count_queries = self._get(user=str(self.user.id), count='exact')
+        self.assertEqual(pagination['count'], 2)
+        self.assertEqual(len(count_queries), 1)
+        
+        pagination, count_queries = self._get(user=str(self.user.id), count='exact', offset=1)
+        self.assertEqual(pagination['count'], 2)
+        self.assertEqual(count_queries, [])
+        
+        # Uncovered filters estimate from the cached exact count
+        pagination, _ = self._get(user=str(self.user.id))
+        self.assertEqual(pagination['count'], 2)
+    
+    def test_estimate_falls_back_to_exact_count_before_counters_are_built(self):
+        """Test that a database upgraded without rebuild_facet_counts doesn't report 0 contributions."""
+        ContributionFacetCount.objects.all().delete()
+        
+        pagination, count_queries = self._get(university=str(self.university.id))
+        self.assertEqual(pagination['count'], 3)
+        self.assertEqual(len(count_queries), 1)
+        
+        rebuild_facet_counts()
+        pagination, count_queries = self._get(university=str(uuid4()))
+        self.assertEqual(pagination['count'], 0)
+        for query in count_queries:
+            self.assertNotIn('"api_contributions"', query['sql'])
+    
+    def test_estimate_without_counter_or_cache_is_null(self):
+        """Test that an uncovered filter set never blocks on COUNT(*) by default."""
+        pagination, count_queries = self._get(user=str(self.user.id), limit=1)
+        
+        self.assertIsNone(pagination['count'])
+        self.assertEqual(count_queries, [])
+        self.assertIsNotNone(pagination['next'])
+    
+    def test_count_none_and_invalid_mode(self):
+        """Test that count=none skips the count and unknown modes are rejected."""
+        pagination, _ = self._get(count='none')
+        self.assertIsNone(pagination['count'])
+        
+        response = self.client.get(self.all_contributions_url, {'count': 'maybe'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AllContributionOrderingTest(APITestCase):
+    """Test cases for ?ordering= on AllContributionView."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        prices = [30, 10, None, 20, 10, 40, None]
+        ratings = [4.5, None, 3.0, 5.0, 3.0, None, 1.0]
+        self.contributions = [
+            Contributions.objects.create(title=f'Contribution {i}', price=price, rating=rating)
+            for i, (price, rating) in enumerate(zip(prices, ratings))
+        ]
+        
+        for i in range(3):
+            user = User.objects.create_user(
+                username=f'student{i}', email=f'student{i}@example.com', password='TestPassword123'
+            )
+            for contribution in self.contributions[:i + 1]:
+                Enrollment.objects.create(
+                    user=user, contribution=contribution, amount_paid=0, payment_status='COMPLETED'
+                )
+        # A pending enrollment does not count towards popularity
+        Enrollment.objects.create(
+            user=user, contribution=self.contributions[6], amount_paid=0, payment_status='PENDING'
+        )
+        
+        self.all_contributions_url = reverse('all-contributions')
+    
+    def _expected(self, ordering):
+        field = {'popularity': 'enrollment_count'}.get(ordering.lstrip('-'), ordering.lstrip('-'))
+        return [
+            str(pk) for pk in Contributions.objects.order_by(
+                *keyset_order_by(Contributions, field, ordering.startswith('-'))
+            ).values_list('id', flat=True)
+        ]
+    
+    def _walk(self, ordering, mode):
+        """Collect every page of a listing, following next links or cursors."""
+        seen = []
+        params = {'ordering': ordering, 'limit': 2}
+        if mode == 'cursor':
+            params['pagination'] = 'cursor'
+        while True:
+            response = self.client.get(self.all_contributions_url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(item['id'] for item in response.data['data'])
+            pagination = response.data['pagination']
+            if mode == 'cursor':
+                if not pagination['next_cursor']:
+                    return seen
+                params = {'ordering': ordering, 'limit': 2, 'cursor': pagination['next_cursor']}
+            else:
+                if not pagination['next']:
+                    return seen
+                params = {'ordering': ordering, 'limit': 2, 'offset': pagination['offset'] + 2}
+    
+    def test_orderings_in_both_pagination_modes(self):
+        """Test that every ordering pages through all rows, including NULL values, in order."""
+        for ordering in ('rating', '-rating', 'price', '-price', 'created_at', '-popularity'):
+            expected = self._expected(ordering)
+            for mode in ('offset', 'cursor'):
+                with self.subTest(ordering=ordering, mode=mode):
+                    self.assertEqual(self._walk(ordering, mode), expected)
+    
+    def test_popularity_counts_completed_enrollments(self):
+        """Test that the popularity column follows enrollment status changes."""
+        self.contributions[0].refresh_from_db()
+        self.assertEqual(self.contributions[0].enrollment_count, 3)
+        self.contributions[6].refresh_from_db()
+        self.assertEqual(self.contributions[6].enrollment_count, 0)
+        
+        pending = Enrollment.objects.get(contribution=self.contributions[6])
+        pending.payment_status = 'COMPLETED'
+        pending.save()
+        Enrollment.objects.filter(contribution=self.contributions[0]).first().delete()
+        
+        self.contributions[6].refresh_from_db()
+        self.contributions[0].refresh_from_db()
+        self.assertEqual(self.contributions[6].enrollment_count, 1)
+        self.assertEqual(self.contributions[0].enrollment_count, 2)
+    
+    def test_cursor_from_other_ordering_rejected(self):
+        """Test that a cursor only works with the ordering it was issued for."""
+        response = self.client.get(
+            self.all_contributions_url, {'ordering': 'price', 'pagination': 'cursor', 'limit': 2}
+        )
+        cursor = response.data['pagination']['next_cursor']
+        
+        response = self.client.get(self.all_contributions_url, {'ordering': 'rating', 'cursor': cursor})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_invalid_ordering_rejected(self):
+        """Test that orderings outside the whitelist return a 400 error."""
+        for ordering in ('title', '--price'):
+            response = self.client.get(self.all_contributions_url, {'ordering': ordering})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_orderings_read_from_index(self):
+        """Test that deep pages of every ordering are read from an index without a sort."""
+        for field in ('created_at', 'rating', 'price', 'enrollment_count'):
+            for descending in (False, True):
+                queryset = Contributions.objects.order_by(
+                    *keyset_order_by(Contributions, field, descending)
+                )[1000:1010]
+                sql, params = queryset.query.sql_with_params()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                    plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+                with self.subTest(field=field, descending=descending):
+                    self.assertIn('USING INDEX', plan)
+                    self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_cursor_pages_read_index_ranges(self):
+        """Test that every cursor page, forwards and backwards across the NULL block, is an index range without a sort."""
+        factory = APIRequestFactory()
+        for field in ('created_at', 'rating', 'price', 'enrollment_count'):
+            for ordering in (field, f'-{field}'):
+                paginator = ContributionCursorPagination(ordering)
+                paginator.paginate_queryset(Contributions.objects.all(), Request(factory.get('/', {'limit': 2})))
+                cursors = [paginator.get_next_cursor()]
+                seen = []
+                with CaptureQueriesContext(connection) as context:
+                    while cursors:
+                        request = Request(factory.get('/', {'limit': 2, 'cursor': cursors.pop()}))
+                        paginator = ContributionCursorPagination(ordering)
+                        seen.extend(row.pk for row in paginator.paginate_queryset(Contributions.objects.all(), request))
+                        if paginator.get_next_cursor():
+                            cursors.append(paginator.get_next_cursor())
+                # Walking back from the last page returns every row after the first page in order
+                expected = [row.pk for row in Contributions.objects.order_by(
+                    *keyset_order_by(Contributions, field, ordering.startswith('-'))
+                )]
+                self.assertEqual(seen, expected[2:])
+                
+                with CaptureQueriesContext(connection) as back_context:
+                    request = Request(factory.get('/', {'limit': 2, 'cursor': paginator.get_previous_cursor()}))
+                    ContributionCursorPagination(ordering).paginate_queryset(Contributions.objects.all(), request)
+                
+                for query in context.captured_queries + back_context.captured_queries:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                        plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+                    with self.subTest(ordering=ordering, sql=query['sql']):
+                        self.assertIn('SEARCH', plan)
+                        self.assertIn('INDEX', plan)
+                        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class AllContributionRangeFilterTest(APITestCase):
+    """Test cases for the price and rating filters of AllContributionView."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.university = University.objects.create(id=uuid4(), name='Range University')
+        rows = [
+            ('Free', 0, 4.0, self.university),
+            ('No Price', None, None, None),
+            ('Cheap', 5, 2.5, self.university),
+            ('Mid', 20, 4.8, None),
+            ('Expensive', 100, 3.9, self.university),
+        ]
+        for title, price, rating, university in rows:
+            Contributions.objects.create(title=title, price=price, rating=rating, related_University=university)
+        
+        self.all_contributions_url = reverse('all-contributions')
+    
+    def _titles(self, **params):
+        response = self.client.get(self.all_contributions_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return sorted(item['title'] for item in response.data['data'])
+    
+    def test_price_and_rating_filters(self):
+        """Test each filter on its own and combined with a university filter."""
+        self.assertEqual(self._titles(min_price=5, max_price=20), ['Cheap', 'Mid'])
+        self.assertEqual(self._titles(min_rating='3.9'), ['Expensive', 'Free', 'Mid'])
+        self.assertEqual(self._titles(free_only='true'), ['Free', 'No Price'])
+        self.assertEqual(
+            self._titles(university=str(self.university.id), max_price=50, min_rating=3),
+            ['Free']
+        )
+    
+    def test_filters_reported_and_counted(self):
+        """Test that range filters are echoed back and counted exactly, not estimated from counters."""
+        response = self.client.get(self.all_contributions_url, {'max_price': '10', 'count': 'exact'})
+        
+        self.assertEqual(response.data['filters_applied']['max_price'], 10)
+        self.assertEqual(response.data['pagination']['count'], 2)
+        
+        response = self.client.get(self.all_contributions_url, {'min_rating': '4'})
+        self.assertIsNone(response.data['pagination']['count'])
+    
+    def test_invalid_values_rejected(self):
+        """Test that malformed or out of range values return a 400 error."""
+        for params in ({'min_price': 'cheap'}, {'max_price': '-1'}, {'min_rating': '6'}, {'min_price': 'NaN'}):
+            response = self.client.get(self.all_contributions_url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+    
+    def _plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' | '.join(str(row[-1]) for row in cursor.fetchall())
+    
+    def _filtered(self, **range_filters):
+        return AllContributionView()._apply_range_filters(Contributions.objects.all(), range_filters)
+    
+    def test_filters_use_index_search(self):
+        """Test that every filter is answered by an index search rather than a full table scan."""
+        # Each case pairs the filters with the ordering a client would page them in
+        cases = {
+            'price range': (self._filtered(min_price=Decimal(5), max_price=Decimal(20)), 'price'),
+            'min rating': (self._filtered(min_rating=Decimal(4)), '-rating'),
+            'free only': (self._filtered(free_only=True), 'price'),
+            'university and price': (
+                self._filtered(max_price=Decimal(50)).filter(related_University=self.university), 'price'
+            ),
+            'university and rating': (
+                self._filtered(min_rating=Decimal(3)).filter(related_University=self.university), '-rating'
+            ),
+        }
+        for name, (queryset, ordering) in cases.items():
+            page = queryset.order_by(ordering, ordering.replace('rating', 'id').replace('price', 'id'))[:10]
+            for label, query in (('filter', queryset.values('id')), ('page', page)):
+                plan = self._plan(query)
+                with self.subTest(case=name, query=label, plan=plan):
+                    self.assertIn('SEARCH api_contributions USING', plan)
+                    self.assertNotIn('SCAN api_contributions', plan)
+                    # free_only is two index searches (price = 0, price IS NULL), merged and sorted
+                    if label == 'page' and name != 'free only':
+                        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class ConditionalGetTest(APITestCase):
+    """Test cases for ETag / If-None-Match handling."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.user = User.objects.create_user('etaguser', 'etag@example.com', 'password123')
+        self.university = University.objects.create(id=uuid4(), name='ETag University')
+        self.contribution = Contributions.objects.create(
+            user=self.user, title='ETag Contribution', related_University=self.university
+        )
+        self.client.force_authenticate(user=self.user)
+    
+    def _assert_revalidates(self, url, params=None):
+        """Fetch url, then replay its ETag and expect an empty 304. Returns the ETag."""
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Authorization', response['Vary'])
+        
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+        
+        # Weak validators and lists of tags match too
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        return etag
+    
+    def test_contribution_list(self):
+        """Test that a listing revalidates until a contribution changes."""
+        url = reverse('all-contributions')
+        etag = self._assert_revalidates(url, {'limit': 5})
+        
+        # A 304 is answered from the generation counter alone
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'limit': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(app_queries(queries), [])
+        
+        # Other parameters are other representations
+        response = self.client.get(url, {'limit': 5, 'fields': 'id'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        Contributions.objects.create(title='Newer')
+        response = self.client.get(url, {'limit': 5}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_contribution_detail(self):
+        """Test that a detail revalidates until it is rated or its taxonomy is renamed."""
+        url = reverse('contribution-detail', args=[str(self.contribution.id)])
+        etag = self._assert_revalidates(url)
+        
+        ContributionRatings.objects.create(user=self.user, contribution=self.contribution, rating=4)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(float(response.data['data']['rating']), 4.0)
+        
+        # The ETag belongs to one user's view of the contribution
+        self.client.force_authenticate(user=User.objects.create_user('other', 'other@example.com', 'password123'))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_missing_contribution_is_not_tagged(self):
+        """Test that error responses carry no ETag."""
+        response = self.client.get(reverse('contribution-detail', args=[str(uuid4())]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(response.has_header('ETag'))
+    
+    def test_taxonomy(self):
+        """Test that taxonomy lists and items revalidate until the taxonomy changes."""
+        list_url = reverse('universities')
+        detail_url = reverse('university-detail', args=[self.university.id])
+        list_etag = self._assert_revalidates(list_url)
+        detail_etag = self._assert_revalidates(detail_url)
+        self._assert_revalidates(reverse('departments'))
+        self._assert_revalidates(reverse('major-subjects'))
+        
+        # Departments are versioned separately
+        Department.objects.create(name='New Department')
+        self.assertEqual(
+            self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag).status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+        
+        self.university.name = 'Renamed University'
+        self.university.save()
+        for url, etag in ((list_url, list_etag), (detail_url, detail_etag)):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['data']['name'], 'Renamed University')
+    
+    def test_user_info(self):
+        """Test that the profile revalidates until the user or their university changes."""
+        url = reverse('user-info')
+        etag = self._assert_revalidates(url)
+        
+        response = self.client.put(url, {'university': str(self.university.id)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        
+        self.university.name = 'Renamed University'
+        self.university.save()
+        # Real requests load the user afresh; the forced one caches its old university
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['university']['name'], 'Renamed University')
+
+
+class CachedResponseBytesTest(APITestCase):
+    """Test cases for serving contribution listings from cached response bytes."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        
+        self.user = User.objects.create_user('bytesuser', 'bytes@example.com', 'password123')
+        for index in range(5):
+            Contributions.objects.create(title=f'Cached Contribution {index}', description='x' * 200)
+        self.all_contributions_url = reverse('all-contributions')
+    
+    def test_hit_serves_stored_bytes(self):
+        """Test that a cache hit returns the miss's exact body without touching the database."""
+        miss = self.client.get(self.all_contributions_url, {'limit': 3})
+        with CaptureQueriesContext(connection) as queries:
+            hit = self.client.get(self.all_contributions_url, {'limit': 3})
+        
+        self.assertEqual(app_queries(queries), [])
+        self.assertEqual(hit.status_code, status.HTTP_200_OK)
+        self.assertEqual(hit['Content-Type'], 'application/json')
+        self.assertEqual(hit.content, miss.content)
+        self.assertEqual(hit['ETag'], miss['ETag'])
+        self.assertEqual(json.loads(hit.content), miss.data)
+    
+    @override_settings(CACHED_RESPONSE_GZIP=True)
+    def test_gzip_copy(self):
+        """Test that clients accepting gzip get the pre-compressed body."""
+        plain = self.client.get(self.all_contributions_url)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        
+        for _ in range(2):  # Cache miss, then cache hit
+            response = self.client.get(self.all_contributions_url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(int(response['Content-Length']), len(response.content))
+            self.assertEqual(gzip.decompress(response.content), plain.content)
+    
+    @override_settings(CACHED_RESPONSE_GZIP=True)
+    def test_gzip_copy_has_its_own_etag(self):
+        """Test that the gzipped and identity bodies carry different ETags, each matched on its own."""
+        plain = self.client.get(self.all_contributions_url)
+        gzipped = self.client.get(self.all_contributions_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertNotEqual(gzipped['ETag'], plain['ETag'])
+        
+        response = self.client.get(self.all_contributions_url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=plain['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], gzipped['ETag'])
+        response = self.client.get(self.all_contributions_url, HTTP_IF_NONE_MATCH=gzipped['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['ETag'], plain['ETag'])
+        
+        response = self.client.get(self.all_contributions_url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzipped['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], gzipped['ETag'])
+        response = self.client.get(self.all_contributions_url, HTTP_IF_NONE_MATCH=plain['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        # A page too short to compress is served, and revalidated, as it is
+        with mock.patch('api.cache_utils.GZIP_MIN_LENGTH', 10 ** 6):
+            short = self.client.get(self.all_contributions_url, {'limit': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(short.has_header('Content-Encoding'))
+        self.assertEqual(short['ETag'], self.client.get(self.all_contributions_url, {'limit': 1})['ETag'])
+        response = self.client.get(
+            self.all_contributions_url, {'limit': 1}, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=short['ETag']
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    @override_settings(CACHED_RESPONSE_GZIP=False)
+    def test_gzip_disabled(self):
+        """Test that no compressed copy is kept when CACHED_RESPONSE_GZIP is off."""
+        response = self.client.get(self.all_contributions_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+    
+    def test_enrollment_state_not_shared(self):
+        """Test that a page cached for one user is not served to another."""
+        contribution = Contributions.objects.get(title='Cached Contribution 0')
+        Enrollment.objects.create(user=self.user, contribution=contribution, amount_paid=10, payment_status='COMPLETED')
+        
+        self.client.force_authenticate(user=self.user)
+        self.client.get(self.all_contributions_url, {'limit': 10})
+        response = self.client.get(self.all_contributions_url, {'limit': 10})
+        enrolled = {item['title'] for item in json.loads(response.content)['data'] if item['is_enrolled']}
+        self.assertEqual(enrolled, {'Cached Contribution 0'})
+        
+        self.client.force_authenticate(user=None)
+        response = self.client.get(self.all_contributions_url, {'limit': 10})
+        self.assertFalse(any(item['is_enrolled'] for item in json.loads(response.content)['data']))
+        
+        # Pages without user-dependent fields are shared
+        view = AllContributionView()
+        self.assertEqual(
+            view.get_cached_key({}, ['id', 'title'], None),
+            view.get_cached_key({}, ['id', 'title'])
+        )
+        self.assertIn(f'user:{self.user.id}', view.get_cached_key({}, None, self.user.id))
+
+
+class CacheRebuildTest(APITestCase):
+    """Test cases for single-flight cache rebuilds and early refresh."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.builds = []
+    
+    def _build(self, value='fresh', delay=0):
+        def build():
+            self.builds.append(value)
+            time.sleep(delay)
+            return value
+        return build
+    
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_concurrent_misses_build_once(self):
+        """Test that concurrent requests for a missing key run the builder once."""
+        results = []
+        def request():
+            results.append(get_or_build('rebuild:test', self._build(delay=0.3), 60))
+        
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(self.builds, ['fresh'])
+        self.assertEqual(results, ['fresh'] * 5)
+    
+    def test_stale_copy_served_during_rebuild(self):
+        """Test that an expired copy is served while another request holds the rebuild lock."""
+        cache.set('rebuild:test', {'value': 'stale', 'expires': time.time() - 1, 'build_time': 0.1}, timeout=60)
+        cache.add('rebuild:test:rebuild', 'other-builder', timeout=60)
+        
+        self.assertEqual(get_or_build('rebuild:test', self._build(), 60), 'stale')
+        self.assertEqual(self.builds, [])
+        
+        cache.delete('rebuild:test:rebuild')
+        self.assertEqual(get_or_build('rebuild:test', self._build(), 60), 'fresh')
+        self.assertIsNone(cache.get('rebuild:test:rebuild'))
+    
+    def test_early_refresh(self):
+        """Test that a copy close to expiry is rebuilt early with a probability that grows with build time."""
+        # 5 seconds left on a copy that took 1 second to build
+        cache.set('rebuild:test', {'value': 'old', 'expires': time.time() + 5, 'build_time': 1.0}, timeout=60)
+        
+        with mock.patch('api.cache_utils.random.random', return_value=0.5):
+            self.assertEqual(get_or_build('rebuild:test', self._build(), 60), 'old')
+        with mock.patch('api.cache_utils.random.random', return_value=0.999):
+            self.assertEqual(get_or_build('rebuild:test', self._build(), 60), 'fresh')
+        self.assertEqual(self.builds, ['fresh'])
+    
+    def test_errors_not_cached(self):
+        """Test that invalid listing parameters are reported and leave no cache entry or lock behind."""
+        url = reverse('all-contributions')
+        for _ in range(2):
+            response = self.client.get(url, {'count': 'bogus'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.get(url, {'pagination': 'cursor', 'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._cache_keys(':rebuild'), [])
+    
+    def _cache_keys(self, suffix):
+        cache_table = connection.ops.quote_name(settings.CACHES['default']['LOCATION'])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT cache_key FROM {cache_table} WHERE cache_key LIKE %s", [f'%{suffix}'])
+            return [row[0] for row in cursor.fetchall()]
+    
+    def test_rebuild_lock_is_shared_between_processes(self):
+        """Test that the rebuild lock is held in the shared cache table, where every worker process sees it."""
+        locks = []
+        def build():
+            locks.extend(self._cache_keys('rebuild:test:rebuild'))
+            return 'fresh'
+        
+        self.assertEqual(get_or_build('rebuild:test', build, 60), 'fresh')
+        self.assertEqual(len(locks), 1)
+        self.assertEqual(self._cache_keys('rebuild:test:rebuild'), [])
+
+
+class WarmCachesTest(APITestCase):
+    """Test cases for the warm_caches management command and startup hook."""
+    
+    def setUp(self):
+        """Set up test data."""
+        self.university = University.objects.create(id=uuid4(), name='Warm University')
+        self.contributions = [
+            Contributions.objects.create(title=f'Warm {index}', related_University=self.university)
+            for index in range(3)
+        ]
+        cache.clear()
+    
+    def test_command_fills_view_cache(self):
+        """Test that warmed pages and details are then served from the shared cache without queries."""
+        out = StringIO()
+        call_command('warm_caches', '--details', '2', '--origin', 'http://testserver', stdout=out)
+        output = out.getvalue()
+        self.assertIn('list: 3 warmed', output)
+        self.assertIn('detail: 2 warmed', output)
+        self.assertIn('Warmed 5 cache entries', output)
+        
+        # Entries are in the shared cache, not only in the memory of the process that warmed them
+        tiered_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            for params in ({}, {'university': str(self.university.id)}):
+                response = self.client.get(reverse('all-contributions'), params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+            response = self.client.get(reverse('contribution-detail', args=[str(self.contributions[-1].id)]))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(app_queries(queries), [])
+    
+    def test_startup_hook_runs_once(self):
+        """Test that the first request starts one background warm-up using its origin."""
+        request_started.connect(warming.warm_on_first_request, dispatch_uid='api.warm_caches')
+        environ = {'HTTP_HOST': 'api.example.com', 'wsgi.url_scheme': 'https'}
+        with mock.patch.object(warming, '_startup_warmed', False), \
+                mock.patch('api.warming.threading.Thread') as thread:
+            warming.warm_on_first_request(sender=None, environ=environ)
+            warming.warm_on_first_request(sender=None, environ=environ)
+        
+        thread.assert_called_once_with(
+            target=warming._warm_in_background, args=('https://api.example.com',), daemon=True
+        )
+        self.assertFalse(request_started.disconnect(dispatch_uid='api.warm_caches'))
+    
+    def test_pages_are_cached_per_origin(self):
+        """Test that cached pagination links point at the origin of the client being served."""
+        for index in range(10):
+            Contributions.objects.create(title=f'More {index}')
+        call_command('warm_caches', '--details', '0', '--origin', 'https://api.example.com', stdout=StringIO())
+        url = reverse('all-contributions')
+        
+        origins = (('testserver', False, 'http://testserver/'), ('api.example.com', True, 'https://api.example.com/'))
+        for host, secure, origin in origins:
+            for _ in range(2):  # Cache miss or warmed entry, then cache hit
+                response = self.client.get(url, HTTP_HOST=host, secure=secure)
+                self.assertTrue(json.loads(response.content)['pagination']['next'].startswith(origin))
+    
+    @override_settings(WARM_CACHES_ORIGIN=None)
+    def test_command_requires_origin(self):
+        """Test that warming without an origin fails instead of caching pages linking to the wrong host."""
+        with self.assertRaises(CommandError):
+            call_command('warm_caches', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('warm_caches', '--origin', 'api.example.com', stdout=StringIO())
+
+
+class TieredCacheTest(APITestCase):
+    """Test cases for the in-process cache tier in front of the shared cache."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        tiered_cache.clear()
+        tiered_cache.reset_stats()
+        self.builds = 0
+    
+    def _build(self):
+        self.builds += 1
+        return {'build': self.builds}
+    
+    def _get(self, key='tier:test', namespace='tier_namespace'):
+        return tiered_cache.get_or_build(key, namespace, self._build, 60)
+    
+    def test_local_hit_skips_shared_cache(self):
+        """Test that a fresh local copy is served without any shared cache access."""
+        first = self._get()
+        with mock.patch('api.cache_utils.cache') as shared:
+            self.assertIs(self._get(), first)
+        self.assertFalse(shared.method_calls)
+        
+        stats = tiered_cache.stats()
+        self.assertEqual(stats['local'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+        self.assertEqual(stats['shared'], {'hits': 0, 'misses': 1, 'hit_ratio': 0.0})
+    
+    @override_settings(LOCAL_CACHE_TTL=0)
+    def test_version_stamp_revalidation(self):
+        """Test that expired local copies are revalidated by generation, not refetched."""
+        self.assertEqual(self._get(), {'build': 1})
+        self.assertEqual(self._get(), {'build': 1})
+        
+        # Another process bumps the generation; this process's copy is not discarded, only outdated
+        cache.incr('cache_generation:tier_namespace')
+        self.assertEqual(self._get(), {'build': 2})
+        
+        # A second process with an empty local tier reuses the shared copy
+        tiered_cache.clear()
+        self.assertEqual(self._get(), {'build': 2})
+        self.assertEqual(tiered_cache.stats()['shared']['hits'], 1)
+        self.assertEqual(self.builds, 2)
+    
+    def test_local_bump_discards_at_once(self):
+        """Test that a write in this process is visible to its next read even within the TTL."""
+        self._get()
+        bump_cache_generation('tier_namespace')
+        self.assertEqual(self._get(), {'build': 2})
+    
+    def test_local_copy_expires_with_shared_copy(self):
+        """Test that a local copy is dropped once its shared copy's timeout passes, even without a bump."""
+        self.assertEqual(tiered_cache.get_or_build('tier:test', 'tier_namespace', self._build, 0), {'build': 1})
+        self.assertEqual(tiered_cache.get_or_build('tier:test', 'tier_namespace', self._build, 0), {'build': 2})
+        self.assertEqual(tiered_cache.get_or_build('tier:test', 'tier_namespace', self._build, 60), {'build': 3})
+        self.assertEqual(tiered_cache.get_or_build('tier:test', 'tier_namespace', self._build, 60), {'build': 3})
+    
+    @override_settings(CACHE_TIMEOUTS={**settings.CACHE_TIMEOUTS, 'contribution_detail': 0})
+    def test_detail_rename_without_signal_shows_after_timeout(self):
+        """Test that a rename made without signals shows on the detail page once CACHE_TIMEOUTS expires."""
+        university = University.objects.create(name='Old Uni')
+        contribution = Contributions.objects.create(title='Renamed Detail', related_University=university)
+        url = reverse('contribution-detail', args=[str(contribution.id)])
+        self.assertEqual(self.client.get(url).json()['data']['related_University']['name'], 'Old Uni')
+        
+        University.objects.filter(pk=university.pk).update(name='New Uni')
+        self.assertEqual(self.client.get(url).json()['data']['related_University']['name'], 'New Uni')
+    
+    @override_settings(LOCAL_CACHE_MAX_ENTRIES=2)
+    def test_lru_bound(self):
+        """Test that the least recently used entry is evicted first."""
+        self._get('tier:a')
+        self._get('tier:b')
+        self._get('tier:a')
+        self._get('tier:c')
+        self.assertEqual(list(tiered_cache._entries), ['tier:a', 'tier:c'])
+        self.assertEqual(tiered_cache.stats()['local_entries'], 2)
+    
+    def test_taxonomy_served_from_tiers(self):
+        """Test that taxonomy lists are cached and refreshed on writes."""
+        University.objects.create(name='Tier University')
+        url = reverse('universities')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual([item['name'] for item in response.json()['data']], ['Tier University'])
+        
+        University.objects.create(name='Second University')
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['data']), 2)
+        
+        response = self.client.get(reverse('university-detail', args=[uuid4()]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_stats_endpoint(self):
+        """Test that tier hit ratios are exposed to staff only."""
+        url = reverse('cache-stats')
+        user = User.objects.create_user('tierstaff', 'tier@example.com', 'password123')
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        
+        user.is_staff = True
+        user.save()
+        self._get()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['local']['misses'], 1)
+        
+        response = self.client.post(url)
+        self.assertEqual(response.data['data']['local']['misses'], 0)
+
+
+class TaxonomyCacheTest(APITestCase):
+    """Test cases for the cached university, department and major subject endpoints."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        tiered_cache.clear()
+        self.department = Department.objects.create(name='Cached Department')
+    
+    def test_cached_bytes_and_headers(self):
+        """Test that hits are served from the cached bytes with ETag and Cache-Control."""
+        url = reverse('departments')
+        miss = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            hit = self.client.get(url)
+        
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(hit.content, miss.content)
+        self.assertEqual(hit['ETag'], miss['ETag'])
+        self.assertEqual(hit.json()['message'], 'Departments fetched successfully')
+        self.assertIn('public', hit['Cache-Control'])
+        self.assertIn(f"max-age={settings.CACHE_TIMEOUTS['department_list']}", hit['Cache-Control'])
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=hit['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertIn('max-age', response['Cache-Control'])
+    
+    def test_post_invalidates(self):
+        """Test that creating an item through POST shows up in the next list response."""
+        for list_name, name in (
+            ('universities', 'Posted University'),
+            ('departments', 'Posted Department'),
+            ('major-subjects', 'Posted Major'),
+        ):
+            url = reverse(list_name)
+            etag = self.client.get(url)['ETag']
+            
+            response = self.client.post(url, {'name': name}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(name, [item['name'] for item in response.json()['data']])
+    
+    def test_item_not_found(self):
+        """Test that a missing item is a 404 and is not cached."""
+        url = reverse('major-subject-detail', args=[uuid4()])
+        for _ in range(2):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertFalse(response.has_header('Cache-Control'))
+
+
+class TaxonomyBootstrapTest(APITestCase):
+    """Test cases for the combined taxonomy endpoint."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        tiered_cache.clear()
+        self.university = University.objects.create(name='Bootstrap University')
+        Department.objects.create(name='Bootstrap Department')
+        MajorSubject.objects.create(name='Bootstrap Major')
+        self.url = reverse('taxonomy')
+    
+    def test_all_lists_with_version(self):
+        """Test that one response carries the three lists and a version matching its ETag."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        body = response.json()
+        self.assertEqual(
+            {key: [item['name'] for item in items] for key, items in body['data'].items()},
+            {
+                'universities': ['Bootstrap University'],
+                'departments': ['Bootstrap Department'],
+                'major_subjects': ['Bootstrap Major'],
+            }
+        )
+        self.assertEqual(response['ETag'], f'"{body["version"]}"')
+    
+    def test_unchanged_version_is_not_modified(self):
+        """Test that sending the version back returns an empty 304 without any query."""
+        first = self.client.get(self.url)
+        version = first.json()['version']
+        with CaptureQueriesContext(connection) as queries:
+            by_param = self.client.get(self.url, {'version': version})
+            by_header = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        
+        self.assertEqual(len(queries), 0)
+        for response in (by_param, by_header):
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertFalse(response.content)
+        
+        response = self.client.get(self.url, {'version': 'outdated'})
+        self.assertEqual(response.content, first.content)
+    
+    def test_version_follows_content(self):
+        """Test that the version changes with the content, and only with it."""
+        version = self.client.get(self.url).json()['version']
+        
+        # Saving without changes rebuilds the payload but keeps its hash
+        self.university.save()
+        response = self.client.get(self.url, {'version': version})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        MajorSubject.objects.create(name='Another Major')
+        response = self.client.get(self.url, {'version': version})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.json()['version'], version)
+        self.assertEqual(len(response.json()['data']['major_subjects']), 2)
+
+
+class TaxonomyAutocompleteTest(APITestCase):
+    """Test cases for ?prefix= autocomplete on the taxonomy endpoints."""
+    
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        tiered_cache.clear()
+        name_indexes.clear()
+        for name in ('University of Dhaka', 'Dhaka University of Engineering', 'North South University', 'BRAC University'):
+            University.objects.create(name=name)
+        self.url = reverse('universities')
+    
+    def _names(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data['data']]
+    
+    def test_prefix_matches(self):
+        """Test that names match from their start or any word, case and whitespace insensitive."""
+        # Ordered by the matched text: "dhaka" before "dhaka university of engineering"
+        self.assertEqual(self._names(prefix='dha'), ['University of Dhaka', 'Dhaka University of Engineering'])
+        self.assertEqual(self._names(prefix='  NORTH   s'), ['North South University'])
+        self.assertEqual(self._names(prefix='xyz'), [])
+        # Each university is listed once even if several of its words match
+        self.assertEqual(len(self._names(prefix='u')), 4)
+        self.assertEqual(len(self._names(prefix='u', limit=2)), 2)
+    
+    def test_served_without_queries(self):
+        """Test that lookups after the first are answered from memory."""
+        self._names(prefix='b')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._names(prefix='brac'), ['BRAC University'])
+        self.assertEqual(len(queries), 0)
+    
+    @override_settings(LOCAL_CACHE_MAX_ENTRIES=2, LOCAL_CACHE_TTL=0)
+    def test_index_survives_detail_churn(self):
+        """Test that contribution details filling the local cache don't push the index out."""
+        self._names(prefix='b')
+        for index in range(5):
+            contribution = Contributions.objects.create(title=f'Churn {index}')
+            self.client.get(reverse('contribution-detail', args=[str(contribution.id)]))
+        
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._names(prefix='brac'), ['BRAC University'])
+        # Only the generation counter is read back; the index is neither rebuilt nor reloaded
+        self.assertEqual(app_queries(queries), [])
+        self.assertEqual(len(queries), 1)
+    
+    def test_index_rebuilt_on_change(self):
+        """Test that new and renamed names are found right after the write."""
+        self.assertEqual(self._names(prefix='east'), [])
+        
+        university = University.objects.create(name='East West University')
+        self.assertEqual(self._names(prefix='east'), ['East West University'])
+        
+        university.name = 'Independent University'
+        university.save()
+        self.assertEqual(self._names(prefix='east'), [])
+        self.assertEqual(self._names(prefix='indep'), ['Independent University'])
+    
+    def test_other_taxonomies_and_invalid_limit(self):
+        """Test autocomplete on departments and major subjects, and limit validation."""
+        Department.objects.create(name='Computer Science')
+        MajorSubject.objects.create(name='Computational Biology')
+        
+        response = self.client.get(reverse('departments'), {'prefix': 'comp'})
+        self.assertEqual([item['name'] for item in response.data['data']], ['Computer Science'])
+        response = self.client.get(reverse('major-subjects'), {'prefix': 'bio'})
+        self.assertEqual([item['name'] for item in response.data['data']], ['Computational Biology'])
+        
+        for limit in ('0', 'many'):
+            response = self.client.get(self.url, {'prefix': 'u', 'limit': limit})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
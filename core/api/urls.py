@@ -2,7 +2,8 @@ from django.urls import path
 from .views import (
     UserInfoView, UserContributionView, 
     ContributionCommentView, AllContributionView,
-    ContributionRatingView, UniversityView, DepartmentView, MajorSubjectView
+    ContributionRatingView, UniversityView, DepartmentView, MajorSubjectView,
+    ContributionFacetView, CacheStatsView, TaxonomyView
 )
 
 urlpatterns = [
@@ -13,11 +14,12 @@ urlpatterns = [
 
     path('all-contributions/', AllContributionView.as_view(), name='all-contributions'),
     path('all-contributions/<str:pk>/', AllContributionView.as_view(), name='contribution-detail'),
+    path('contribution-facets/', ContributionFacetView.as_view(), name='contribution-facets'),
 
 
     path('contribution-comments/<uuid:contribution_id>/', ContributionCommentView.as_view(), name='contribution-comments'), #view all comments inside a contribution
     path('contribution-comments/<uuid:contribution_id>/<uuid:comment_id>/', ContributionCommentView.as_view(), name='contribution-comments'), #delete or update a comment 
-    path('contribution-comments/', ContributionCommentView.as_view(), name='contribution-comments'), #view all comments or create a new comment
+    path('contribution-comments/', ContributionCommentView.as_view(), name='contribution-comments'), #view the paginated feed of all comments or create a new comment
 
     path('ratings/<uuid:contribution_id>/', ContributionRatingView.as_view(), name='contribution-ratings'),
 
@@ -28,5 +30,8 @@ urlpatterns = [
     path('departments/<uuid:pk>/', DepartmentView.as_view(), name='department-detail'),
     path('major-subjects/', MajorSubjectView.as_view(), name='major-subjects'),
     path('major-subjects/<uuid:pk>/', MajorSubjectView.as_view(), name='major-subject-detail'),
+    path('taxonomy/', TaxonomyView.as_view(), name='taxonomy'),
+
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
 ]
 
@@ -5,28 +5,292 @@ from django.shortcuts import render, get_object_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from .serializers import UserSerializer, ContributionSerializer, ContributionCommentSerializer, AllContributionSerializer, ContributionRatingSerializer,UniversitySerializer,MajorSubjectSerializer,DepartmentSerializer
+from .serializers import get_enrolled_contribution_ids, latest_comments_prefetch, ContributionVideoSerializer, ContributionNoteSerializer
 from .models import Contributions, ContributionsComments, ContributionRatings, University, Department, MajorSubject,ContributionVideos,ContributionNotes,ContributionTags
+from .models import normalize_tag_slug
 
 from django.conf import settings
-from django.db import IntegrityError
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, connection
+from django.core.exceptions import ObjectDoesNotExist, ValidationError as DjangoValidationError
 from rest_framework.pagination import  LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param, remove_query_param
 from django.core.cache import cache
-from django.db.models import Prefetch
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from django.db.models import BooleanField, Count, F, Prefetch, Q
+from django.db.models.expressions import RawSQL
+from uuid import UUID, uuid4
+from decimal import Decimal, InvalidOperation
+import base64
+import binascii
+import hashlib
+import json
 from enrollments.models import Enrollment
+from .search import filter_by_search
+from .facets import estimate_contribution_count, facet_counts_built, get_facet_counts
+from .autocomplete import get_name_index
+from .cache_utils import (
+    CONTRIBUTIONS_LIST_NAMESPACE, DEPARTMENT_LIST_NAMESPACE, MAJOR_SUBJECT_LIST_NAMESPACE,
+    TAXONOMY_NAMESPACE, UNIVERSITY_LIST_NAMESPACE, get_cache_generation, bump_cache_generation,
+    contribution_detail_key, contribution_detail_namespaces, contribution_detail_user_key, make_etag,
+    accepts_gzip, cached_response, encode_cached_response, entry_etag, get_or_build, gzip_etag, tiered_cache
+)
 
 # Define constants for repeated string literals
 INVALID_DATA_MSG = 'Invalid data'
 NOT_FOUND_MSG = 'Not found'
-CONTRIBUTIONS_LIST_PATTERN = 'contributions_list:*'
 GENERIC_ERROR_MSG = 'An error occurred while processing your request'
 
+# Number of matches returned by ?prefix= taxonomy autocomplete
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
 
 class OptimizedPagination(LimitOffsetPagination):
     default_limit = 10
     max_limit = 100
+    has_next = None  # Set by paginate_queryset_with_count()
+
+    def get_pagination_details(self, request, count):
+        """Build the pagination block of a list response"""
+        next_link = self.get_next_link()
+        previous_link = self.get_previous_link()
+        return {
+            'count': count,
+            'next': request.build_absolute_uri(next_link) if next_link else None,
+            'previous': request.build_absolute_uri(previous_link) if previous_link else None,
+            'limit': self.limit,
+            'offset': self.offset,
+        }
+
+    def paginate_queryset_with_count(self, queryset, request, count=None):
+        """
+        Paginate without running COUNT(*): count is whatever the caller resolved
+        (exact, estimated or None). Whether a next page exists is detected by
+        fetching one extra row, so links stay correct when count is approximate.
+        """
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        self.count = count
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_next_link(self):
+        if self.has_next is None:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+
+def keyset_order_by(model, field, descending):
+    """
+    ORDER BY (field, id) in one direction. NULLs sort first ascending and last
+    descending, which is where SQLite keeps them in a (field, id) index, so the
+    ordering is served straight from the index and the keyset filters agree with it.
+    """
+    if not model._meta.get_field(field).null:
+        prefix = '-' if descending else ''
+        return (f'{prefix}{field}', f'{prefix}id')
+    if descending:
+        return (F(field).desc(nulls_last=True), F('id').desc())
+    return (F(field).asc(nulls_first=True), F('id').asc())
+
+
+class ContributionCursorPagination:
+    """
+    Keyset pagination for contribution listings, ordered on (field, id), newest first by default.
+    Each page is an index range scan starting right after the cursor row, so fetching
+    a deep page costs the same as fetching the first one.
+
+    The cursor is an opaque token; clients should only pass back the next/previous
+    cursors returned by the API.
+    """
+    default_limit = OptimizedPagination.default_limit
+    max_limit = OptimizedPagination.max_limit
+    limit_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    ordering = '-created_at'  # Sort field, with id as the tiebreaker in the same direction
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = ordering
+        self.field = self.ordering.lstrip('-')
+        self.descending = self.ordering.startswith('-')
+        self.limit = self.default_limit
+        self.next_position = None
+        self.previous_position = None
+        self.request = None
+
+    def get_limit(self, request):
+        """Read the page size from the request, clamped to max_limit"""
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        if limit <= 0:
+            return self.default_limit
+        return min(limit, self.max_limit)
+
+    def encode_cursor(self, instance, reverse=False):
+        """Encode the position of a row into an opaque cursor token"""
+        value = getattr(instance, self.field)
+        if value is not None:
+            value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        payload = json.dumps({
+            'o': self.ordering,
+            'v': value,
+            'i': str(instance.id),
+            'r': reverse,
+        })
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, token, model):
+        """Decode a cursor token, raising ValueError if it is malformed or belongs to another ordering"""
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            value = payload['v']
+            if value is not None:
+                value = model._meta.get_field(self.field).to_python(value)
+            row_id = UUID(payload['i'])
+            reverse = bool(payload.get('r', False))
+            ordering = payload['o']
+        except (TypeError, KeyError, ValueError, UnicodeError, binascii.Error, DjangoValidationError):
+            raise ValueError('Invalid cursor')
+        if ordering != self.ordering:
+            raise ValueError('Invalid cursor')
+        return value, row_id, reverse
+
+    def _row_after(self, model, value, row_id, descending):
+        """
+        (field, id) > (value, row_id), or < when descending, as one row-value
+        comparison, which the database answers with a single range over the
+        (field, id) index. An OR of the two columns' conditions scans or sorts instead.
+        """
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        field = model._meta.get_field(self.field)
+        columns = f'{table}.{quote(field.column)}, {table}.{quote(model._meta.pk.column)}'
+        params = [
+            field.get_db_prep_value(value, connection),
+            model._meta.pk.get_db_prep_value(row_id, connection),
+        ]
+        operator = '<' if descending else '>'
+        return RawSQL(f'({columns}) {operator} (%s, %s)', params, output_field=BooleanField())
+
+    def _after(self, model, value, row_id, descending):
+        """
+        Filters selecting the rows strictly after (value, row_id) in the keyset_order_by()
+        order, one per block of rows in the order they are read. NULLs form the first
+        block ascending and the last block descending; each block is a single index range.
+        """
+        field = self.field
+        nullable = model._meta.get_field(field).null
+        lookup = 'lt' if descending else 'gt'
+        if value is None:
+            null_block = Q(**{f'{field}__isnull': True, f'id__{lookup}': row_id})
+            if descending:
+                return [null_block]
+            return [null_block, Q(**{f'{field}__isnull': False})]
+
+        # NULL never compares greater or smaller, so the row value excludes the NULL block
+        blocks = [self._row_after(model, value, row_id, descending)]
+        if descending and nullable:
+            blocks.append(Q(**{f'{field}__isnull': True}))
+        return blocks
+
+    def _page_after(self, queryset, model, value, row_id, descending):
+        """Up to limit + 1 rows after the cursor, with one query per block the page reaches"""
+        queryset = queryset.order_by(*keyset_order_by(model, self.field, descending))
+        rows = []
+        for block in self._after(model, value, row_id, descending):
+            rows.extend(queryset.filter(block)[:self.limit + 1 - len(rows)])
+            if len(rows) > self.limit:
+                break
+        return rows
+
+    def paginate_queryset(self, queryset, request):
+        """
+        Return one page of the queryset.
+        Raises ValueError if the cursor parameter is invalid.
+        """
+        self.request = request
+        self.limit = self.get_limit(request)
+        model = queryset.model
+        token = request.query_params.get(self.cursor_query_param)
+
+        if not token:
+            rows = list(queryset.order_by(*keyset_order_by(model, self.field, self.descending))[:self.limit + 1])
+            has_more = len(rows) > self.limit
+            rows = rows[:self.limit]
+            self.next_position = rows[-1] if has_more else None
+            return rows
+
+        value, row_id, reverse = self.decode_cursor(token, model)
+
+        if reverse:
+            # Walk backwards from the cursor, then flip the page around
+            rows = self._page_after(queryset, model, value, row_id, not self.descending)
+            has_more = len(rows) > self.limit
+            rows = list(reversed(rows[:self.limit]))
+            self.previous_position = rows[0] if has_more and rows else None
+            self.next_position = rows[-1] if rows else None
+            return rows
+
+        rows = self._page_after(queryset, model, value, row_id, self.descending)
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.next_position = rows[-1] if has_more else None
+        self.previous_position = rows[0] if rows else None
+        return rows
+
+    def get_next_cursor(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_previous_cursor(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def _build_link(self, cursor):
+        url = remove_query_param(self.request.build_absolute_uri(), 'offset')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        return self._build_link(cursor) if cursor else None
+
+    def get_previous_link(self):
+        cursor = self.get_previous_cursor()
+        return self._build_link(cursor) if cursor else None
+
+    def get_pagination_details(self, request, count):
+        """Build the pagination block of a list response"""
+        return {
+            'count': count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'limit': self.limit,
+            'next_cursor': self.get_next_cursor(),
+            'previous_cursor': self.get_previous_cursor(),
+        }
+
+
+class CommentCursorPagination(ContributionCursorPagination):
+    """
+    Keyset pagination for comments, newest first on (created_at, id).
+    Scoped to one contribution the page is read from the (contribution, created_at, id)
+    index, so it costs the same for a contribution with 10 comments or 100,000.
+    """
 
 
 # Helper methods to reduce code duplication
@@ -50,6 +314,133 @@ def create_error_response(message, errors=None, status_code=status.HTTP_400_BAD_
         response_data['errors'] = errors
     return Response(response_data, status=status_code)
 
+def get_requested_fields(request, serializer_class):
+    """
+    Resolve a sparse fieldset from ?fields=id,title and/or ?exclude=description.
+    Returns a sorted list of field names, or None for the full representation.
+    Raises ValueError if an unknown field is requested.
+    """
+    fields_param = request.query_params.get('fields', '')
+    exclude_param = request.query_params.get('exclude', '')
+    if not fields_param and not exclude_param:
+        return None
+
+    available = set(serializer_class().fields)
+    fields = {name.strip() for name in fields_param.split(',') if name.strip()} or set(available)
+    exclude = {name.strip() for name in exclude_param.split(',') if name.strip()}
+
+    unknown = (fields | exclude) - available
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return sorted(fields - exclude)
+
+def prune_fields(data, fields):
+    """Drop keys outside a sparse fieldset from an already serialized item"""
+    if fields is None:
+        return data
+    return {key: value for key, value in data.items() if key in fields}
+
+def get_cached_taxonomy(namespace, model, serializer_class, message, pk=None):
+    """
+    Encoded success response listing a taxonomy model, or showing one item of it,
+    read through the two-tier cache. Its ETag is a hash of the body.
+    Raises ObjectDoesNotExist if pk does not exist.
+    """
+    def build():
+        if pk:
+            data = serializer_class(model.objects.get(id=pk)).data
+        else:
+            data = serializer_class(model.objects.all(), many=True).data
+        return encode_cached_response({'status': True, 'message': message, 'data': data})
+
+    key = f"{namespace}:{pk}" if pk else namespace
+    cache_timeout = getattr(settings, 'CACHE_TIMEOUTS', {}).get(namespace, 3600)
+    return tiered_cache.get_or_build(key, namespace, build, cache_timeout)
+
+def build_taxonomy_entry():
+    """
+    Encoded response holding every university, department and major subject,
+    versioned by a hash of the three lists. The hash doubles as the ETag.
+    """
+    data = {
+        'universities': UniversitySerializer(University.objects.all(), many=True).data,
+        'departments': DepartmentSerializer(Department.objects.all(), many=True).data,
+        'major_subjects': MajorSubjectSerializer(MajorSubject.objects.all(), many=True).data,
+    }
+    version = hashlib.sha1(JSONRenderer().render(data)).hexdigest()
+    entry = encode_cached_response({
+        'status': True,
+        'message': 'Taxonomy fetched successfully',
+        'version': version,
+        'data': data,
+    }, quote_etag(version))
+    entry['version'] = version
+    return entry
+
+def autocomplete_response(request, namespace, model, message):
+    """
+    Typeahead over a taxonomy model's names: ?prefix=<text>&limit=<k>.
+    Served from an in-memory sorted index, without a query.
+    """
+    try:
+        limit = int(request.query_params.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT))
+    except ValueError:
+        return create_error_response('Invalid limit')
+    if limit < 1:
+        return create_error_response('Invalid limit')
+    limit = min(limit, AUTOCOMPLETE_MAX_LIMIT)
+
+    index = get_name_index(namespace, model)
+    return create_success_response(message, index.search(request.query_params['prefix'], limit))
+
+def taxonomy_response(request, namespace, entry):
+    """
+    Serve a cached taxonomy entry, or 304 if the client holds its ETag.
+    Clients and proxies may reuse it for the namespace's cache timeout; taxonomy
+    writes show up after that, or right away for clients that revalidate.
+    """
+    response = conditional_response(
+        request, entry['etag'], lambda: cached_response(request, entry), may_gzip=entry['gzip'] is not None
+    )
+    max_age = getattr(settings, 'CACHE_TIMEOUTS', {}).get(namespace, 3600)
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+def etag_matches(request, etag):
+    """Check If-None-Match against an ETag, using the weak comparison GET requires"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    client_etags = parse_etags(header)
+    return '*' in client_etags or etag in [tag.removeprefix('W/') for tag in client_etags]
+
+def conditional_response(request, etag, build_response, may_gzip=False):
+    """
+    Answer 304 Not Modified if the client already holds etag, otherwise call
+    build_response and tag its 200 response. Nothing is serialized for a 304.
+    With may_gzip, build_response may serve a gzipped cached entry, whose tag is
+    gzip_etag(etag); If-None-Match is matched against the variant's own tag.
+    """
+    gzipped_etag = gzip_etag(etag)
+    # A client accepting gzip is served the gzipped variant whenever one is cached
+    wants_gzip = may_gzip and accepts_gzip.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    expected = gzipped_etag if wants_gzip else etag
+    if etag_matches(request, expected):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        served = expected
+    else:
+        response = build_response()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        served = gzipped_etag if response.get('Content-Encoding') == 'gzip' else etag
+        # Bodies too short to compress are served as they are, tagged etag
+        if served != expected and etag_matches(request, served):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = served
+    # The tag depends on who is asking, so shared caches must key on the credentials
+    patch_vary_headers(response, ['Authorization', 'Accept-Encoding'] if may_gzip else ['Authorization'])
+    return response
+
 
 
 
@@ -84,33 +475,53 @@ class UserInfoView(APIView):
     
     def get(self, request):
         user = request.user
-        serializer = UserSerializer(user)
-        return create_success_response(
+        return conditional_response(request, self.get_etag(user), lambda: create_success_response(
             'User info fetched successfully',
-            serializer.data
+            UserSerializer(user).data
+        ))
+
+    def get_etag(self, user):
+        """
+        Version of the profile payload: the user's own columns, plus the taxonomy
+        generations because the university, department and major subject are nested
+        """
+        serialized = set(UserSerializer.Meta.fields)
+        values = [
+            (field.attname, getattr(user, field.attname))
+            for field in user._meta.concrete_fields
+            if field.name in serialized
+        ]
+        return make_etag(
+            'user_info', values,
+            *(get_cache_generation(namespace) for namespace in (
+                UNIVERSITY_LIST_NAMESPACE, DEPARTMENT_LIST_NAMESPACE, MAJOR_SUBJECT_LIST_NAMESPACE
+            ))
         )
 
 class UniversityView(APIView):
     """
     API View for handling University operations
     GET: List all universities or get a specific university
+    GET ?prefix=<text>&limit=<k>: Universities whose name or a word in it starts with text
     POST: Create a new university
     """
     def get(self, request, pk=None):
+        if not pk and 'prefix' in request.query_params:
+            return autocomplete_response(request, UNIVERSITY_LIST_NAMESPACE, University, 'Universities fetched successfully')
+        
+        # Served from pre-encoded bytes; POSTs and any other university write move the
+        # generation, so the next request rebuilds the response
         try:
-            if pk:
-                university = University.objects.get(id=pk)
-                serializer = UniversitySerializer(university)
-                return create_success_response('University fetched successfully', serializer.data)
-            
-            universities = University.objects.all()
-            serializer = UniversitySerializer(universities, many=True)
-            return create_success_response('Universities fetched successfully', serializer.data)
-            
+            entry = get_cached_taxonomy(
+                UNIVERSITY_LIST_NAMESPACE, University, UniversitySerializer,
+                'University fetched successfully' if pk else 'Universities fetched successfully',
+                pk
+            )
         except ObjectDoesNotExist:
             return create_error_response('University not found', status_code=status.HTTP_404_NOT_FOUND)
         except Exception:
             return create_error_response(GENERIC_ERROR_MSG, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return taxonomy_response(request, UNIVERSITY_LIST_NAMESPACE, entry)
 
     def post(self, request):
         try:
@@ -135,23 +546,26 @@ class DepartmentView(APIView):
     """
     API View for handling Department operations
     GET: List all departments or get a specific department
+    GET ?prefix=<text>&limit=<k>: Departments whose name or a word in it starts with text
     POST: Create a new department
     """
     def get(self, request, pk=None):
+        if not pk and 'prefix' in request.query_params:
+            return autocomplete_response(request, DEPARTMENT_LIST_NAMESPACE, Department, 'Departments fetched successfully')
+        
+        # Served from pre-encoded bytes; POSTs and any other department write move the
+        # generation, so the next request rebuilds the response
         try:
-            if pk:
-                department = Department.objects.get(id=pk)
-                serializer = DepartmentSerializer(department)
-                return create_success_response('Department fetched successfully', serializer.data)
-            
-            departments = Department.objects.all()
-            serializer = DepartmentSerializer(departments, many=True)
-            return create_success_response('Departments fetched successfully', serializer.data)
-            
+            entry = get_cached_taxonomy(
+                DEPARTMENT_LIST_NAMESPACE, Department, DepartmentSerializer,
+                'Department fetched successfully' if pk else 'Departments fetched successfully',
+                pk
+            )
         except ObjectDoesNotExist:
             return create_error_response('Department not found', status_code=status.HTTP_404_NOT_FOUND)
         except Exception:
             return create_error_response(GENERIC_ERROR_MSG, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return taxonomy_response(request, DEPARTMENT_LIST_NAMESPACE, entry)
 
     def post(self, request):
         try:
@@ -176,23 +590,26 @@ class MajorSubjectView(APIView):
     """
     API View for handling MajorSubject operations
     GET: List all major subjects or get a specific major subject
+    GET ?prefix=<text>&limit=<k>: Major subjects whose name or a word in it starts with text
     POST: Create a new major subject
     """
     def get(self, request, pk=None):
+        if not pk and 'prefix' in request.query_params:
+            return autocomplete_response(request, MAJOR_SUBJECT_LIST_NAMESPACE, MajorSubject, 'Major Subjects fetched successfully')
+        
+        # Served from pre-encoded bytes; POSTs and any other major subject write move the
+        # generation, so the next request rebuilds the response
         try:
-            if pk:
-                major_subject = MajorSubject.objects.get(id=pk)
-                serializer = MajorSubjectSerializer(major_subject)
-                return create_success_response('Major Subject fetched successfully', serializer.data)
-            
-            major_subjects = MajorSubject.objects.all()
-            serializer = MajorSubjectSerializer(major_subjects, many=True)
-            return create_success_response('Major Subjects fetched successfully', serializer.data)
-            
+            entry = get_cached_taxonomy(
+                MAJOR_SUBJECT_LIST_NAMESPACE, MajorSubject, MajorSubjectSerializer,
+                'Major Subject fetched successfully' if pk else 'Major Subjects fetched successfully',
+                pk
+            )
         except ObjectDoesNotExist:
             return create_error_response('Major Subject not found', status_code=status.HTTP_404_NOT_FOUND)
         except Exception:
             return create_error_response(GENERIC_ERROR_MSG, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return taxonomy_response(request, MAJOR_SUBJECT_LIST_NAMESPACE, entry)
 
     def post(self, request):
         try:
@@ -214,16 +631,46 @@ class MajorSubjectView(APIView):
 
 
 
+class TaxonomyView(APIView):
+    """
+    Every university, department and major subject in one response
+    GET /api/taxonomy/
+    
+    The response carries a version, a hash of the three lists. Send it back as
+    ?version=<hash> (or as If-None-Match) to get an empty 304 response while
+    nothing has changed. The body is built once per taxonomy change and served
+    as pre-encoded bytes.
+    """
+    def get(self, request):
+        cache_timeout = getattr(settings, 'CACHE_TIMEOUTS', {}).get(TAXONOMY_NAMESPACE, 3600)
+        try:
+            entry = tiered_cache.get_or_build(TAXONOMY_NAMESPACE, TAXONOMY_NAMESPACE, build_taxonomy_entry, cache_timeout)
+        except Exception:
+            return create_error_response(GENERIC_ERROR_MSG, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        if request.query_params.get('version') == entry['version']:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            response['ETag'] = entry_etag(request, entry)
+            patch_cache_control(response, public=True, max_age=cache_timeout)
+            return response
+        return taxonomy_response(request, TAXONOMY_NAMESPACE, entry)
+
+
 class UserContributionView(APIView):
     permission_classes = [IsAuthenticated]
     pagination_class = OptimizedPagination  # Using the same pagination class as AllContributionView
 
     def get(self, request, pk=None):
         user = request.user
+        try:
+            fields = get_requested_fields(request, ContributionSerializer)
+        except ValueError as e:
+            return create_error_response(str(e))
+        
         if pk:
             try:
-                contribution = Contributions.objects.get(id=pk, user=user)
-                serializer = ContributionSerializer(contribution)
+                contribution = self._with_requested_relations(Contributions.objects, fields).get(id=pk, user=user)
+                serializer = ContributionSerializer(contribution, fields=fields)
                 return create_success_response('Success', serializer.data)
             except Contributions.DoesNotExist:
                 return create_error_response(NOT_FOUND_MSG, status_code=status.HTTP_404_NOT_FOUND)
@@ -246,9 +693,11 @@ class UserContributionView(APIView):
         
         # Apply pagination
         paginator = self.pagination_class()
-        paginated_contributions = paginator.paginate_queryset(contributions, request)
+        paginated_contributions = paginator.paginate_queryset(
+            self._with_requested_relations(contributions, fields), request
+        )
         
-        serializer = ContributionSerializer(paginated_contributions, many=True)
+        serializer = ContributionSerializer(paginated_contributions, many=True, fields=fields)
         
         # Create response with pagination details
         response_data = {
@@ -284,7 +733,7 @@ class UserContributionView(APIView):
             serializer.save(user=request.user)
             
             # Invalidate cache for list views
-            cache.delete_pattern(CONTRIBUTIONS_LIST_PATTERN) if hasattr(cache, 'delete_pattern') else cache.clear()
+            bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
             
             return create_success_response('Created', serializer.data, status_code=status.HTTP_201_CREATED)
         
@@ -293,6 +742,15 @@ class UserContributionView(APIView):
         
         return create_error_response(INVALID_DATA_MSG, serializer.errors)
 
+    def _with_requested_relations(self, queryset, fields):
+        """Load only the columns and relations a sparse fieldset serializes"""
+        relations = [name for name in ('videos', 'tags', 'notes', 'comments') if fields is None or name in fields]
+        queryset = queryset.prefetch_related(*relations)
+        if fields is None:
+            return queryset
+        columns = {field.name for field in Contributions._meta.concrete_fields} & set(fields)
+        return queryset.only('id', *columns)
+
     def _prepare_post_data(self, request):
         """Helper method to prepare contribution data from request for post"""
         # Create base data dictionary
@@ -365,9 +823,22 @@ class UserContributionView(APIView):
         """Extract notes from request data"""
         result = {}
         notes = []
+        
+        # IDs of existing notes to keep, e.g. notes[0][id]
+        note_ids = {}
+        for key in request.data:
+            if key.startswith('notes[') and key.endswith('][id]'):
+                index = key.split('[')[1].split(']')[0]
+                note_ids[index] = request.data[key]
+        
         for key in request.FILES:
             if 'note_file' in key:
-                notes.append({'note_file': request.FILES[key]})
+                note = {'note_file': request.FILES[key]}
+                index = key.split('[')[1].split(']')[0] if '[' in key else None
+                if index in note_ids:
+                    note['id'] = note_ids.pop(index)
+                notes.append(note)
+        notes.extend({'id': note_id} for note_id in note_ids.values())
         
         if notes:
             result['notes'] = notes
@@ -392,8 +863,8 @@ class UserContributionView(APIView):
                 updated_contribution = serializer.save()
                 
                 # Invalidate cache for this contribution and list views
-                cache.delete(f"contribution_detail:{pk}")
-                cache.delete_pattern(CONTRIBUTIONS_LIST_PATTERN) if hasattr(cache, 'delete_pattern') else cache.clear()
+                bump_cache_generation(contribution_detail_key(pk))
+                bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
                 
                 return create_success_response(
                     'Updated', 
@@ -412,8 +883,8 @@ class UserContributionView(APIView):
             contribution.delete()
             
             # Invalidate cache for this contribution and list views
-            cache.delete(f"contribution_detail:{pk}")
-            cache.delete_pattern(CONTRIBUTIONS_LIST_PATTERN) if hasattr(cache, 'delete_pattern') else cache.clear()
+            bump_cache_generation(contribution_detail_key(pk))
+            bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
             
             return create_success_response('Deleted')
         except Contributions.DoesNotExist:
@@ -459,15 +930,24 @@ class UserContributionView(APIView):
                 index = key.split('[')[1].split(']')[0]
                 video_titles[index] = request.data[key]
         
+        # Extract IDs of existing videos to keep
+        video_ids = {}
+        for key in request.data:
+            if key.startswith('videos[') and key.endswith('][id]'):
+                index = key.split('[')[1].split(']')[0]
+                video_ids[index] = request.data[key]
+        
         # Extract video files
         for key in request.FILES:
             if 'video_file' in key:
                 index = key.split('[')[1].split(']')[0]
                 video_files[index] = request.FILES[key]
         
-        # Combine titles and files
-        for index in set(list(video_titles.keys()) + list(video_files.keys())):
+        # Combine IDs, titles and files
+        for index in set(list(video_titles.keys()) + list(video_files.keys()) + list(video_ids.keys())):
             video = {}
+            if index in video_ids:
+                video['id'] = video_ids[index]
             if index in video_titles:
                 video['title'] = video_titles[index]
             if index in video_files:
@@ -492,82 +972,236 @@ class AllContributionView(APIView):
     - Use limit and offset: ?limit=10&offset=20
     - Default limit: 10
     - Max limit: 100
+    - Cursor mode: ?pagination=cursor&limit=10, then follow the returned next/previous
+      cursors (?cursor=<token>). Keyed on (created_at, id) so deep pages stay fast.
+    
+    Ordering:
+    - ?ordering=created_at|rating|price|popularity, prefix with '-' for descending
+      (e.g. ?ordering=-rating for top rated, ?ordering=price for cheapest,
+      ?ordering=-popularity for most enrolled). Defaults to -created_at, or to
+      relevance when searching. Ties are broken by id; missing ratings and prices
+      sort first ascending and last descending. Works in both pagination modes.
+    
+    Total count (?count=exact|estimate|none):
+    - exact: COUNT(*) of the filtered rows, cached per filter set across all pages
+    - estimate: summed from the facet counters for university/department/major_subject/tag
+      filters; other filters return a cached exact count if there is one, else null
+    - none: no count
+    - Defaults to estimate with limit/offset and to none in cursor mode
     
     Filtering:
     - Filter by university: ?university=<uuid>
     - Filter by department: ?department=<uuid>
     - Filter by major_subject: ?major_subject=<uuid>
-    - Filter by tag: ?tag=<tag_name>
+    - Filter by tag: ?tag=<tag_name> (case and whitespace insensitive)
     - Filter by user: ?user=<uuid> (to find a specific user's contributions)
+    - Full-text search: ?q=<text> over title, description and tag names, best match first
+      (in cursor mode matches are returned newest first)
+    - Filter by price: ?min_price=<amount>&max_price=<amount>, or ?free_only=true
+    - Filter by rating: ?min_rating=<0-5>
     - Can combine multiple filters
     
+    Sparse fieldsets:
+    - Return only some fields: ?fields=id,title,thumbnail_image,price,rating
+    - Or drop some fields: ?exclude=description,comments
+    - Relations outside the fieldset are not queried at all
+    
     Optimizations:
     - Database-level pagination
     - Efficient querying of related fields
     - Optional caching for frequently accessed pages
     """
     pagination_class = OptimizedPagination
+    cursor_pagination_class = ContributionCursorPagination
+    count_modes = ('exact', 'estimate', 'none')
+    # ?ordering= values and the indexed column each one sorts on (with id as tiebreaker)
+    orderings = {
+        'created_at': 'created_at',
+        'rating': 'rating',
+        'price': 'price',
+        'popularity': 'enrollment_count',
+    }
+    default_ordering = '-created_at'
+    range_filter_params = ('min_price', 'max_price', 'min_rating', 'free_only')
+    # Fields whose values depend on the requesting user's enrollments
+    user_dependent_fields = {'is_enrolled', 'videos', 'notes'}
 
-    def get_cached_key(self, params):
-        """Generate a cache key based on request parameters"""
+    def get_cached_key(self, params, fields=None, user_id=None, origin=''):
+        """
+        Generate a cache key based on request parameters, the resolved sparse fieldset,
+        the origin the page's absolute pagination links point at and, for pages that
+        depend on who is asking, the user
+        """
         # Create a more robust cache key that includes all filter parameters
-        param_keys = sorted(params.keys())
+        param_keys = sorted(key for key in params.keys() if key not in ('fields', 'exclude'))
         key_parts = []
         
         for key in param_keys:
             value = params.get(key, '')
             if value:  # Only include non-empty parameters
                 key_parts.append(f"{key}:{value}")
+        
+        # Equivalent ?fields=/?exclude= combinations share one entry
+        if fields is not None:
+            key_parts.append(f"fields:{','.join(fields)}")
                 
         # If no parameters, use 'all' to indicate no filters
         key_string = "-".join(key_parts) if key_parts else "all"
-        return f"contributions_list:{key_string}"
+        
+        # Embed the namespace generation so a contribution write invalidates every list page at once
+        audience = f"user:{user_id}" if user_id else "public"
+        generation = get_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
+        return f"{CONTRIBUTIONS_LIST_NAMESPACE}:{generation}:{origin}:{audience}:{key_string}"
 
     def get(self, request, pk=None):
+        try:
+            fields = get_requested_fields(request, AllContributionSerializer)
+        except ValueError as e:
+            return create_error_response(str(e))
+
         # For individual contribution detail view
         if pk:
-            return self._get_contribution_detail(request, pk)
+            return self._get_contribution_detail(request, pk, fields)
+
+        # For listing view with millions of records.
+        # The cache key already names this exact representation, so it doubles as the ETag
+        cache_key = self.get_cached_key(
+            request.query_params, fields, self._get_list_audience(request, fields), self._get_list_origin(request)
+        )
+        return conditional_response(
+            request,
+            make_etag(cache_key),
+            lambda: self._get_contribution_list(request, fields, cache_key),
+            may_gzip=getattr(settings, 'CACHED_RESPONSE_GZIP', False)
+        )
 
-        # For listing view with millions of records
-        return self._get_contribution_list(request)
+    def _get_list_audience(self, request, fields=None):
+        """
+        ID of the user a listing page is rendered for, or None if every client gets the same page.
+        Enrollment state and gated media depend on the user; everything else is shared.
+        """
+        if not request.user.is_authenticated:
+            return None
+        if fields is not None and not self.user_dependent_fields & set(fields):
+            return None
+        return request.user.id
+    
+    def _get_list_origin(self, request):
+        """Scheme and host of the request, which the next/previous links of a listing page are built on"""
+        return f"{request.scheme}://{request.get_host()}"
         
-    def _get_contribution_detail(self, request, pk):
-        # For individual contribution, use a different cache key
-        cache_key = f"contribution_detail:{pk}"
-        cached_response = cache.get(cache_key)
-        if cached_response:
-            return Response(cached_response)
-            
+    def _get_contribution_detail(self, request, pk, fields=None):
+        # The detail response is cached in two parts: a public part shared by every
+        # user, and a small per-user overlay with enrollment state and gated media
         try:
-            # Only select the related fields we actually need
-            contribution = Contributions.objects.select_related(
-                'related_University',
-                'related_Department',
-                'related_Major_Subject',
-                'user'
-            ).prefetch_related(
-                'tags',
-                Prefetch('videos', queryset=ContributionVideos.objects.only('id', 'title', 'video_file')),
-                Prefetch('notes', queryset=ContributionNotes.objects.only('id', 'note_file')),
-                
-            ).get(id=pk)
-            
-            serializer = AllContributionSerializer(contribution, context={'request': request})
-            response_data = {
-                'status': True,
-                'message': 'Contribution fetched successfully',
-                'data': serializer.data
-            }
-            
-            # Cache individual contribution detail
-            cache_timeout = getattr(settings, 'CACHE_TIMEOUTS', {}).get('contribution_detail', 600)
-            cache.set(cache_key, response_data, timeout=cache_timeout)
-            
-            return Response(response_data, status=status.HTTP_200_OK)
+            public_detail = self._get_public_contribution_detail(pk)
         except Contributions.DoesNotExist:
             return create_error_response('Contribution not found', status_code=status.HTTP_404_NOT_FOUND)
+        
+        overlay = self._get_contribution_user_overlay(request, pk, public_detail['version'])
+        
+        # Both parts come from the cache, so the tag costs no serialization
+        etag = make_etag(
+            'contribution_detail', pk, public_detail['version'],
+            request.user.id, overlay['is_enrolled'], fields
+        )
+        
+        # The cached detail is a single full copy; sparse fieldsets are cut from it
+        return conditional_response(request, etag, lambda: Response({
+            'status': True,
+            'message': 'Contribution fetched successfully',
+            'data': prune_fields({**public_detail['data'], **overlay}, fields)
+        }, status=status.HTTP_200_OK))
+    
+    def _get_public_contribution_detail(self, pk):
+        """
+        Return the user-independent part of a contribution detail, cached once per contribution.
+        Raises Contributions.DoesNotExist if the contribution does not exist.
+        """
+        # Hot details are served from this process's memory; each contribution has its own
+        # generation, which every write that changes the payload bumps, and taxonomy or
+        # tag renames move the shared taxonomy and tag generations instead
+        cache_timeout = getattr(settings, 'CACHE_TIMEOUTS', {}).get('contribution_detail', 600)
+        return tiered_cache.get_or_build(
+            contribution_detail_key(pk),
+            contribution_detail_namespaces(pk),
+            lambda: self._build_public_contribution_detail(pk),
+            cache_timeout
+        )
+    
+    def _build_public_contribution_detail(self, pk):
+        # Only select the related fields we actually need
+        contribution = Contributions.objects.select_related(
+            'related_University',
+            'related_Department',
+            'related_Major_Subject',
+            'user'
+        ).prefetch_related(
+            'tags',
+            latest_comments_prefetch(),
+        ).annotate(
+            comment_count=Count('comments')
+        ).get(id=pk)
+        
+        # An empty enrollment set keeps gated media out of the shared payload
+        serializer = AllContributionSerializer(contribution, context={'enrolled_ids': set()})
+        data = serializer.data
+        data.pop('is_enrolled', None)
+        
+        # The version ties per-user overlays to this copy of the public part,
+        # so overlays built against an older copy are rebuilt
+        return {
+            'version': uuid4().hex,
+            'data': data
+        }
+    
+    def _get_contribution_user_overlay(self, request, pk, version):
+        """Return the requesting user's enrollment state and, if enrolled, the gated videos and notes"""
+        if not request.user.is_authenticated:
+            return {'is_enrolled': False}
+        
+        cache_key = contribution_detail_user_key(pk, request.user.id)
+        cached_overlay = cache.get(cache_key)
+        if cached_overlay and cached_overlay['version'] == version:
+            return cached_overlay['data']
+        
+        overlay = {'is_enrolled': bool(get_enrolled_contribution_ids(request.user, [pk]))}
+        if overlay['is_enrolled']:
+            videos = ContributionVideos.objects.filter(contribution_id=pk).only('id', 'title', 'video_file')
+            notes = ContributionNotes.objects.filter(contribution_id=pk).only('id', 'note_file')
+            overlay['videos'] = ContributionVideoSerializer(videos, many=True).data
+            overlay['notes'] = ContributionNoteSerializer(notes, many=True).data
+        
+        cache_timeout = getattr(settings, 'CACHE_TIMEOUTS', {}).get('contribution_detail', 600)
+        cache.set(cache_key, {'version': version, 'data': overlay}, timeout=cache_timeout)
+        return overlay
             
-    def _get_contribution_list(self, request):
+    def _get_contribution_list(self, request, fields=None, cache_key=None):
+        if cache_key is None:
+            cache_key = self.get_cached_key(
+                request.query_params, fields, self._get_list_audience(request, fields), self._get_list_origin(request)
+            )
+        
+        # One request per key renders the page while concurrent ones wait for it or reuse the
+        # previous copy. A hit is served straight from the stored bytes, without unpickling
+        # a payload or rendering it
+        built = {}
+        def build_entry():
+            built['data'] = self._build_contribution_list(request, fields)
+            return encode_cached_response(built['data'], make_etag(cache_key))
+        
+        cache_timeout = getattr(settings, 'CACHE_TIMEOUTS', {}).get('contributions_list', 300)
+        try:
+            entry = get_or_build(cache_key, build_entry, cache_timeout)
+        except ValueError as e:
+            return create_error_response(str(e))
+        return cached_response(request, entry, built.get('data'))
+
+    def _build_contribution_list(self, request, fields=None):
+        """
+        Query and serialize one listing page.
+        Raises ValueError with a client-facing message for invalid parameters.
+        """
         # Build filter query params
         filter_params = {}
         university_id = request.query_params.get('university')
@@ -575,12 +1209,15 @@ class AllContributionView(APIView):
         major_subject_id = request.query_params.get('major_subject')
         user_id = request.query_params.get('user')
         tag_name = request.query_params.get('tag')
-        
-        # Try to get cached response for this specific query
-        cache_key = self.get_cached_key(request.query_params)
-        cached_response = cache.get(cache_key)
-        if cached_response:
-            return Response(cached_response)
+        search_query = request.query_params.get('q', '').strip()
+
+        count_mode = request.query_params.get('count') or (
+            'none' if self._uses_cursor_pagination(request) else 'estimate'
+        )
+        if count_mode not in self.count_modes:
+            raise ValueError('Invalid count mode')
+
+        range_filters = self._parse_range_filters(request.query_params)
 
         # Get filtered contributions queryset
         contributions = self._get_filtered_contributions(
@@ -591,19 +1228,43 @@ class AllContributionView(APIView):
             user_id, 
             tag_name
         )
+        contributions = self._apply_range_filters(contributions, range_filters)
+        
+        # Explicit ordering wins; otherwise search orders by relevance and listings newest first
+        ordering_param = request.query_params.get('ordering')
+        ordering = self._resolve_ordering(ordering_param)
+        if search_query:
+            contributions = filter_by_search(contributions, search_query)
+        if ordering_param or not search_query:
+            contributions = contributions.order_by(
+                *keyset_order_by(Contributions, ordering.lstrip('-'), ordering.startswith('-'))
+            )
         
-        contributions = contributions.order_by('-created_at')
-        
-        # Get count efficiently without retrieving all objects
-        try:
-            total_count = contributions.count()
-        except Exception :
-            # Fallback if count() is too slow
-            total_count = None
+        use_cursor = self._uses_cursor_pagination(request)
+        
+        # Resolve the total count without blocking on COUNT(*) unless the client asked for it
+        count_filters = {
+            'university': university_id,
+            'department': department_id,
+            'major_subject': major_subject_id,
+            'user': user_id,
+            'tag': normalize_tag_slug(tag_name) if tag_name else None,
+            'q': ' '.join(search_query.lower().split()),
+            **{key: str(value) for key, value in range_filters.items()},
+        }
+        count_filters = {key: value for key, value in count_filters.items() if value}
+        total_count = self._get_total_count(contributions, count_filters, count_mode)
         
         # Apply pagination - critical for millions of records
-        paginator = self.pagination_class()
-        paginated_qs = paginator.paginate_queryset(contributions, request)
+        if use_cursor:
+            paginator = self.cursor_pagination_class(ordering)
+            try:
+                paginated_qs = paginator.paginate_queryset(contributions, request)
+            except ValueError:
+                raise ValueError('Invalid cursor')
+        else:
+            paginator = self.pagination_class()
+            paginated_qs = paginator.paginate_queryset_with_count(contributions, request, total_count)
         
         # Process paginated results
         response_data = self._process_paginated_results(
@@ -615,15 +1276,119 @@ class AllContributionView(APIView):
             department_id, 
             major_subject_id, 
             user_id, 
-            tag_name
+            tag_name,
+            search_query=search_query,
+            fields=fields
         )
+        response_data['filters_applied'].update({
+            key: range_filters.get(key) for key in self.range_filter_params
+        })
+        response_data['pagination']['count_mode'] = count_mode
+        response_data['ordering'] = ordering_param or ('relevance' if search_query else ordering)
 
-        # Get cache timeout from settings or use default (5 minutes)
-        cache_timeout = getattr(settings, 'CACHE_TIMEOUTS', {}).get('contributions_list', 300)
-        cache.set(cache_key, response_data, timeout=cache_timeout)
+        return response_data
 
-        return Response(response_data, status=status.HTTP_200_OK)
+    def get_count_cache_key(self, count_filters):
+        """Cache key of the exact count for a normalized filter set, shared by every page"""
+        key_string = "-".join(f"{key}:{count_filters[key]}" for key in sorted(count_filters)) or "all"
+        generation = get_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
+        return f"contributions_count:{generation}:{key_string}"
+
+    def _get_total_count(self, contributions, count_filters, count_mode):
+        """Total for the pagination block according to the requested count mode"""
+        if count_mode == 'none':
+            return None
+        
+        cache_key = self.get_count_cache_key(count_filters)
+        if count_mode == 'estimate':
+            estimate = self._estimate_count(count_filters)
+            if estimate is None:
+                # No counter covers these filters: only reuse an exact count computed earlier
+                return cache.get(cache_key)
+            # A zero may only mean the counters were never built on this database
+            if estimate or facet_counts_built():
+                return estimate
+        
+        total_count = cache.get(cache_key)
+        if total_count is None:
+            try:
+                total_count = contributions.count()
+            except Exception:
+                return None
+            cache_timeout = getattr(settings, 'CACHE_TIMEOUTS', {}).get('contributions_count', 900)
+            cache.set(cache_key, total_count, timeout=cache_timeout)
+        return total_count
+
+    def _estimate_count(self, count_filters):
+        """Count from the facet counters, or None if they do not cover the filters"""
+        if set(count_filters) - {'university', 'department', 'major_subject', 'tag'}:
+            return None
+        try:
+            filter_ids = {
+                f'{key}_id': UUID(count_filters[key])
+                for key in ('university', 'department', 'major_subject') if key in count_filters
+            }
+        except ValueError:
+            return None
+        return estimate_contribution_count(tag_slug=count_filters.get('tag'), **filter_ids)
+
+    def _resolve_ordering(self, ordering_param):
+        """
+        Map ?ordering= to a model field, keeping the '-' prefix for descending.
+        Raises ValueError for orderings outside the whitelist.
+        """
+        if not ordering_param:
+            return self.default_ordering
+        name = ordering_param.lstrip('-')
+        if name not in self.orderings or ordering_param.count('-') > 1:
+            raise ValueError(f"Invalid ordering. Use one of: {', '.join(sorted(self.orderings))}, optionally prefixed with '-'")
+        prefix = '-' if ordering_param.startswith('-') else ''
+        return f'{prefix}{self.orderings[name]}'
+
+    def _uses_cursor_pagination(self, request):
+        """Cursor mode is opt-in via ?pagination=cursor or by passing a cursor"""
+        params = request.query_params
+        return params.get('pagination') == 'cursor' or bool(params.get('cursor'))
         
+    def _parse_range_filters(self, params):
+        """
+        Read the price and rating filters from the query string.
+        Returns a dict holding only the filters that were given; raises ValueError for bad values.
+        """
+        range_filters = {}
+        for param in ('min_price', 'max_price', 'min_rating'):
+            value = params.get(param)
+            if not value:
+                continue
+            try:
+                range_filters[param] = Decimal(value)
+            except InvalidOperation:
+                raise ValueError(f'Invalid {param}')
+            if not range_filters[param].is_finite() or range_filters[param] < 0:
+                raise ValueError(f'Invalid {param}')
+        
+        if range_filters.get('min_rating', 0) > 5:
+            raise ValueError('Invalid min_rating')
+        if params.get('free_only', '').lower() in ('true', '1'):
+            range_filters['free_only'] = True
+        return range_filters
+
+    def _apply_range_filters(self, contributions, range_filters):
+        """
+        Apply price and rating filters. Each is a range on an indexed column, so
+        SQLite answers them with an index search instead of a table scan.
+        """
+        if 'min_price' in range_filters:
+            contributions = contributions.filter(price__gte=range_filters['min_price'])
+        if 'max_price' in range_filters:
+            contributions = contributions.filter(price__lte=range_filters['max_price'])
+        if 'min_rating' in range_filters:
+            contributions = contributions.filter(rating__gte=range_filters['min_rating'])
+        if range_filters.get('free_only'):
+            # Enrollment treats a missing price as free too
+            contributions = contributions.filter(Q(price=0) | Q(price__isnull=True))
+        return contributions
+
     def _get_filtered_contributions(self, filter_params, university_id, department_id, major_subject_id, user_id, tag_name):
         # Start with optimized queryset - only select needed fields to reduce memory usage
         # For large datasets, we want to be very specific about what we fetch
@@ -647,12 +1412,10 @@ class AllContributionView(APIView):
         if filter_params:
             contributions = contributions.filter(**filter_params)
         
-        # Apply tag filter separately since it requires a more complex lookup
+        # Tag filter is an equality match on the unique, indexed tag slug.
+        # A contribution holds each tag once, so no DISTINCT is needed
         if tag_name:
-            try:
-                contributions = contributions.filter(tags__name__icontains=tag_name).distinct()
-            except Exception:
-                return create_error_response('Invalid tag name')
+            contributions = contributions.filter(tags__slug=normalize_tag_slug(tag_name))
                 
         return contributions
     
@@ -685,25 +1448,61 @@ class AllContributionView(APIView):
         
         return filter_params
         
-    def _process_paginated_results(self, paginated_qs, request, total_count, paginator, university_id, department_id, major_subject_id, user_id, tag_name):
+    def _get_page_contributions(self, ids_in_page, fields=None):
+        """
+        Load the full rows of one page, limited to the columns, joins and
+        prefetches that the requested sparse fieldset actually serializes
+        """
+        def wanted(name):
+            return fields is None or name in fields
+        
+        related = [
+            name for name in ('related_University', 'related_Department', 'related_Major_Subject')
+            if wanted(name)
+        ]
+        prefetches = []
+        if wanted('tags'):
+            prefetches.append('tags')
+        if wanted('videos'):
+            prefetches.append(Prefetch('videos', queryset=ContributionVideos.objects.only('id', 'title', 'video_file')))
+        if wanted('notes'):
+            prefetches.append(Prefetch('notes', queryset=ContributionNotes.objects.only('id', 'note_file')))
+        if wanted('comments'):
+            prefetches.append(latest_comments_prefetch())
+        
+        contributions = Contributions.objects.filter(id__in=ids_in_page).select_related(
+            *related
+        ).prefetch_related(*prefetches)
+        if wanted('comment_count'):
+            contributions = contributions.annotate(comment_count=Count('comments'))
+        if fields is not None:
+            columns = {field.name for field in Contributions._meta.concrete_fields} & set(fields)
+            contributions = contributions.only('id', *columns)
+        return contributions
+
+    def _process_paginated_results(self, paginated_qs, request, total_count, paginator, university_id, department_id, major_subject_id, user_id, tag_name, search_query=None, fields=None):
         # Only after pagination, load the related objects for the paginated subset
         # This is key for handling millions of records - only load relations for the current page
         ids_in_page = [item.id for item in paginated_qs]
         if ids_in_page:
             # Now get complete data only for the paginated items
-            detailed_contributions = Contributions.objects.filter(id__in=ids_in_page).select_related(
-                'related_University',
-                'related_Department',
-                'related_Major_Subject',
-                'user'
-            ).prefetch_related(
-                'tags',
-                Prefetch('videos', queryset=ContributionVideos.objects.only('id', 'title', 'video_file')),
-                Prefetch('notes', queryset=ContributionNotes.objects.only('id', 'note_file')),
-                
-            ).order_by('-created_at')
+            detailed_contributions = self._get_page_contributions(ids_in_page, fields)
+            
+            # Keep the order the page was paginated in (newest first or search relevance)
+            position = {pk: index for index, pk in enumerate(ids_in_page)}
+            detailed_contributions = sorted(detailed_contributions, key=lambda item: position[item.id])
             
-            serializer = AllContributionSerializer(detailed_contributions, many=True, context={'request': request})
+            # Resolve enrollment status for the whole page in a single query
+            if fields is None or self.user_dependent_fields & set(fields):
+                enrolled_ids = get_enrolled_contribution_ids(request.user, ids_in_page)
+            else:
+                enrolled_ids = set()
+            serializer = AllContributionSerializer(
+                detailed_contributions,
+                many=True,
+                fields=fields,
+                context={'request': request, 'enrolled_ids': enrolled_ids}
+            )
         else:
             serializer = AllContributionSerializer([], many=True, context={'request': request})
         
@@ -716,21 +1515,72 @@ class AllContributionView(APIView):
                 'department': department_id if department_id else None,
                 'major_subject': major_subject_id if major_subject_id else None,
                 'tag': tag_name if tag_name else None,
-                'user': user_id if user_id else None
-            },
-            'pagination': {
-                'count': total_count,
-                'next': request.build_absolute_uri(paginator.get_next_link()) if paginator.get_next_link() else None,
-                'previous': request.build_absolute_uri(paginator.get_previous_link()) if paginator.get_previous_link() else None,
-                'limit': paginator.limit,
-                'offset': paginator.offset,
+                'user': user_id if user_id else None,
+                'q': search_query if search_query else None
             },
+            'pagination': paginator.get_pagination_details(request, total_count),
             'data': serializer.data
         }
 
 
 
 
+class ContributionFacetView(APIView):
+    """
+    Facet counts for the contribution browse filters
+    GET /api/contribution-facets/?university=<uuid>&department=<uuid>&major_subject=<uuid>&tag=<tag_name>
+    
+    Returns the total number of contributions matching the filters and, for each
+    university, department, major subject and tag, how many of them it holds.
+    Counts come from a table maintained on every contribution and tag change,
+    so no query scans the contributions table.
+    """
+    def get(self, request):
+        filters = {}
+        for param in ('university', 'department', 'major_subject'):
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    filters[f'{param}_id'] = UUID(value)
+                except ValueError:
+                    return create_error_response(f'Invalid {param} ID')
+        
+        tag_name = request.query_params.get('tag')
+        if tag_name:
+            filters['tag_slug'] = normalize_tag_slug(tag_name)
+        
+        response_data = {
+            'status': True,
+            'message': 'Facets fetched successfully',
+            'filters_applied': {
+                'university': request.query_params.get('university') or None,
+                'department': request.query_params.get('department') or None,
+                'major_subject': request.query_params.get('major_subject') or None,
+                'tag': tag_name or None,
+            },
+            'data': get_facet_counts(**filters)
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class CacheStatsView(APIView):
+    """
+    Hit ratios of the two cache tiers (in-process LRU and shared cache) for staff
+    GET /api/cache-stats/
+    POST /api/cache-stats/ resets the counters
+    
+    Counters are kept per worker process, so each request reports the process that served it.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return create_success_response('Cache stats fetched successfully', tiered_cache.stats())
+
+    def post(self, request):
+        tiered_cache.reset_stats()
+        return create_success_response('Cache stats reset successfully', tiered_cache.stats())
+
+
 class ContributionCommentView(APIView):
     """
     Handle contribution comments
@@ -744,17 +1594,35 @@ class ContributionCommentView(APIView):
 
     def get(self, request, contribution_id=None):
         """
-        if contribution_id is provided, get all comments of a contribution
-        if no contribution_id is provided, get all comments
+        if contribution_id is provided, get the comments of a contribution
+        if no contribution_id is provided, get a feed of all comments
+        Comments are returned newest first, one page at a time: ?limit=10, then
+        follow the returned next/previous cursors (?cursor=<token>)
         """
+        comments = ContributionsComments.objects.all()
         if contribution_id:
-            contribution = get_object_or_404(Contributions, id=contribution_id)
-            comments = ContributionsComments.objects.filter(contribution=contribution)
-            serializer = ContributionCommentSerializer(comments, many=True)
-        else:
-            comments = ContributionsComments.objects.all()
-            serializer = ContributionCommentSerializer(comments, many=True)
-        return create_success_response('Comments fetched successfully', serializer.data)
+            contribution = get_object_or_404(Contributions.objects.only('id'), id=contribution_id)
+            comments = comments.filter(contribution=contribution)
+
+        paginator = CommentCursorPagination()
+        try:
+            page = paginator.paginate_queryset(comments, request)
+        except ValueError:
+            return create_error_response('Invalid cursor')
+
+        serializer = ContributionCommentSerializer(page, many=True)
+        return Response({
+            'status': True,
+            'message': 'Comments fetched successfully',
+            # Counting every comment would defeat the constant-cost page reads
+            'pagination': paginator.get_pagination_details(request, None),
+            'data': serializer.data
+        })
+
+    def _invalidate_contribution_caches(self, contribution_id):
+        """List and detail payloads embed the latest comments and the comment count"""
+        bump_cache_generation(contribution_detail_key(contribution_id))
+        bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
 
     def post(self, request):
         """
@@ -764,7 +1632,8 @@ class ContributionCommentView(APIView):
         data['user'] = request.user.id
         serializer = ContributionCommentSerializer(data=data)
         if serializer.is_valid():
-            serializer.save()
+            comment = serializer.save()
+            self._invalidate_contribution_caches(comment.contribution_id)
             return create_success_response(
                 'Comment Posted successfully',
                 serializer.data,
@@ -782,6 +1651,7 @@ class ContributionCommentView(APIView):
         comment = get_object_or_404(ContributionsComments, id=comment_id, contribution=contribution)
         if comment.user.id == request.user.id:
             comment.delete()
+            self._invalidate_contribution_caches(contribution.id)
             return create_success_response('Comment deleted successfully')
         else:
             return create_error_response(
@@ -801,6 +1671,7 @@ class ContributionCommentView(APIView):
             serializer = ContributionCommentSerializer(comment, data=data)
             if serializer.is_valid():
                 serializer.save()
+                self._invalidate_contribution_caches(contribution.id)
                 return create_success_response('Comment updated successfully', serializer.data)
         else:
             return create_error_response(
@@ -848,7 +1719,7 @@ class ContributionRatingView(APIView):
             
             return create_success_response('Ratings fetched successfully', {
                 'average_rating': contribution.rating,
-                'total_ratings': ratings.count(),
+                'total_ratings': contribution.rating_count,
                 'ratings': serializer.data
             })
     
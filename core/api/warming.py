@@ -0,0 +1,152 @@
+from io import BytesIO
+import logging
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.signals import request_started
+from django.db import connections
+
+from .facets import FACET_DIMENSIONS, get_facet_counts
+from .models import Contributions
+
+
+logger = logging.getLogger(__name__)
+
+LIST_PATH = '/api/all-contributions/'
+
+
+def get_warm_targets(filters=20, details=50):
+    """
+    Listing pages and contribution details worth having in the cache, hottest first:
+    the default pages, the largest university/department/major subject/tag
+    filters according to the facet counts, and the most enrolled contributions
+    """
+    targets = [
+        ('list', {}),
+        ('list', {'pagination': 'cursor'}),
+    ]
+
+    facets = get_facet_counts()
+    for dimension in FACET_DIMENSIONS:
+        targets.extend(('list', {dimension: str(row['id'])}) for row in facets[dimension][:filters])
+    targets.extend(('list', {'tag': row['slug']}) for row in facets['tag'][:filters] if row['slug'])
+
+    contribution_ids = Contributions.objects.order_by('-enrollment_count', '-created_at').values_list(
+        'id', flat=True
+    )[:details]
+    targets.extend(('detail', str(pk)) for pk in contribution_ids)
+    return targets
+
+
+def _list_request(params, origin):
+    """
+    Anonymous GET of a listing page. Pages are built from their query parameters and
+    link to their neighbours, so the build path needs the parameters and origin of a request.
+    """
+    parts = urlsplit(origin)
+    secure = parts.scheme == 'https'
+    return WSGIRequest({
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': LIST_PATH,
+        'QUERY_STRING': urlencode(params),
+        'SERVER_NAME': parts.hostname,
+        'SERVER_PORT': str(parts.port or (443 if secure else 80)),
+        'HTTP_HOST': parts.netloc,
+        'wsgi.url_scheme': 'https' if secure else 'http',
+        'wsgi.input': BytesIO(),
+    })
+
+
+def warm_caches(origin, filters=20, details=50):
+    """
+    Build every warm target into the shared cache through AllContributionView's own
+    build paths, under the keys real requests look up. The cache is shared by every
+    worker process, so one run warms them all.
+    Listing pages are cached per origin, because their pagination links are absolute:
+    origin ('https://api.example.com') must be the one clients reach the API on.
+    Returns a list of (kind, target, status_code, seconds) tuples.
+    """
+    from .views import AllContributionView
+
+    view = AllContributionView()
+
+    results = []
+    for kind, target in get_warm_targets(filters, details):
+        started = time.monotonic()
+        if kind == 'list':
+            request = view.initialize_request(_list_request(target, origin))
+            status_code = view._get_contribution_list(request).status_code
+        else:
+            try:
+                view._get_public_contribution_detail(target)
+                status_code = 200
+            except Contributions.DoesNotExist:
+                status_code = 404
+        results.append((kind, target, status_code, time.monotonic() - started))
+    return results
+
+
+def summarize_warm_results(results):
+    """One line per target kind: how many, how long in total and the slowest one"""
+    lines = []
+    for kind in ('list', 'detail'):
+        timings = [result for result in results if result[0] == kind]
+        if not timings:
+            continue
+        failed = sum(1 for result in timings if result[2] != 200)
+        slowest = max(timings, key=lambda result: result[3])
+        line = (
+            f"{kind}: {len(timings)} warmed in {sum(result[3] for result in timings):.2f}s, "
+            f"slowest {slowest[3]:.3f}s ({slowest[1] or 'default'})"
+        )
+        if failed:
+            line += f", {failed} failed"
+        lines.append(line)
+    return lines
+
+
+_startup_lock = threading.Lock()
+_startup_warmed = False
+
+
+def warm_on_first_request(sender, environ=None, scope=None, **kwargs):
+    """
+    request_started receiver installed when WARM_CACHES_ON_STARTUP is enabled.
+    Warms the cache once per process in a background thread, using the first
+    request's host so cached pagination links point at the right origin.
+    Entries another worker already built are found in the shared cache and kept.
+    """
+    global _startup_warmed
+    with _startup_lock:
+        if _startup_warmed:
+            return
+        _startup_warmed = True
+    request_started.disconnect(warm_on_first_request, dispatch_uid='api.warm_caches')
+
+    if environ is not None:
+        host = environ.get('HTTP_HOST') or environ.get('SERVER_NAME', 'localhost')
+        scheme = environ.get('wsgi.url_scheme', 'http')
+    else:
+        headers = dict((scope or {}).get('headers', []))
+        host = headers.get(b'host', b'localhost').decode('latin-1')
+        scheme = (scope or {}).get('scheme', 'http')
+
+    threading.Thread(target=_warm_in_background, args=(f"{scheme}://{host}",), daemon=True).start()
+
+
+def _warm_in_background(origin):
+    try:
+        results = warm_caches(
+            origin,
+            filters=getattr(settings, 'WARM_CACHES_FILTERS', 20),
+            details=getattr(settings, 'WARM_CACHES_DETAILS', 50),
+        )
+        for line in summarize_warm_results(results):
+            logger.info(f"Cache warming {line}")
+    except Exception:
+        logger.exception("Cache warming failed")
+    finally:
+        connections.close_all()
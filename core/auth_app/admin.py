@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .models import CustomUser, EmailOutbox
 # Register your models here.
 
 class CustomUserAdmin(UserAdmin):
@@ -24,4 +24,4 @@ class CustomUserAdmin(UserAdmin):
     ordering = ('email',)
 
 admin.site.register(CustomUser, CustomUserAdmin)
-
+admin.site.register(EmailOutbox)
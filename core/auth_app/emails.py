@@ -1,61 +1,160 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import logging
 from .utils import generate_otp
-from .models import CustomUser
+from .models import CustomUser, EmailOutbox
 
+logger = logging.getLogger(__name__)
 
 
-def send_otp_via_email(email):
-    subject = 'Your Email Verification OTP'
+def queue_email(subject, message, email):
+    """
+    Persist an email in the outbox instead of sending it in the request path.
+    The send_queued_emails worker delivers it later.
+    """
+    return EmailOutbox.objects.create(
+        to_email=email,
+        subject=subject,
+        body=message,
+    )
+
+
+def _queue_otp_email(email, subject, message_template):
+    """Generate an OTP, store it on the user and queue the email in one transaction"""
     otp = generate_otp()
-    message = f'Your OTP for email verification is: {otp}'
-    email_from = settings.EMAIL_HOST_USER
-    
+    message = message_template.format(otp=otp)
+
     try:
-        # Send email
-        send_mail(
-            subject,
-            message,
-            email_from,
-            [email],
-            fail_silently=False,
-        )
-        
-        # Update user's OTP in database
-        user = CustomUser.objects.get(email=email)
-        user.otp = otp
-        user.save()
-        
+        with transaction.atomic():
+            # Update user's OTP in database
+            user = CustomUser.objects.get(email=email)
+            user.otp = otp
+            user.save(update_fields=['otp'])
+
+            queue_email(subject, message, email)
+
         return otp
     except Exception as e:
-        print(f"Error sending email: {str(e)}")
+        logger.error(f"Error queueing email: {str(e)}")
         return None
 
+
+def send_otp_via_email(email):
+    return _queue_otp_email(
+        email,
+        'Your Email Verification OTP',
+        'Your OTP for email verification is: {otp}'
+    )
+
 def send_otp_via_email_forgot_password(email):
-    subject = 'Your Password Reset OTP'
-    otp = generate_otp()
-    message = f'Your OTP for password reset is: {otp}'
-    email_from = settings.EMAIL_HOST_USER
+    return _queue_otp_email(
+        email,
+        'Your Password Reset OTP',
+        'Your OTP for password reset is: {otp}'
+    )
+
+
+def _retry_delay(attempts):
+    """Exponential backoff: base delay doubled for each failed attempt, capped at one hour"""
+    base_delay = getattr(settings, 'EMAIL_OUTBOX_RETRY_DELAY', 30)
+    return timedelta(seconds=min(base_delay * (2 ** (attempts - 1)), 3600))
+
+
+def _claim_due_emails(batch_size):
+    """
+    Lease a batch of due emails to this worker by pushing their next_attempt_at past
+    EMAIL_OUTBOX_LEASE. Each claim is a single conditional UPDATE that only succeeds
+    if the row is still due as read, so concurrent workers never claim the same row,
+    on any database and without holding a lock while mail is sent. If a worker dies
+    mid-batch its unsent emails become due again once the lease runs out.
+    """
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE', 300))
+    due = EmailOutbox.objects.filter(
+        status=EmailOutbox.STATUS_PENDING,
+        next_attempt_at__lte=now
+    ).order_by('next_attempt_at').values_list('pk', 'next_attempt_at')[:batch_size]
 
+    claimed_ids = [
+        pk for pk, next_attempt_at in due
+        if EmailOutbox.objects.filter(
+            pk=pk,
+            status=EmailOutbox.STATUS_PENDING,
+            next_attempt_at=next_attempt_at
+        ).update(next_attempt_at=lease_until)
+    ]
+    return list(EmailOutbox.objects.filter(pk__in=claimed_ids).order_by('created_at'))
+
+
+def deliver_queued_emails(batch_size=None):
+    """
+    Send one batch of due emails from the outbox over a single SMTP connection.
+    Failed emails are retried with exponential backoff until EMAIL_OUTBOX_MAX_ATTEMPTS
+    is reached, after which they are marked as failed.
+
+    The batch is claimed first, then sent outside any transaction, and each result
+    is written as its own short update, so requests queueing new emails are never
+    blocked behind the mail server.
+
+    Returns:
+        A (sent, failed) tuple with the number of delivery attempts that succeeded and failed
+    """
+    batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100)
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    sent = failed = 0
+
+    batch = _claim_due_emails(batch_size)
+    if not batch:
+        return sent, failed
+
+    connection = get_connection(fail_silently=False)
     try:
-        # Send email
-        send_mail(
-            subject,
-            message,
-            email_from,
-            [email],
-            fail_silently=False,
-        )
-        
-        # Update user's OTP in database 
-        user = CustomUser.objects.get(email=email)
-        user.otp = otp
-        user.save()
-        
-        return otp
-    except Exception as e:  
-        print(f"Error sending email: {str(e)}")
-        return None
-    
+        connection.open()
+    except Exception as e:
+        # Mail server unreachable - reschedule the whole batch
+        logger.error(f"Could not connect to mail server: {str(e)}")
+        for item in batch:
+            _mark_failed(item, e, max_attempts)
+        return sent, len(batch)
+
+    try:
+        for item in batch:
+            message = EmailMessage(
+                item.subject,
+                item.body,
+                settings.EMAIL_HOST_USER,
+                [item.to_email],
+                connection=connection,
+            )
+            try:
+                message.send(fail_silently=False)
+            except Exception as e:
+                logger.error(f"Error sending email {item.id}: {str(e)}")
+                _mark_failed(item, e, max_attempts)
+                failed += 1
+                continue
+
+            item.status = EmailOutbox.STATUS_SENT
+            item.attempts += 1
+            item.sent_at = timezone.now()
+            item.last_error = None
+            item.save(update_fields=['status', 'attempts', 'sent_at', 'last_error'])
+            sent += 1
+    finally:
+        connection.close()
+
+    return sent, failed
 
 
+def _mark_failed(item, error, max_attempts):
+    """Record a failed attempt and schedule a retry, or give up after max_attempts"""
+    item.attempts += 1
+    item.last_error = str(error)
+    if item.attempts >= max_attempts:
+        item.status = EmailOutbox.STATUS_FAILED
+    else:
+        item.next_attempt_at = timezone.now() + _retry_delay(item.attempts)
+    item.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
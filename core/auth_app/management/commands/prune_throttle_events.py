@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from auth_app.throttling import DatabaseThrottleBackend
+
+
+class Command(BaseCommand):
+    """
+    Delete expired login/registration attempts of every key from the ThrottleEvent table.
+    Attempts are also pruned now and then while recording new ones; run this from
+    cron to keep the table small regardless of traffic.
+    """
+    help = 'Delete expired throttle events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=None,
+            help='Age in seconds of the events deleted (default: THROTTLE_EVENT_RETENTION)'
+        )
+
+    def handle(self, *args, **options):
+        deleted = DatabaseThrottleBackend().prune(options['older_than'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired throttle events'))
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auth_app.emails import deliver_queued_emails
+
+
+class Command(BaseCommand):
+    """
+    Deliver emails queued in the EmailOutbox table.
+    Run it once (e.g. from cron) or with --loop as a long-running worker.
+    """
+    help = 'Send queued outgoing emails in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Emails sent per SMTP connection (default: EMAIL_OUTBOX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling the outbox instead of exiting once it is drained'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the outbox is empty (default: 2)'
+        )
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+
+        while True:
+            sent, failed = deliver_queued_emails(batch_size=options['batch_size'])
+            total_sent += sent
+            total_failed += failed
+
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} emails, {failed} failed')
+                continue
+
+            # Outbox drained (or only holds emails waiting for a retry)
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {total_sent} sent, {total_failed} failed'
+        ))
@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
 from .manager import CustomUserManager
 from django.apps import apps
+from django.utils import timezone
 
 class CustomUser(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True, db_index=True)
@@ -35,5 +36,57 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
             models.Index(fields=['is_email_verified', 'is_active']),
             models.Index(fields=['date_joined']),
         ]
-    
 
+
+class EmailOutbox(models.Model):
+    """
+    Queue of outgoing emails.
+    Views persist a row here instead of talking to the mail server, and the
+    send_queued_emails management command delivers them in batches.
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_SENT = 'SENT'
+    STATUS_FAILED = 'FAILED'
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=[
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed')
+    ], default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.status})"
+
+    class Meta:
+        verbose_name = 'Outgoing email'
+        verbose_name_plural = 'Email outbox'
+        indexes = [
+            # The worker polls for due pending rows
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+
+class ThrottleEvent(models.Model):
+    """
+    One recorded attempt against a rate-limit key, used by DatabaseThrottleBackend.
+    Each attempt is its own row, so concurrent workers never overwrite each other's counts.
+    """
+    key = models.CharField(max_length=255)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.key} @ {self.created_at}"
+
+    class Meta:
+        indexes = [
+            # Sliding-window count: WHERE key = ? AND created_at >= ?
+            models.Index(fields=['key', 'created_at']),
+        ]
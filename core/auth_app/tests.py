@@ -239,3 +239,261 @@ class CustomUserAdminTest(TestCase):
         self.assertIn(('Permissions', {'fields': ('is_staff', 'is_active', 'is_superuser', 
                                                   'is_email_verified', 'is_profile_verified')}), 
                       admin_instance.fieldsets)
+
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from io import StringIO
+from unittest import mock
+from django.db import connection as db_connection
+from auth_app.emails import deliver_queued_emails
+from auth_app.models import EmailOutbox
+
+class EmailOutboxTest(APITestCase):
+    def setUp(self):
+        self.register_url = reverse('register')
+        self.forgot_password_url = reverse('forgot-password')
+
+    def _register(self, email='queued@example.com'):
+        data = {
+            'username': email.split('@')[0],
+            'email': email,
+            'password': 'NewPassword123',
+            'password2': 'NewPassword123'
+        }
+        return self.client.post(self.register_url, data)
+
+    def test_register_queues_email_without_sending(self):
+        """Test that registration persists the OTP email instead of sending it inline"""
+        response = self._register()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+
+        queued = EmailOutbox.objects.get(to_email='queued@example.com')
+        user = User.objects.get(email='queued@example.com')
+        self.assertEqual(queued.status, EmailOutbox.STATUS_PENDING)
+        self.assertIn(user.otp, queued.body)
+
+    def test_worker_sends_batch_over_one_connection(self):
+        """Test that the worker delivers all due emails and marks them as sent"""
+        for i in range(3):
+            self._register(f'user{i}@example.com')
+
+        with mock.patch('auth_app.emails.get_connection', wraps=mail.get_connection) as get_connection:
+            call_command('send_queued_emails', stdout=StringIO())
+
+        self.assertEqual(get_connection.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(
+            EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT).count(), 3
+        )
+
+    def test_worker_sends_outside_transaction_and_claims_rows(self):
+        """Test that sending holds no transaction open and a second worker skips claimed emails"""
+        self._register('first@example.com')
+        # TestCase wraps each test in atomic blocks of its own
+        test_atomic_depth = len(db_connection.atomic_blocks)
+        during_send = []
+        real_send = mail.EmailMessage.send
+
+        def send(message, *args, **kwargs):
+            during_send.append({
+                'atomic_depth': len(db_connection.atomic_blocks),
+                'second_worker': deliver_queued_emails(),
+                'register_status': self._register('second@example.com').status_code,
+            })
+            return real_send(message, *args, **kwargs)
+
+        with mock.patch('auth_app.emails.EmailMessage.send', autospec=True, side_effect=send):
+            sent, failed = deliver_queued_emails()
+
+        self.assertEqual((sent, failed), (1, 0))
+        self.assertEqual(during_send, [{
+            'atomic_depth': test_atomic_depth,
+            'second_worker': (0, 0),
+            'register_status': status.HTTP_201_CREATED,
+        }])
+        self.assertEqual([message.to for message in mail.outbox], [['first@example.com']])
+        self.assertEqual(
+            EmailOutbox.objects.get(to_email='second@example.com').status, EmailOutbox.STATUS_PENDING
+        )
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_worker_retries_with_backoff_then_gives_up(self):
+        """Test that failed emails are rescheduled and eventually marked as failed"""
+        self._register()
+        queued = EmailOutbox.objects.get()
+
+        with mock.patch('auth_app.emails.EmailMessage.send', side_effect=OSError('mail server down')):
+            call_command('send_queued_emails', stdout=StringIO())
+            queued.refresh_from_db()
+            self.assertEqual(queued.status, EmailOutbox.STATUS_PENDING)
+            self.assertEqual(queued.attempts, 1)
+            self.assertGreater(queued.next_attempt_at, timezone.now())
+
+            # Not due yet - the worker leaves it alone
+            call_command('send_queued_emails', stdout=StringIO())
+            queued.refresh_from_db()
+            self.assertEqual(queued.attempts, 1)
+
+            EmailOutbox.objects.update(next_attempt_at=timezone.now())
+            call_command('send_queued_emails', stdout=StringIO())
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, EmailOutbox.STATUS_FAILED)
+        self.assertEqual(queued.attempts, 2)
+        self.assertIn('mail server down', queued.last_error)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+import threading
+from django.db import connection
+from django.test import TransactionTestCase
+from auth_app.models import ThrottleEvent
+from auth_app.throttling import DatabaseThrottleBackend, CacheThrottleBackend
+
+class LoginThrottleTest(APITestCase):
+    def setUp(self):
+        self.login_url = reverse('login')
+
+    @override_settings(MAX_LOGIN_ATTEMPTS=3)
+    def test_login_blocked_after_max_failed_attempts(self):
+        """Test that failed logins are counted and further attempts are rejected"""
+        data = {'email': 'nobody@example.com', 'password': 'WrongPassword123'}
+        for _ in range(3):
+            response = self.client.post(self.login_url, data)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        response = self.client.post(self.login_url, data)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_attempts_outside_window_are_ignored(self):
+        """Test that the database backend only counts attempts inside the sliding window"""
+        backend = DatabaseThrottleBackend()
+        backend.hit('login_attempts:10.0.0.1', window=300)
+        ThrottleEvent.objects.update(created_at=timezone.now() - timezone.timedelta(seconds=301))
+        backend.hit('login_attempts:10.0.0.1', window=300)
+
+        self.assertEqual(backend.attempts('login_attempts:10.0.0.1', window=300), 1)
+        # Expired attempts are pruned when the key is hit again
+        self.assertEqual(ThrottleEvent.objects.count(), 1)
+
+        backend.reset('login_attempts:10.0.0.1')
+        self.assertFalse(backend.is_limited('login_attempts:10.0.0.1', limit=1, window=300))
+
+    def test_expired_events_of_every_key_are_pruned(self):
+        """Test that keys which are never hit again don't keep their rows forever"""
+        backend = DatabaseThrottleBackend()
+        backend.hit('login_attempts:10.0.0.2', window=300)
+        backend.hit('register_attempts:10.0.0.3', window=3600)
+        ThrottleEvent.objects.update(created_at=timezone.now() - timezone.timedelta(seconds=3601))
+        backend.hit('login_attempts:10.0.0.4', window=300)
+
+        out = StringIO()
+        call_command('prune_throttle_events', stdout=out)
+        self.assertIn('Deleted 2 expired throttle events', out.getvalue())
+        self.assertEqual(
+            list(ThrottleEvent.objects.values_list('key', flat=True)), ['login_attempts:10.0.0.4']
+        )
+
+        # Recording an attempt prunes the whole table now and then as well
+        ThrottleEvent.objects.update(created_at=timezone.now() - timezone.timedelta(seconds=3601))
+        with override_settings(THROTTLE_PRUNE_PROBABILITY=1):
+            backend.hit('login_attempts:10.0.0.5', window=300)
+        self.assertEqual(
+            list(ThrottleEvent.objects.values_list('key', flat=True)), ['login_attempts:10.0.0.5']
+        )
+
+    @override_settings(MAX_LOGIN_ATTEMPTS=2)
+    def test_server_errors_and_unverified_logins_are_not_counted(self):
+        """Test that attempts reserved up front are released when they shouldn't count"""
+        data = {'email': 'nobody@example.com', 'password': 'WrongPassword123'}
+        with mock.patch('auth_app.views.CustomUser.objects.select_related', side_effect=RuntimeError('db down')):
+            for _ in range(3):
+                response = self.client.post(self.login_url, data)
+                self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(ThrottleEvent.objects.count(), 0)
+
+        for _ in range(2):
+            response = self.client.post(self.login_url, data)
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(self.login_url, data)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # The rejected attempt doesn't extend the block
+        self.assertEqual(ThrottleEvent.objects.count(), 2)
+
+
+# The cache backend relies on an atomic incr(), which the DatabaseCache doesn't provide
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class ThrottleConcurrencyTest(TransactionTestCase):
+    """Hammer the throttle backends from many threads and check no attempt is lost"""
+    threads = 8
+    hits_per_thread = 25
+
+    def _hammer(self, backend, key):
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(self.hits_per_thread):
+                    backend.hit(key, window=300)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(backend.attempts(key, window=300), self.threads * self.hits_per_thread)
+
+    def test_database_backend_counts_every_hit(self):
+        self._hammer(DatabaseThrottleBackend(), 'login_attempts:concurrent-db')
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_cache_backend_counts_every_hit(self):
+        from django.core.cache import cache
+        cache.delete('login_attempts:concurrent-cache')
+        self._hammer(CacheThrottleBackend(), 'login_attempts:concurrent-cache')
+
+    def _race(self, backend, key, limit):
+        allowed = []
+        errors = []
+        barrier = threading.Barrier(self.threads)
+
+        def worker():
+            try:
+                barrier.wait()
+                allowed.append(backend.acquire(key, limit, window=300))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        # Concurrent attempts can't all pass a check made before any was recorded
+        self.assertLessEqual(allowed.count(True), limit)
+        self.assertLessEqual(backend.attempts(key, window=300), limit)
+
+    def test_database_backend_enforces_limit_under_concurrency(self):
+        self._race(DatabaseThrottleBackend(), 'login_attempts:race-db', limit=3)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_cache_backend_enforces_limit_under_concurrency(self):
+        from django.core.cache import cache
+        cache.delete('login_attempts:race-cache')
+        self._race(CacheThrottleBackend(), 'login_attempts:race-cache', limit=3)
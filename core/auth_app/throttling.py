@@ -0,0 +1,204 @@
+from datetime import timedelta
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import ThrottleEvent
+
+logger = logging.getLogger(__name__)
+
+
+class BaseThrottleBackend:
+    """
+    Counts attempts per key over a time window.
+    Views call acquire() before doing work, which records the attempt and checks
+    the limit in one step, release() when the attempt should not count after all,
+    and reset() after a successful one.
+    """
+    def hit(self, key, window):
+        """Record one attempt against key"""
+        raise NotImplementedError
+
+    def attempts(self, key, window):
+        """Number of attempts recorded against key in the last `window` seconds"""
+        raise NotImplementedError
+
+    def reset(self, key):
+        """Forget every attempt recorded against key"""
+        raise NotImplementedError
+
+    def release(self, key):
+        """Forget the most recent attempt recorded against key"""
+        raise NotImplementedError
+
+    def is_limited(self, key, limit, window):
+        return self.attempts(key, window) >= limit
+
+    def acquire(self, key, limit, window):
+        """
+        Record one attempt against key and return whether it is within limit.
+        A rejected attempt is released again, so it does not extend the block.
+        """
+        self.hit(key, window)
+        if self.attempts(key, window) > limit:
+            self.release(key)
+            return False
+        return True
+
+
+class DatabaseThrottleBackend(BaseThrottleBackend):
+    """
+    Sliding-window log stored in the ThrottleEvent table.
+    Shared by every worker process using the same database, and each hit is a
+    single INSERT, so concurrent attempts are never lost. acquire() inserts before
+    it counts, so of two concurrent attempts the later count always sees both.
+    Rows of keys that are never hit again are pruned by an occasional global
+    delete (THROTTLE_PRUNE_PROBABILITY) and by the prune_throttle_events command.
+    """
+    # SQLite allows one writer at a time; a busy database is retried briefly
+    lock_retries = 5
+    lock_retry_delay = 0.01
+
+    def _run(self, operation):
+        for attempt in range(self.lock_retries):
+            try:
+                return operation()
+            except OperationalError as e:
+                if 'locked' not in str(e) or attempt == self.lock_retries - 1:
+                    raise
+                time.sleep(self.lock_retry_delay * (2 ** attempt))
+
+    def _record(self, key, window):
+        now = timezone.now()
+        event = self._run(lambda: ThrottleEvent.objects.create(key=key, created_at=now))
+        # Drop this key's attempts that have slid out of the window
+        expired = ThrottleEvent.objects.filter(key=key, created_at__lt=now - timedelta(seconds=window))
+        self._run(expired.delete)
+        if random.random() < getattr(settings, 'THROTTLE_PRUNE_PROBABILITY', 0.01):
+            self.prune()
+        return event
+
+    def hit(self, key, window):
+        self._record(key, window)
+
+    def attempts(self, key, window):
+        since = timezone.now() - timedelta(seconds=window)
+        return self._run(ThrottleEvent.objects.filter(key=key, created_at__gte=since).count)
+
+    def reset(self, key):
+        self._run(ThrottleEvent.objects.filter(key=key).delete)
+
+    def release(self, key):
+        latest = ThrottleEvent.objects.filter(key=key).order_by('-created_at', '-pk').values_list('pk', flat=True)
+        pk = self._run(latest.first)
+        if pk is not None:
+            self._run(ThrottleEvent.objects.filter(pk=pk).delete)
+
+    def acquire(self, key, limit, window):
+        event = self._record(key, window)
+        if self.attempts(key, window) > limit:
+            self._run(ThrottleEvent.objects.filter(pk=event.pk).delete)
+            return False
+        return True
+
+    def prune(self, older_than=None):
+        """
+        Delete the events of every key older than older_than seconds, defaulting
+        to THROTTLE_EVENT_RETENTION. Returns the number of rows deleted.
+        """
+        if older_than is None:
+            older_than = getattr(settings, 'THROTTLE_EVENT_RETENTION', 3600)
+        cutoff = timezone.now() - timedelta(seconds=older_than)
+        deleted, _ = self._run(ThrottleEvent.objects.filter(created_at__lt=cutoff).delete)
+        return deleted
+
+
+class CacheThrottleBackend(BaseThrottleBackend):
+    """
+    Fixed-window counter in the configured Django cache, using atomic add/incr.
+    Needs a cache whose incr() is atomic and shared across processes (e.g. Redis or
+    Memcached); the DatabaseCache's incr() is a read followed by a write.
+    """
+    def hit(self, key, window):
+        # add() only succeeds for the first attempt in a window and starts its timeout
+        if not cache.add(key, 1, timeout=window):
+            try:
+                cache.incr(key)
+            except ValueError:
+                # Window expired between add() and incr()
+                cache.add(key, 1, timeout=window)
+
+    def attempts(self, key, window):
+        return cache.get(key, 0)
+
+    def reset(self, key):
+        cache.delete(key)
+
+    def release(self, key):
+        try:
+            cache.decr(key)
+        except ValueError:
+            # Window already expired, nothing to release
+            pass
+
+    def acquire(self, key, limit, window):
+        # incr() returns this attempt's position in the window atomically
+        if cache.add(key, 1, timeout=window):
+            count = 1
+        else:
+            try:
+                count = cache.incr(key)
+            except ValueError:
+                cache.add(key, 1, timeout=window)
+                count = 1
+        if count > limit:
+            self.release(key)
+            return False
+        return True
+
+
+class SafeThrottle:
+    """
+    Wraps the configured backend so a failing rate-limit store never blocks
+    authentication - it fails open and logs a warning.
+    """
+    def __init__(self, backend_path=None):
+        self.backend_path = backend_path
+        self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            path = self.backend_path or getattr(
+                settings, 'THROTTLE_BACKEND', 'auth_app.throttling.DatabaseThrottleBackend'
+            )
+            self._backend = import_string(path)()
+        return self._backend
+
+    def acquire(self, key, limit, window):
+        try:
+            return self.backend.acquire(key, limit, window)
+        except Exception as e:
+            logger.warning(f"Throttle check failed: {str(e)}")
+            return True
+
+    def release(self, key):
+        try:
+            self.backend.release(key)
+        except Exception as e:
+            logger.warning(f"Throttle release failed: {str(e)}")
+
+    def reset(self, key):
+        try:
+            self.backend.reset(key)
+        except Exception as e:
+            logger.warning(f"Throttle reset failed: {str(e)}")
+
+
+throttle = SafeThrottle()
@@ -6,6 +6,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated
 from .models import CustomUser
 from .emails import send_otp_via_email,send_otp_via_email_forgot_password
+from .throttling import throttle
 import logging
 from django.utils import timezone
 from django.db import transaction
@@ -14,35 +15,6 @@ from django.conf import settings
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Create a safer cache wrapper for environments where cache might not be configured
-class SafeCache:
-    def get(self, key, default=None):
-        try:
-            from django.core.cache import cache
-            return cache.get(key, default)
-        except Exception as e:
-            logger.warning(f"Cache get operation failed: {str(e)}")
-            return default
-    
-    def set(self, key, value, timeout=None):
-        try:
-            from django.core.cache import cache
-            return cache.set(key, value, timeout=timeout)
-        except Exception as e:
-            logger.warning(f"Cache set operation failed: {str(e)}")
-            return None
-    
-    def delete(self, key):
-        try:
-            from django.core.cache import cache
-            return cache.delete(key)
-        except Exception as e:
-            logger.warning(f"Cache delete operation failed: {str(e)}")
-            return None
-
-# Use our safe cache wrapper instead of direct cache access
-safe_cache = SafeCache()
-
 # Helper function for getting client IP - shared across views
 def get_client_ip(request):
     """Extract client IP address from request with proxy handling"""
@@ -61,8 +33,8 @@ class RegisterView(APIView):
     def post(self, request):
         client_ip = get_client_ip(request)
         
-        # Implement registration rate limiting
-        if self._check_register_rate_limit(client_ip):
+        # Implement registration rate limiting - this also counts the attempt
+        if not self._acquire_register_attempt(client_ip):
             logger.warning(f"Registration rate limit exceeded for IP: {client_ip}")
             return Response(
                 {
@@ -81,6 +53,7 @@ class RegisterView(APIView):
                     email = serializer.validated_data['email'].lower().strip()
                     if CustomUser.objects.filter(email=email).exists():
                         logger.warning(f"Registration attempt with existing email: {email} from IP: {client_ip}")
+                        self._release_register_attempt(client_ip)
                         return Response(
                             {
                                 'status': False,
@@ -120,6 +93,7 @@ class RegisterView(APIView):
                     
                     # If OTP sending failed, delete the user to maintain consistency
                     user.delete()
+                    self._release_register_attempt(client_ip)
                     logger.error(f"Failed to send OTP for new registration: {email} from IP {client_ip}")
                     
                     return Response(
@@ -130,10 +104,7 @@ class RegisterView(APIView):
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR
                     )
                 
-                # Increment registration attempt counter for invalid input
-                self._increment_register_attempts(client_ip)
-                
-                # Log validation errors
+                # Log validation errors - invalid input keeps counting against the rate limit
                 logger.warning(f"Registration validation failed from IP {client_ip}: {serializer.errors}")
                 
                 return Response(
@@ -149,9 +120,7 @@ class RegisterView(APIView):
             # Log the error for monitoring
             logger.error(f"Registration error from IP {client_ip}: {str(e)}")
             
-            # Increment registration attempt counter for server errors
-            self._increment_register_attempts(client_ip)
-            
+            # Server errors keep counting against the registration rate limit
             return Response(
                 {
                     'status': False,
@@ -160,30 +129,25 @@ class RegisterView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
             
-    def _check_register_rate_limit(self, client_ip):
-        """Check if client has exceeded registration rate limits"""
+    def _acquire_register_attempt(self, client_ip):
+        """Record a registration attempt and check it is within the rate limit in one step"""
         rate_limit_key = f"register_attempts:{client_ip}"
-        attempts = safe_cache.get(rate_limit_key, 0)
         
-        # Get configurable max attempts, defaulting to 3
+        # Get configurable max attempts and window, defaulting to 3 per hour
         max_attempts = getattr(settings, 'MAX_REGISTER_ATTEMPTS', 3)
+        timeout = getattr(settings, 'REGISTER_ATTEMPTS_TIMEOUT', 3600)
         
-        return attempts >= max_attempts
+        return throttle.acquire(rate_limit_key, max_attempts, timeout)
     
-    def _increment_register_attempts(self, client_ip):
-        """Increment failed registration attempts counter"""
+    def _release_register_attempt(self, client_ip):
+        """Stop counting the current attempt, e.g. when it failed on our side"""
         rate_limit_key = f"register_attempts:{client_ip}"
-        attempts = safe_cache.get(rate_limit_key, 0)
-        
-        # Get configurable timeout, defaulting to 1 hour (3600 seconds)
-        timeout = getattr(settings, 'REGISTER_ATTEMPTS_TIMEOUT', 3600)
-        
-        safe_cache.set(rate_limit_key, attempts + 1, timeout=timeout)
+        throttle.release(rate_limit_key)
     
     def _reset_register_rate_limit(self, client_ip):
         """Reset registration attempts counter after successful registration"""
         rate_limit_key = f"register_attempts:{client_ip}"
-        safe_cache.delete(rate_limit_key)
+        throttle.reset(rate_limit_key)
 
 class LoginView(APIView):
     """
@@ -195,8 +159,8 @@ class LoginView(APIView):
     def post(self, request):
         client_ip = get_client_ip(request)
         
-        # Implement rate limiting
-        if self._check_rate_limit(client_ip):
+        # Implement rate limiting - this also counts the attempt until it succeeds
+        if not self._acquire_attempt(client_ip):
             logger.warning(f"Rate limit exceeded for IP: {client_ip}")
             return Response(
                 {
@@ -210,9 +174,7 @@ class LoginView(APIView):
         serializer = LoginSerializer(data=request.data)
         
         if not serializer.is_valid():
-            # Increment failed attempt counter for invalid input
-            self._increment_failed_attempts(client_ip)
-            
+            # Invalid input keeps counting as a failed attempt
             return Response(
                 {
                     'status': False,
@@ -237,14 +199,14 @@ class LoginView(APIView):
                 if not user:
                     # Log failed login attempt - don't reveal if user exists
                     logger.warning(f"Failed login attempt for email: {email} from IP: {client_ip}")
-                    self._increment_failed_attempts(client_ip)
                     
                     # Use constant time response to prevent timing attacks
                     return self._get_invalid_credentials_response()
                     
                 if not user.is_email_verified:
-                    # Log the event but don't increment failed attempts counter
+                    # Log the event but don't count it as a failed attempt
                     logger.info(f"Login attempt for unverified email: {email} from IP: {client_ip}")
+                    self._release_attempt(client_ip)
                     
                     return Response(
                         {
@@ -292,7 +254,6 @@ class LoginView(APIView):
                 else:
                     # Log failed login attempt due to wrong password
                     logger.warning(f"Failed login attempt (wrong password) for user ID: {user.id} from IP: {client_ip}")
-                    self._increment_failed_attempts(client_ip)
                     
                     # Use constant time response to prevent timing attacks
                     return self._get_invalid_credentials_response()
@@ -301,7 +262,8 @@ class LoginView(APIView):
             # Log the unexpected error
             logger.error(f"Login error for email {email} from IP {client_ip}: {str(e)}")
             
-            # Don't increment failure counter for server errors
+            # Don't count server errors as failed attempts
+            self._release_attempt(client_ip)
             return Response(
                 {
                     'status': False,
@@ -310,30 +272,28 @@ class LoginView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def _check_rate_limit(self, client_ip):
-        """Check if client has exceeded rate limits"""
+    def _acquire_attempt(self, client_ip):
+        """
+        Record a login attempt and check it is within the rate limit in one step,
+        so concurrent attempts can't all pass the check before any is recorded
+        """
         rate_limit_key = f"login_attempts:{client_ip}"
-        attempts = safe_cache.get(rate_limit_key, 0)
         
-        # Get configurable max attempts, defaulting to 5
+        # Get configurable max attempts and window, defaulting to 5 per 5 minutes
         max_attempts = getattr(settings, 'MAX_LOGIN_ATTEMPTS', 5)
+        timeout = getattr(settings, 'LOGIN_ATTEMPTS_TIMEOUT', 300)
         
-        return attempts >= max_attempts
+        return throttle.acquire(rate_limit_key, max_attempts, timeout)
     
-    def _increment_failed_attempts(self, client_ip):
-        """Increment failed login attempts counter"""
+    def _release_attempt(self, client_ip):
+        """Stop counting the current attempt as a failed one"""
         rate_limit_key = f"login_attempts:{client_ip}"
-        attempts = safe_cache.get(rate_limit_key, 0)
-        
-        # Get configurable timeout, defaulting to 5 minutes (300 seconds)
-        timeout = getattr(settings, 'LOGIN_ATTEMPTS_TIMEOUT', 300)
-        
-        safe_cache.set(rate_limit_key, attempts + 1, timeout=timeout)
+        throttle.release(rate_limit_key)
     
     def _reset_failed_attempts(self, client_ip):
         """Reset failed login attempts counter"""
         rate_limit_key = f"login_attempts:{client_ip}"
-        safe_cache.delete(rate_limit_key)
+        throttle.reset(rate_limit_key)
     
     def _get_invalid_credentials_response(self):
         """Return standardized response for invalid credentials"""
@@ -192,6 +192,13 @@ EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS')
 
+# Outgoing emails are queued in auth_app.EmailOutbox and delivered by
+# `python manage.py send_queued_emails`
+EMAIL_OUTBOX_BATCH_SIZE = 100  # Emails sent per SMTP connection
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5  # Delivery attempts before an email is marked as failed
+EMAIL_OUTBOX_RETRY_DELAY = 30  # Base retry delay in seconds, doubled after each failed attempt
+EMAIL_OUTBOX_LEASE = 300  # Seconds a worker holds claimed emails before another worker may retry them
+
 
 
 SSLCOMMERZ = {
@@ -223,13 +230,17 @@ PAYMENT_REDIRECT_URLS = {
 }
 
 
+# Shared by every worker process, so a cache entry (and the rebuild lock taken with
+# cache.add()) built by one gunicorn worker is seen by all of them.
+# Create the table with `python manage.py createcachetable`. Hot entries are also kept
+# in each process's memory by api.cache_utils.tiered_cache
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
         'TIMEOUT': 300,  # Default cache timeout in seconds (5 minutes)
         'OPTIONS': {
-            'MAX_ENTRIES': 1000,  # Maximum number of entries in cache
+            'MAX_ENTRIES': 10000,  # Maximum number of entries in cache
             'CULL_FREQUENCY': 3,  # Fraction of entries to cull when max is reached (1/3)
         }
     }
@@ -239,14 +250,48 @@ CACHES = {
 CACHE_TIMEOUTS = {
     'contributions_list': 300,  # 5 minutes for contribution listings
     'contribution_detail': 600,  # 10 minutes for contribution details
+    'contributions_count': 900,  # 15 minutes for filtered listing totals
     'university_list': 3600,    # 1 hour for university listings
     'department_list': 3600,    # 1 hour for department listings
-    'major_subject_list': 3600  # 1 hour for major subject listings
+    'major_subject_list': 3600,  # 1 hour for major subject listings
+    'taxonomy': 3600  # 1 hour for the combined taxonomy
 }
 
+# In-process tier in front of the shared cache for taxonomy lists and contribution details.
+# A local copy is trusted for LOCAL_CACHE_TTL seconds, then revalidated against its
+# generation counter, so writes from other processes show up within that time
+LOCAL_CACHE_MAX_ENTRIES = 512
+LOCAL_CACHE_TTL = 5
+
+# Keep a gzipped copy of cached response bodies for clients sending Accept-Encoding: gzip
+CACHED_RESPONSE_GZIP = True
+
+# Warm the shared contribution caches when a worker process serves its first request;
+# entries an earlier worker built are kept (see also the warm_caches management command)
+WARM_CACHES_ON_STARTUP = False
+WARM_CACHES_FILTERS = 20  # Largest values warmed per university/department/major subject/tag filter
+WARM_CACHES_DETAILS = 50  # Most enrolled contribution details warmed
+# Scheme and host clients reach the API on, used by the warm_caches command: listing pages
+# are cached per origin because their pagination links are absolute
+WARM_CACHES_ORIGIN = None  # e.g. 'https://api.example.com'
+
+
+# Maximum number of ranked matches considered by ?q= contribution search
+SEARCH_MAX_RESULTS = 1000
+
+# Number of latest comments embedded in contribution list and detail payloads.
+# The full thread is served by the comments endpoint
+CONTRIBUTION_LATEST_COMMENTS = 3
+
 
 # Configuration for rate limiting
+# Backend storing login/registration attempts. The database backend is shared by
+# every worker process; auth_app.throttling.CacheThrottleBackend uses the cache instead
+THROTTLE_BACKEND = 'auth_app.throttling.DatabaseThrottleBackend'
 MAX_LOGIN_ATTEMPTS = 5  # Maximum failed login attempts before rate limiting
 LOGIN_ATTEMPTS_TIMEOUT = 300  # Timeout in seconds (5 minutes) for login attempts
 MAX_REGISTER_ATTEMPTS = 6  # Maximum failed registration attempts
-REGISTER_ATTEMPTS_TIMEOUT = 3600  # Timeout in seconds (1 hour) for registration attempts 
\ No newline at end of file
+REGISTER_ATTEMPTS_TIMEOUT = 3600  # Timeout in seconds (1 hour) for registration attempts 
+# Throttle events older than this are deleted for every key; keep it >= the longest window
+THROTTLE_EVENT_RETENTION = max(LOGIN_ATTEMPTS_TIMEOUT, REGISTER_ATTEMPTS_TIMEOUT)
+THROTTLE_PRUNE_PROBABILITY = 0.01  # Share of recorded attempts that also prune expired events
@@ -26,3 +26,10 @@ class Enrollment(models.Model):
     class Meta:
         unique_together = ['user', 'contribution']  # Prevent duplicate enrollments
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so a later save can tell whether it became COMPLETED
+        instance._loaded_payment_status = instance.payment_status
+        return instance
+
@@ -1,7 +1,35 @@
+from django.db.models import F
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.core.cache import cache
 from .models import Enrollment
+from api.models import Contributions
+from api.cache_utils import CONTRIBUTIONS_LIST_NAMESPACE, bump_cache_generation, contribution_detail_user_key
+
+
+def apply_enrollment_count_delta(contribution_id, delta):
+    """Adjust a contribution's completed enrollment counter without a read-modify-write race"""
+    if delta:
+        Contributions.objects.filter(pk=contribution_id).update(
+            enrollment_count=F('enrollment_count') + delta
+        )
+
+
+@receiver(post_save, sender=Enrollment)
+def update_enrollment_count_on_save(sender, instance, created, **kwargs):
+    """Count an enrollment towards popularity once its payment is completed"""
+    old_status = None if created else getattr(instance, '_loaded_payment_status', None)
+    delta = (instance.payment_status == 'COMPLETED') - (old_status == 'COMPLETED')
+    apply_enrollment_count_delta(instance.contribution_id, delta)
+    
+    # The saved value is the baseline for the next update of this instance
+    instance._loaded_payment_status = instance.payment_status
+
+
+@receiver(post_delete, sender=Enrollment)
+def update_enrollment_count_on_delete(sender, instance, **kwargs):
+    if getattr(instance, '_loaded_payment_status', instance.payment_status) == 'COMPLETED':
+        apply_enrollment_count_delta(instance.contribution_id, -1)
 
 
 @receiver(post_save, sender=Enrollment)
@@ -16,16 +44,18 @@ def enrollment_saved(sender, instance, created, **kwargs):
     # Invalidate cache for this contribution's enrollments
     cache.delete(f"contribution_enrollments:{instance.contribution.id}")
     
-    # Invalidate cache for the contribution detail
-    cache.delete(f"contribution_detail:{instance.contribution.id}")
+    # Invalidate this user's enrollment overlay on the contribution detail
+    cache.delete(contribution_detail_user_key(instance.contribution.id, instance.user.id))
+    
+    # Invalidate contribution list pages, which include enrollment information
+    bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
     
     # Clear general caches that might include enrollment information
     contribution_cache_patterns = [
-        f"contributions_list:*",
         f"user_contributions:{instance.user.id}:*"
     ]
     
-    # Clear cache patterns if available, otherwise clear all cache
+    # Clear cache patterns if available
     for pattern in contribution_cache_patterns:
         if hasattr(cache, 'delete_pattern'):
             cache.delete_pattern(pattern)
@@ -46,10 +76,11 @@ def enrollment_deleted(sender, instance, **kwargs):
     # Same cache invalidation as for saves
     cache.delete(f"user_enrollments:{instance.user.id}")
     cache.delete(f"contribution_enrollments:{instance.contribution.id}")
-    cache.delete(f"contribution_detail:{instance.contribution.id}")
+    cache.delete(contribution_detail_user_key(instance.contribution.id, instance.user.id))
+    
+    bump_cache_generation(CONTRIBUTIONS_LIST_NAMESPACE)
     
     contribution_cache_patterns = [
-        f"contributions_list:*",
         f"user_contributions:{instance.user.id}:*"
     ]
     